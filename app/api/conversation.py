@@ -2,18 +2,26 @@
 Multi-Model API endpoints for conversation and model management
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterator
 import structlog
-import zipfile
+import asyncio
 import os
-import tempfile
+import gzip
+import hashlib
+import re
 import json
 
 from app.services.conversation_service import ConversationService
 from app.services.multi_model_service import MultiModelService
+from app.services.turn_lock import ConversationBusyError
+from app.core.config import settings
+from app.services.project_archive import (
+    project_files, stream_zip, stream_archive, supported_formats, generation_time, diff_manifests, ARCHIVE_FORMATS
+)
+from app.services.archive_cache import ArchiveCache, archive_key
 
 logger = structlog.get_logger(__name__)
 
@@ -23,12 +31,14 @@ router = APIRouter(prefix="/api/v1", tags=["conversation"])
 class ProjectIdeaRequest(BaseModel):
     """Request model for project idea"""
     project_idea: str
+    bypass_cache: bool = False
 
 
 class ContinueConversationRequest(BaseModel):
     """Request model for continuing conversation"""
     conversation_id: str
     message: str
+    bypass_cache: bool = False
 
 
 class ConversationResponse(BaseModel):
@@ -38,24 +48,154 @@ class ConversationResponse(BaseModel):
     phase: str
     download_url: str
     filename: str
+    job_id: Optional[str] = None
+    job_url: Optional[str] = None
 
 
 # Global services
 _conversation_service: ConversationService = None
 _multi_model_service: MultiModelService = None
+# Created on first use so it belongs to the serving event loop
+_services_lock: Optional[asyncio.Lock] = None
 
 
 async def get_services():
-    """Get global services"""
-    global _conversation_service, _multi_model_service
+    """Get global services, creating and starting them on first use"""
+    global _conversation_service, _multi_model_service, _services_lock
     
     if _conversation_service is None:
-        _multi_model_service = MultiModelService()
-        _conversation_service = ConversationService()
+        if _services_lock is None:
+            _services_lock = asyncio.Lock()
+        async with _services_lock:
+            if _conversation_service is None:
+                multi_model_service = MultiModelService()
+                conversation_service = ConversationService(multi_model_service)
+                await conversation_service.start()
+                # Publish only once started, so no request uses a store or job queue that is not open yet
+                _multi_model_service, _conversation_service = multi_model_service, conversation_service
     
     return _conversation_service, _multi_model_service
 
 
+_archive_cache: Optional[ArchiveCache] = None
+_archive_cache_unavailable = False
+
+# Downloads change when docs are regenerated, so clients must revalidate with the ETag
+DOWNLOAD_CACHE_CONTROL = "private, no-cache"
+
+
+def get_archive_cache() -> Optional[ArchiveCache]:
+    """Get the on-disk archive cache, or None when disabled or its directory is not writable"""
+    global _archive_cache, _archive_cache_unavailable
+    
+    if _archive_cache is None and settings.ARCHIVE_CACHE_ENABLED and not _archive_cache_unavailable:
+        try:
+            _archive_cache = ArchiveCache(settings.ARCHIVE_CACHE_DIR, settings.ARCHIVE_CACHE_MAX_BYTES)
+        except OSError as e:
+            # Read-only filesystems (e.g. serverless) still get streamed downloads
+            _archive_cache_unavailable = True
+            logger.warning("Archive cache disabled", directory=settings.ARCHIVE_CACHE_DIR, error=str(e))
+    return _archive_cache
+
+
+def _iter_file(file, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    with file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+
+_SINGLE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether Accept-Encoding allows gzip (an explicit q=0 refuses it)"""
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _parse_range(range_header: Optional[str], size: int) -> Optional[tuple]:
+    """(start, end) inclusive for a single byte range; None means serve the whole body
+
+    Raises HTTPException 416 for a syntactically valid but unsatisfiable range.
+    Multiple ranges are ignored, which RFC 9110 allows.
+    """
+    match = _SINGLE_RANGE.match((range_header or "").strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"},
+                            detail="Requested range not satisfiable")
+    return start, end
+
+
+def _text_download(body: bytes, filename: str, if_none_match: Optional[str],
+                   accept_encoding: Optional[str], range_header: Optional[str]) -> Response:
+    """Serve an in-memory text file with ETag, gzip and single-range support"""
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    gzip_etag = etag[:-1] + '-gzip"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": DOWNLOAD_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    }
+    
+    byte_range = _parse_range(range_header, len(body))
+    if byte_range is None and len(body) >= GZIP_MIN_SIZE and _accepts_gzip(accept_encoding):
+        # The compressed variant is a different representation, so it gets its own ETag
+        headers["ETag"] = gzip_etag
+        if _etag_matches(if_none_match, etag) or _etag_matches(if_none_match, gzip_etag):
+            return Response(status_code=304, headers=headers)
+        headers["Content-Encoding"] = "gzip"
+        return Response(gzip.compress(body, compresslevel=6, mtime=0), media_type="text/plain; charset=utf-8",
+                        headers=headers)
+    
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    if byte_range is not None:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+        return Response(body[start:end + 1], status_code=206, media_type="text/plain; charset=utf-8",
+                        headers=headers)
+    
+    return Response(body, media_type="text/plain; charset=utf-8", headers=headers)
+
+
+async def shutdown_services():
+    """Flush and close global services"""
+    if _conversation_service is not None:
+        await _conversation_service.close()
+
+
 @router.post("/conversation/start", response_model=ConversationResponse)
 async def start_conversation(request: ProjectIdeaRequest):
     """Start a new project conversation"""
@@ -79,7 +219,7 @@ async def start_conversation(request: ProjectIdeaRequest):
         if not anthropic_key and not goose_key:
             raise HTTPException(status_code=500, detail="No API keys configured. Please set ANTHROPIC_API_KEY or GOOSE_AI_API_KEY")
         
-        result = await conversation_service.start_conversation(request.project_idea)
+        result = await conversation_service.start_conversation(request.project_idea, bypass_cache=request.bypass_cache)
         
         # Create downloadable response
         response_content = result.get("response", "")
@@ -124,6 +264,7 @@ async def health_check():
             "status": "healthy",
             "models": model_status,
             "performance": performance_stats,
+            "circuit_breakers": multi_model_service.get_circuit_states(),
             "message": "Multi-model service is running"
         }
         
@@ -165,6 +306,39 @@ async def get_model_performance():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/models/hedging")
+async def get_hedging_stats():
+    """Get hedged request statistics"""
+    try:
+        _, multi_model_service = await get_services()
+        return multi_model_service.get_hedging_stats()
+    except Exception as e:
+        logger.error(f"Error getting hedging stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/models/cache")
+async def get_cache_stats():
+    """Get response cache statistics"""
+    try:
+        _, multi_model_service = await get_services()
+        return multi_model_service.get_cache_stats()
+    except Exception as e:
+        logger.error(f"Error getting cache stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/ideas/cache")
+async def get_idea_cache_stats():
+    """Get near-duplicate project idea cache statistics"""
+    try:
+        conversation_service, _ = await get_services()
+        return conversation_service.get_idea_cache_stats()
+    except Exception as e:
+        logger.error(f"Error getting idea cache stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/models/recommendations")
 async def get_model_recommendations():
     """Get model recommendations based on performance"""
@@ -186,7 +360,8 @@ async def continue_conversation(request: ContinueConversationRequest):
         
         result = await conversation_service.continue_conversation(
             request.conversation_id, 
-            request.message
+            request.message,
+            bypass_cache=request.bypass_cache
         )
         
         # Create downloadable response
@@ -201,6 +376,9 @@ async def continue_conversation(request: ContinueConversationRequest):
             "download_url": f"/api/v1/conversation/{conversation_id}/response/download",
             "filename": f"claude-response-{conversation_id}.txt"
         }
+        if result.get("job_id"):
+            response_data["job_id"] = result["job_id"]
+            response_data["job_url"] = f"/api/v1/jobs/{result['job_id']}"
         
         logger.info(f"Conversation continued successfully", 
                    conversation_id=request.conversation_id,
@@ -208,148 +386,261 @@ async def continue_conversation(request: ContinueConversationRequest):
         
         return ConversationResponse(**response_data)
         
+    except ConversationBusyError as e:
+        logger.warning("Rejected concurrent turn", conversation_id=request.conversation_id, reason=str(e))
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Error continuing conversation: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _ndjson_events(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Encode conversation events as newline-delimited JSON"""
+    try:
+        async for event in events:
+            if event.get("type") == "done":
+                conversation_id = event.get("conversation_id", "")
+                event["download_url"] = f"/api/v1/conversation/{conversation_id}/response/download"
+                event["filename"] = f"claude-response-{conversation_id}.txt"
+                if event.get("job_id"):
+                    event["job_url"] = f"/api/v1/jobs/{event['job_id']}"
+            yield (json.dumps(event) + "\n").encode("utf-8")
+    except ConversationBusyError as e:
+        yield (json.dumps({"type": "error", "status": 409, "detail": str(e)}) + "\n").encode("utf-8")
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        logger.error(f"Error streaming conversation: {e}", exc_info=True)
+        yield (json.dumps({"type": "error", "detail": str(e)}) + "\n").encode("utf-8")
+
+
+@router.post("/conversation/start/stream")
+async def start_conversation_stream(request: ProjectIdeaRequest):
+    """Start a new project conversation, streaming the response as NDJSON"""
+    conversation_service, multi_model_service = await get_services()
+    
+    anthropic_key = multi_model_service.anthropic_client.api_key if multi_model_service.anthropic_client else None
+    goose_key = multi_model_service.goose_ai_client.api_key if multi_model_service.goose_ai_client else None
+    
+    if not anthropic_key and not goose_key:
+        raise HTTPException(status_code=500, detail="No API keys configured. Please set ANTHROPIC_API_KEY or GOOSE_AI_API_KEY")
+    
+    logger.info(f"Starting streamed conversation for project idea: {request.project_idea}")
+    
+    return StreamingResponse(
+        _ndjson_events(conversation_service.stream_start_conversation(
+            request.project_idea,
+            bypass_cache=request.bypass_cache
+        )),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/conversation/continue/stream")
+async def continue_conversation_stream(request: ContinueConversationRequest):
+    """Continue an existing conversation, streaming the response as NDJSON"""
+    conversation_service, _ = await get_services()
+    
+    logger.info(f"Continuing streamed conversation {request.conversation_id}")
+    
+    # Reject before the stream starts when possible, so the client gets a real status code
+    if conversation_service.turn_locks.is_busy(request.conversation_id):
+        raise HTTPException(status_code=409, detail="Conversation already has a turn in progress and the queue is full")
+    
+    return StreamingResponse(
+        _ndjson_events(conversation_service.stream_continue_conversation(
+            request.conversation_id,
+            request.message,
+            bypass_cache=request.bypass_cache
+        )),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_documentation_job(job_id: str, wait: float = 0):
+    """Get documentation job status; wait > 0 long-polls up to that many seconds"""
+    conversation_service, _ = await get_services()
+    
+    job = await conversation_service.get_documentation_job(job_id, wait=min(max(wait, 0), 30))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    response = {
+        "job_id": job["job_id"],
+        "conversation_id": job["conversation_id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"]
+    }
+    if job["status"] == "succeeded":
+        response["project_name"] = (job["result"] or {}).get("project_name")
+        response["download_url"] = f"/api/v1/conversation/{job['conversation_id']}/download"
+    elif job["error"]:
+        response["error"] = job["error"]
+    return response
+
+
 @router.get("/conversation/{conversation_id}/download")
-async def download_complete_project(conversation_id: str):
-    """Download the complete project as a ZIP file"""
+async def download_complete_project(conversation_id: str, format: str = "zip",
+                                    if_none_match: Optional[str] = Header(None)):
+    """Download the complete project as a zip, tar.gz or tar.zst archive"""
+    
+    if format not in supported_formats():
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(supported_formats())}")
     
     try:
         conversation_service, _ = await get_services()
         
-        conversation = conversation_service.get_conversation(conversation_id)
+        conversation = await conversation_service.get_conversation(conversation_id)
+        if not conversation:
+            # A job may have finished for a conversation the memory store lost in a restart
+            conversation = await conversation_service.get_job_documentation(conversation_id)
         
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        if "complete_project" not in conversation:
+        complete_project = conversation.get("documentation")
+        if not complete_project:
+            if conversation.get("documentation_job"):
+                raise HTTPException(status_code=404, detail=f"Documentation is still being generated (job {conversation['documentation_job']}).")
             raise HTTPException(status_code=404, detail="Complete project not generated yet. Please generate the complete project first.")
         
-        complete_project = conversation["complete_project"]
         project_name = complete_project.get("project_name", "project").lower().replace(" ", "-")
-        
-        # Create temporary ZIP file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
-            with zipfile.ZipFile(tmp_file.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                
-                # Add project metadata
-                metadata = {
-                    "project_name": complete_project.get("project_name", "Project"),
-                    "description": complete_project.get("description", ""),
-                    "generated_at": conversation.get("last_activity", ""),
-                    "conversation_id": conversation_id
-                }
-                zipf.writestr("project-metadata.json", json.dumps(metadata, indent=2))
-                
-                # Add file structure
-                file_structure = complete_project.get("file_structure", {})
-                
-                # Add backend files
-                for file_config in file_structure.get("backend", []):
-                    file_path = file_config.get("path", "")
-                    content = file_config.get("content", "")
-                    zipf.writestr(file_path, content)
-                
-                # Add frontend files
-                for file_config in file_structure.get("frontend", []):
-                    file_path = file_config.get("path", "")
-                    content = file_config.get("content", "")
-                    zipf.writestr(file_path, content)
-                
-                # Add documentation files
-                docs_structure = file_structure.get("docs", {})
-                for category, files in docs_structure.items():
-                    for filename, file_data in files.items():
-                        if isinstance(file_data, dict):
-                            content = file_data.get("content", "")
-                            file_path = f"docs/{category}/{filename}"
-                            zipf.writestr(file_path, content)
-                
-                # Add configuration files
-                for file_config in file_structure.get("config", []):
-                    file_path = file_config.get("path", "")
-                    content = file_config.get("content", "")
-                    zipf.writestr(file_path, content)
-                
-                # Add dependencies
-                dependencies = complete_project.get("dependencies", {})
-                if dependencies:
-                    zipf.writestr("dependencies.json", json.dumps(dependencies, indent=2))
-                
-                # Add GitHub issues
-                github_issues = complete_project.get("github_issues", [])
-                if github_issues:
-                    zipf.writestr("github-issues.json", json.dumps(github_issues, indent=2))
-                
-                # Add README
-                readme_content = f"""# {complete_project.get("project_name", "Project")}
-
-{complete_project.get("description", "Project description")}
-
-## Project Structure
-
-This project was generated using the Project Architect AI system.
-
-### Components
-- Backend: {len(file_structure.get("backend", []))} files
-- Frontend: {len(file_structure.get("frontend", []))} files
-- Documentation: {len(docs_structure.get("architecture", {})) + len(docs_structure.get("technical", {})) + len(docs_structure.get("business", {}))} files
-
-### Getting Started
-
-1. Install dependencies
-2. Configure environment variables
-3. Run the application
-
-See the documentation in the `docs/` folder for detailed instructions.
-
-Generated on: {conversation.get("last_activity", "")}
-"""
-                zipf.writestr("README.md", readme_content)
-            
-            # Return the ZIP file
-            return FileResponse(
-                path=tmp_file.name,
-                filename=f"{project_name}-complete-project.zip",
-                media_type="application/zip"
-            )
+        filename = f"{project_name}-complete-project.{format}"
+        media_type = ARCHIVE_FORMATS[format]
+        
+        # The archive is a pure function of the payload, the metadata written into it and the format
+        key = archive_key(complete_project, conversation_id, generation_time(conversation), format)
+        headers = {"ETag": f'"{key}"', "Cache-Control": DOWNLOAD_CACHE_CONTROL}
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        
+        build = lambda: stream_archive(project_files(complete_project, conversation, conversation_id), format)
+        
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        archive_cache = get_archive_cache()
+        if archive_cache is not None:
+            try:
+                archive = await archive_cache.open(f"{key}.{format}", build)
+            except OSError as e:
+                logger.warning("Archive cache write failed, streaming instead", error=str(e))
+            else:
+                # Read from the open cache file in chunks; eviction cannot pull it away mid-download
+                headers["Content-Length"] = str(os.fstat(archive.fileno()).st_size)
+                return StreamingResponse(_iter_file(archive), media_type=media_type, headers=headers)
+        
+        # Compressed member by member while it is sent; nothing touches the disk
+        return StreamingResponse(build(), media_type=media_type, headers=headers)
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating download: {e}")
         raise HTTPException(status_code=500, detail=str(e)) 
 
 
+@router.get("/conversation/{conversation_id}/manifest")
+async def get_documentation_manifest(conversation_id: str):
+    """Paths and content hashes of the latest documentation generation"""
+    conversation_service, _ = await get_services()
+    
+    conversation = await conversation_service.get_conversation(conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    manifest = conversation_service.get_manifest(conversation)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Complete project not generated yet. Please generate the complete project first.")
+    return manifest
+
+
+@router.get("/conversation/{conversation_id}/download/delta")
+async def download_documentation_delta(conversation_id: str, since: int, format: str = "zip"):
+    """Download only the files added or changed since a manifest version, plus a list of deleted ones"""
+    if format not in ("zip", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be zip or ndjson")
+    
+    conversation_service, _ = await get_services()
+    
+    conversation = await conversation_service.get_conversation(conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    current = conversation_service.get_manifest(conversation)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Complete project not generated yet. Please generate the complete project first.")
+    
+    previous = conversation_service.get_manifest(conversation, since)
+    if previous is None:
+        # Too old or unknown; the client needs the full archive
+        raise HTTPException(status_code=410, detail=f"Manifest version {since} is no longer available. Download the full project instead.")
+    
+    delta = {
+        "from_version": since,
+        "to_version": current["version"],
+        **diff_manifests(previous["files"], current["files"])
+    }
+    wanted = set(delta["added"]) | set(delta["changed"])
+    files = (
+        (path, content)
+        for path, content in project_files(conversation["documentation"], conversation, conversation_id)
+        if path in wanted
+    )
+    headers = {"X-Manifest-Version": str(current["version"]), "Cache-Control": DOWNLOAD_CACHE_CONTROL}
+    
+    if format == "ndjson":
+        def ndjson_delta():
+            yield (json.dumps({"type": "delta", **delta}) + "\n").encode("utf-8")
+            for path, content in files:
+                operation = "added" if path in delta["added"] else "changed"
+                event = {"type": "file", "op": operation, "path": path, "content": content.decode("utf-8")}
+                yield (json.dumps(event) + "\n").encode("utf-8")
+        
+        return StreamingResponse(ndjson_delta(), media_type="application/x-ndjson", headers=headers)
+    
+    def zip_members():
+        yield "delta-manifest.json", json.dumps(delta, indent=2).encode("utf-8")
+        yield from files
+    
+    headers["Content-Disposition"] = f'attachment; filename="delta-{since}-{current["version"]}.zip"'
+    return StreamingResponse(stream_zip(zip_members()), media_type="application/zip", headers=headers)
+
+
 @router.get("/conversation/{conversation_id}/response/download")
-async def download_claude_response(conversation_id: str):
+async def download_claude_response(conversation_id: str,
+                                   if_none_match: Optional[str] = Header(None),
+                                   accept_encoding: Optional[str] = Header(None),
+                                   range_header: Optional[str] = Header(None, alias="Range")):
     """Download the latest Claude response as a text file"""
     
     try:
         conversation_service, _ = await get_services()
         
-        conversation = conversation_service.get_conversation(conversation_id)
+        conversation = await conversation_service.get_conversation(conversation_id)
         
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         # Get the latest assistant response
         messages = conversation.get("messages", [])
-        assistant_messages = [msg for msg in messages if msg.get("role") == "assistant"]
+        assistant_messages = [msg for msg in messages if msg.role == "assistant"]
         
         if not assistant_messages:
             raise HTTPException(status_code=404, detail="No Claude responses found")
         
         # Get the latest response
-        latest_response = assistant_messages[-1].get("content", "")
+        latest_response = assistant_messages[-1].content
         
         # Create response content with metadata
         response_content = f"""Claude Response - Project Architect
 
 Project: {conversation.get('project_idea', 'Unknown Project')}
 Conversation ID: {conversation_id}
-Generated: {assistant_messages[-1].get('timestamp', 'Unknown')}
+Generated: {assistant_messages[-1].iso_timestamp}
 
 {'='*50}
 
@@ -360,18 +651,17 @@ Generated: {assistant_messages[-1].get('timestamp', 'Unknown')}
 Generated by Claude AI via Project Architect API
 """
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.txt', mode='w', encoding='utf-8') as tmp_file:
-            tmp_file.write(response_content)
-            tmp_file_path = tmp_file.name
-        
-        # Return the file
-        return FileResponse(
-            path=tmp_file_path,
+        # Served from memory; the body is small and already rendered
+        return _text_download(
+            response_content.encode("utf-8"),
             filename=f"claude-response-{conversation_id}.txt",
-            media_type="text/plain"
+            if_none_match=if_none_match,
+            accept_encoding=accept_encoding,
+            range_header=range_header
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error downloading Claude response: {e}")
         raise HTTPException(status_code=500, detail=str(e)) 
@@ -403,6 +693,13 @@ async def debug_info():
                 "conversation_service": "initialized" if conversation_service else "not initialized",
                 "multi_model_service": "initialized" if multi_model_service else "not initialized"
             },
+            "conversation_store": conversation_service.store.get_stats(),
+            "conversation_expiry": conversation_service.get_expiry_stats(),
+            "turn_locks": conversation_service.turn_locks.get_stats(),
+            "summaries": conversation_service.get_summary_stats(),
+            "documentation_jobs": conversation_service.job_queue.get_stats(),
+            "documentation_dedup": multi_model_service.get_project_dedup_stats(),
+            "archive_cache": get_archive_cache().get_stats() if get_archive_cache() else {"enabled": False},
             "models": model_status,
             "status": "healthy"
         }
@@ -2,11 +2,19 @@
 Multi-model configuration for AI-powered project architect
 """
 
+import os
+import tempfile
 from typing import Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
 
+def _default_database_url() -> str:
+    """SQLite next to the app, or in the temp dir where the app directory is read-only (e.g. Vercel)"""
+    directory = "." if os.access(".", os.W_OK) else tempfile.gettempdir()
+    return f"sqlite:///{os.path.join(directory, 'project_architect.db')}"
+
+
 class Settings(BaseSettings):
     """Application settings"""
     
@@ -38,10 +46,93 @@ class Settings(BaseSettings):
     # LLM Configuration
     MAX_TOKENS: int = Field(default=4000, env="MAX_TOKENS")
     TEMPERATURE: float = Field(default=0.7, env="TEMPERATURE")
+    GOOSE_AI_ENGINE_CACHE_TTL: float = Field(default=300.0, env="GOOSE_AI_ENGINE_CACHE_TTL")  # 5 minutes
+    GOOSE_AI_ENGINE_FAILURE_BACKOFF: float = Field(default=30.0, env="GOOSE_AI_ENGINE_FAILURE_BACKOFF")  # seconds before retrying a failed fetch
+    
+    # Shared HTTP transport
+    HTTP_MAX_CONNECTIONS: int = Field(default=100, env="HTTP_MAX_CONNECTIONS")
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=20, env="HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    HTTP_KEEPALIVE_EXPIRY: float = Field(default=60.0, env="HTTP_KEEPALIVE_EXPIRY")
+    HTTP_ENABLE_HTTP2: bool = Field(default=True, env="HTTP_ENABLE_HTTP2")
+    HTTP_CONNECT_TIMEOUT: float = Field(default=10.0, env="HTTP_CONNECT_TIMEOUT")
+    HTTP_TIMEOUT: float = Field(default=600.0, env="HTTP_TIMEOUT")
+    
+    # Provider admission control (0 disables a rate limit)
+    ANTHROPIC_MAX_IN_FLIGHT: int = Field(default=8, env="ANTHROPIC_MAX_IN_FLIGHT")
+    ANTHROPIC_REQUESTS_PER_MINUTE: int = Field(default=50, env="ANTHROPIC_REQUESTS_PER_MINUTE")
+    ANTHROPIC_TOKENS_PER_MINUTE: int = Field(default=40000, env="ANTHROPIC_TOKENS_PER_MINUTE")
+    GOOSE_AI_MAX_IN_FLIGHT: int = Field(default=8, env="GOOSE_AI_MAX_IN_FLIGHT")
+    GOOSE_AI_REQUESTS_PER_MINUTE: int = Field(default=60, env="GOOSE_AI_REQUESTS_PER_MINUTE")
+    GOOSE_AI_TOKENS_PER_MINUTE: int = Field(default=0, env="GOOSE_AI_TOKENS_PER_MINUTE")
+    PROVIDER_MAX_QUEUE: int = Field(default=100, env="PROVIDER_MAX_QUEUE")
+    PROVIDER_MAX_WAIT: float = Field(default=30.0, env="PROVIDER_MAX_WAIT")  # seconds
+    
+    # Circuit breakers
+    BREAKER_FAILURE_THRESHOLD: int = Field(default=5, env="BREAKER_FAILURE_THRESHOLD")  # consecutive failures
+    BREAKER_RECOVERY_TIMEOUT: float = Field(default=30.0, env="BREAKER_RECOVERY_TIMEOUT")  # seconds open before probing
+    BREAKER_HALF_OPEN_MAX_CALLS: int = Field(default=1, env="BREAKER_HALF_OPEN_MAX_CALLS")
+    
+    # Adaptive model routing
+    ROUTER_WINDOW: int = Field(default=100, env="ROUTER_WINDOW")  # recent outcomes per task and model
+    ROUTER_EWMA_ALPHA: float = Field(default=0.2, env="ROUTER_EWMA_ALPHA")
+    ROUTER_MIN_SAMPLES: int = Field(default=5, env="ROUTER_MIN_SAMPLES")
+    ROUTER_ERROR_PENALTY: float = Field(default=30.0, env="ROUTER_ERROR_PENALTY")  # seconds at 100% errors
+    ROUTER_TIMEOUT_PENALTY: float = Field(default=60.0, env="ROUTER_TIMEOUT_PENALTY")  # seconds at 100% timeouts
+    
+    # Hedged requests across providers
+    HEDGING_ENABLED: bool = Field(default=False, env="HEDGING_ENABLED")
+    HEDGE_DEFAULT_DELAY: float = Field(default=10.0, env="HEDGE_DEFAULT_DELAY")  # seconds, until enough samples exist
+    HEDGE_MIN_DELAY: float = Field(default=1.0, env="HEDGE_MIN_DELAY")  # seconds
+    HEDGE_MIN_SAMPLES: int = Field(default=20, env="HEDGE_MIN_SAMPLES")
+    HEDGE_LATENCY_WINDOW: int = Field(default=200, env="HEDGE_LATENCY_WINDOW")
+    
+    # Conversation response cache (opt-in)
+    RESPONSE_CACHE_ENABLED: bool = Field(default=False, env="RESPONSE_CACHE_ENABLED")
+    RESPONSE_CACHE_MAX_BYTES: int = Field(default=16 * 1024 * 1024, env="RESPONSE_CACHE_MAX_BYTES")
+    RESPONSE_CACHE_TTL: float = Field(default=3600.0, env="RESPONSE_CACHE_TTL")  # seconds
+    
+    # Near-duplicate project idea cache (opt-in)
+    IDEA_CACHE_ENABLED: bool = Field(default=False, env="IDEA_CACHE_ENABLED")
+    IDEA_CACHE_SIMILARITY: float = Field(default=0.8, env="IDEA_CACHE_SIMILARITY")  # estimated Jaccard
+    IDEA_CACHE_MAX_ENTRIES: int = Field(default=100000, env="IDEA_CACHE_MAX_ENTRIES")
     
     # Conversation
     MAX_CONVERSATION_LENGTH: int = Field(default=50, env="MAX_CONVERSATION_LENGTH")
     CONVERSATION_TIMEOUT: int = Field(default=3600, env="CONVERSATION_TIMEOUT")  # 1 hour
+    CONVERSATION_SWEEP_INTERVAL: float = Field(default=30.0, env="CONVERSATION_SWEEP_INTERVAL")  # seconds
+    CONVERSATION_SWEEP_BATCH: int = Field(default=500, env="CONVERSATION_SWEEP_BATCH")  # max evictions per sweep
+    CONVERSATION_MAX_QUEUED_TURNS: int = Field(default=1, env="CONVERSATION_MAX_QUEUED_TURNS")  # behind the running turn
+    CONVERSATION_TURN_WAIT: float = Field(default=30.0, env="CONVERSATION_TURN_WAIT")  # seconds
+    
+    # Context token budgets per task type
+    CONVERSATION_CONTEXT_TOKENS: int = Field(default=1500, env="CONVERSATION_CONTEXT_TOKENS")
+    DOCUMENTATION_CONTEXT_TOKENS: int = Field(default=6000, env="DOCUMENTATION_CONTEXT_TOKENS")
+    
+    # Documentation job queue (stored in DATABASE_URL)
+    JOB_WORKERS: int = Field(default=2, env="JOB_WORKERS")
+    JOB_MAX_ATTEMPTS: int = Field(default=3, env="JOB_MAX_ATTEMPTS")
+    JOB_POLL_INTERVAL: float = Field(default=1.0, env="JOB_POLL_INTERVAL")  # seconds
+    JOB_LEASE_SECONDS: float = Field(default=60.0, env="JOB_LEASE_SECONDS")  # seconds without a heartbeat before a running job is requeued
+    
+    # Rolling conversation summary
+    SUMMARY_ENABLED: bool = Field(default=True, env="SUMMARY_ENABLED")
+    SUMMARY_INTERVAL_TURNS: int = Field(default=4, env="SUMMARY_INTERVAL_TURNS")  # turns folded per update
+    SUMMARY_KEEP_MESSAGES: int = Field(default=6, env="SUMMARY_KEEP_MESSAGES")  # latest messages kept verbatim
+    SUMMARY_MAX_WORDS: int = Field(default=250, env="SUMMARY_MAX_WORDS")
+    
+    # Conversation persistence
+    CONVERSATION_STORE: str = Field(default="memory", env="CONVERSATION_STORE")  # memory or sqlite
+    DATABASE_URL: str = Field(default_factory=_default_database_url, env="DATABASE_URL")  # also holds documentation jobs
+    STORE_FLUSH_INTERVAL: float = Field(default=0.05, env="STORE_FLUSH_INTERVAL")  # seconds between batches
+    STORE_BATCH_SIZE: int = Field(default=200, env="STORE_BATCH_SIZE")
+    
+    # Built project archives, cached on disk by content hash
+    ARCHIVE_CACHE_ENABLED: bool = Field(default=True, env="ARCHIVE_CACHE_ENABLED")
+    ARCHIVE_CACHE_DIR: str = Field(default=os.path.join(tempfile.gettempdir(), "project-architect-archives"),
+                                   env="ARCHIVE_CACHE_DIR")
+    ARCHIVE_CACHE_MAX_BYTES: int = Field(default=512 * 1024 * 1024, env="ARCHIVE_CACHE_MAX_BYTES")
+    ARCHIVE_COMPRESSION_WORKERS: int = Field(default=4, env="ARCHIVE_COMPRESSION_WORKERS")
+    MANIFEST_HISTORY: int = Field(default=5, env="MANIFEST_HISTORY")  # documentation versions kept for deltas
     
     # Logging
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
@@ -0,0 +1,56 @@
+"""
+Database engine and session setup for Web-Based Project Architect
+"""
+
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import declarative_base, sessionmaker, Session
+
+from app.core.config import settings
+
+Base = declarative_base()
+
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """WAL lets readers proceed during writes; NORMAL sync avoids an fsync per commit"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def init_database(database_url: Optional[str] = None) -> Engine:
+    """Create the engine and all tables"""
+    global _engine, _session_factory
+
+    if _engine is not None:
+        return _engine
+
+    database_url = database_url or settings.DATABASE_URL
+    is_sqlite = database_url.startswith("sqlite")
+
+    _engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False} if is_sqlite else {}
+    )
+    if is_sqlite:
+        event.listen(_engine, "connect", _configure_sqlite)
+
+    # Import models so they register on Base before create_all
+    from app.database import models  # noqa: F401
+    Base.metadata.create_all(_engine)
+
+    _session_factory = sessionmaker(bind=_engine, expire_on_commit=False)
+    return _engine
+
+
+def get_database() -> Session:
+    """Get a new database session"""
+    if _session_factory is None:
+        init_database()
+    return _session_factory()
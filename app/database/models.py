@@ -3,7 +3,7 @@ Database models for Web-Based Project Architect
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, JSON, Index
 from sqlalchemy.sql import func
 
 from .database import Base
@@ -28,13 +28,64 @@ class Conversation(Base):
     __tablename__ = "conversations"
     
     id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(String(36), unique=True, index=True)  # public UUID
     project_id = Column(Integer, index=True)
+    project_idea = Column(Text)
     phase = Column(String(100), default="project_idea")
-    messages = Column(JSON, default=list)
+    messages = Column(JSON, default=list)  # legacy blob; history lives in conversation_messages
+    state = Column(JSON, default=dict)  # timestamps, summary and other service fields
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
 
+class ConversationMessage(Base):
+    """Append-only conversation message log, one row per message"""
+    __tablename__ = "conversation_messages"
+    __table_args__ = (
+        Index("ix_conversation_messages_conversation_seq", "conversation_id", "seq", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(String(36), nullable=False)
+    seq = Column(Integer, nullable=False)  # 0-based position in the conversation
+    role = Column(String(20), nullable=False)
+    content = Column(Text, nullable=False)
+    timestamp = Column(Float)  # epoch seconds
+
+
+class ConversationDocumentation(Base):
+    """Latest generated documentation of a conversation, kept apart so turns do not rewrite it"""
+    __tablename__ = "conversation_documentation"
+    
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(String(36), unique=True, index=True, nullable=False)
+    documentation = Column(JSON)
+    manifests = Column(JSON)  # recent file manifests, for delta downloads
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class DocumentationJob(Base):
+    """Queued documentation generation; the payload is self-contained so jobs survive restarts"""
+    __tablename__ = "documentation_jobs"
+    __table_args__ = (
+        Index("ix_documentation_jobs_status_id", "status", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(36), unique=True, index=True, nullable=False)  # public UUID
+    conversation_id = Column(String(36), index=True)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    claimed_by = Column(String(64))  # worker process holding the lease while running
+    heartbeat_at = Column(DateTime)  # lease expires JOB_LEASE_SECONDS after the last heartbeat
+    payload = Column(JSON, nullable=False)
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
 class Document(Base):
     """Document model"""
     __tablename__ = "documents"
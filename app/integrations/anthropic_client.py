@@ -5,7 +5,7 @@ Uses the Anthropic Python client for direct API access
 
 import os
 import json
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator
 import structlog
 from dotenv import load_dotenv
 
@@ -13,9 +13,14 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from app.core.config import settings
+from app.integrations.http_transport import get_http_client
+from app.services.context_builder import build_context
 
 logger = structlog.get_logger(__name__)
 
+# Model behind conversation responses; part of the response cache key
+CONVERSATION_MODEL = "claude-3-5-sonnet-20241022"
+
 
 class AnthropicClient:
     """Direct Anthropic API client for project creation"""
@@ -39,8 +44,8 @@ class AnthropicClient:
         
         try:
             import anthropic
-            # Initialize client with explicit API key from environment
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            # Initialize async client on the shared connection pool
+            self.client = anthropic.AsyncAnthropic(api_key=self.api_key, http_client=get_http_client())
             logger.info("Anthropic client initialized successfully", api_key_length=len(self.api_key))
         except ImportError:
             logger.error("Anthropic package not installed. Run: pip install anthropic")
@@ -49,13 +54,17 @@ class AnthropicClient:
             logger.error(f"Failed to initialize Anthropic client: {e}")
             self.client = None
     
+    async def conversation_model(self) -> str:
+        """Model that serves conversation responses"""
+        return CONVERSATION_MODEL
+    
     async def generate_conversation_response(self, prompt: str, context: Dict[str, Any] = None) -> str:
         """Generate a natural conversation response from Claude"""
         
         try:
             # Simple, natural prompt to Claude
-            message = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
+            message = await self.client.messages.create(
+                model=CONVERSATION_MODEL,
                 max_tokens=512,
                 temperature=0.7,
                 messages=[{"role": "user", "content": prompt}]
@@ -67,8 +76,25 @@ class AnthropicClient:
             return response_text
             
         except Exception as e:
+            # Raise so MultiModelService can fall back or let a hedged request win
             logger.error(f"Error generating conversation response: {e}")
-            return "I'm having trouble responding right now. Please try again."
+            raise
+    
+    async def stream_conversation_response(self, prompt: str, context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """Stream a conversation response from Claude as text chunks"""
+        
+        stream = await self.client.messages.create(
+            model=CONVERSATION_MODEL,
+            max_tokens=512,
+            temperature=0.7,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True
+        )
+        
+        async for event in stream:
+            # Only text deltas carry tokens; other events are framing
+            if event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                yield event.delta.text
     
     async def test_api_key(self) -> bool:
         """Test if the API key is working"""
@@ -77,7 +103,7 @@ class AnthropicClient:
         
         try:
             # Make a simple test call
-            message = self.client.messages.create(
+            message = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=10,
                 messages=[
@@ -156,7 +182,7 @@ class AnthropicClient:
             """
             
             # Get response from Claude
-            message = self.client.messages.create(
+            message = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=4000,
                 temperature=0.7,
@@ -241,7 +267,7 @@ class AnthropicClient:
         """
         
         try:
-            message = self.client.messages.create(
+            message = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=2000,
                 temperature=0.3,
@@ -298,7 +324,7 @@ class AnthropicClient:
         """
         
         try:
-            message = self.client.messages.create(
+            message = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=4000,
                 temperature=0.7,
@@ -408,7 +434,7 @@ class AnthropicClient:
             Use ALL the information from the conversation to create relevant documentation. Make sure the documentation reflects what the user actually described about their project."""
             
             # Get comprehensive response from Claude
-            message = self.client.messages.create(
+            message = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=8000,
                 temperature=0.7,
@@ -422,7 +448,11 @@ class AnthropicClient:
             
         except Exception as e:
             logger.error(f"Error generating complete project: {e}")
-            return {"error": str(e)}
+            raise
+    
+    def _build_conversation_context(self, conversation_history: List[Any]) -> str:
+        """Build context string from conversation history within the documentation token budget"""
+        return build_context(conversation_history, "documentation")
     
     def _get_complete_project_instructions(self) -> str:
         """Get instructions for complete project generation"""
@@ -480,8 +510,4 @@ class AnthropicClient:
                 "claude_guide": {},
                 "deployment": {},
                 "raw_response": response_text
-            }
-
-
-# Global instance
-anthropic_client = AnthropicClient() 
\ No newline at end of file
+            } 
\ No newline at end of file
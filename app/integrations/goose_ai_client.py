@@ -5,34 +5,113 @@ Provides access to multiple AI models through GooseAI's unified API
 
 import os
 import json
-import requests
-from typing import Dict, List, Optional, Any
+import time
+import asyncio
+from typing import Dict, List, Optional, Any, AsyncIterator, Awaitable, Callable
 import structlog
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 # Load environment variables from .env file
 load_dotenv()
 
+from app.core.config import settings
+from app.integrations.http_transport import GOOSE_AI_BASE_URL, get_http_client
+from app.services.context_builder import build_context
+
 logger = structlog.get_logger(__name__)
 
 
+class EngineCatalogue:
+    """TTL-cached engine list with background refresh and single-flight loading
+    
+    A failed load is remembered for failure_backoff seconds: callers keep the last
+    good list (or get the error again, if there is none) instead of refetching.
+    """
+    
+    def __init__(self, fetch: Callable[[], Awaitable[List[str]]], ttl: float, failure_backoff: float = 30.0):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.failure_backoff = failure_backoff
+        self._engines: Optional[List[str]] = None
+        self._fetched_at = 0.0
+        self._error: Optional[BaseException] = None
+        self._failed_at = 0.0
+        self._load_task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0, "failures": 0, "backed_off": 0}
+    
+    async def get(self) -> List[str]:
+        """Return the engine list, loading it once if nothing is cached yet"""
+        if self._engines is not None:
+            self.stats["hits"] += 1
+            if time.monotonic() - self._fetched_at >= self.ttl and not self._backing_off():
+                # Serve the stale list now and refresh it in the background
+                self._start_load()
+            return self._engines
+        
+        self.stats["misses"] += 1
+        if self._backing_off():
+            self.stats["backed_off"] += 1
+            raise self._error
+        # Shield so one cancelled caller does not cancel the load for everyone else
+        return await asyncio.shield(self._start_load())
+    
+    def _backing_off(self) -> bool:
+        """Whether the last load failed recently enough that another would likely fail too"""
+        return self._error is not None and time.monotonic() - self._failed_at < self.failure_backoff
+    
+    def _start_load(self) -> asyncio.Task:
+        """Start a load unless one is already in flight"""
+        if self._load_task is None or self._load_task.done():
+            self._load_task = asyncio.ensure_future(self._load())
+            self._load_task.add_done_callback(self._on_load_done)
+        return self._load_task
+    
+    async def _load(self) -> List[str]:
+        self.stats["refreshes"] += 1
+        engines = await self._fetch()
+        self._engines = engines
+        self._fetched_at = time.monotonic()
+        self._error = None
+        return engines
+    
+    def _on_load_done(self, task: asyncio.Task):
+        # Retrieve the exception so background refresh failures are logged, not warned about
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["failures"] += 1
+            self._error = task.exception()
+            self._failed_at = time.monotonic()
+            logger.error("Failed to refresh GooseAI engine catalogue", error=str(task.exception()),
+                         serving_cached=self._engines is not None, retry_in=self.failure_backoff)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        age = time.monotonic() - self._fetched_at if self._engines is not None else None
+        return {
+            **self.stats,
+            "cached_engines": len(self._engines) if self._engines is not None else 0,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "ttl_seconds": self.ttl,
+            "last_error": str(self._error) if self._error is not None else None
+        }
+
+
 class GooseAIClient:
     """GooseAI client for accessing multiple AI models"""
     
     def __init__(self):
         # Load API key from environment variable
         self.api_key = os.getenv('GOOSE_AI_API_KEY')
-        self.base_url = "https://api.goose.ai/v1"
+        self.base_url = GOOSE_AI_BASE_URL
         self.available = bool(self.api_key)
         
         # Configure OpenAI client for GooseAI
         if self.available:
             try:
-                self.client = OpenAI(
+                self.client = AsyncOpenAI(
                     api_key=self.api_key,
                     base_url=self.base_url,
-                    http_client=None  # Let OpenAI create its own client without proxies
+                    http_client=get_http_client()  # Share the pooled transport with other providers
                 )
                 logger.info("GooseAI client initialized successfully", api_key_length=len(self.api_key) if self.api_key else 0)
             except Exception as e:
@@ -42,36 +121,46 @@ class GooseAIClient:
         else:
             self.client = None
             logger.warning("GooseAI client not available - missing API key")
+        
+        # Engine list shared by model selection, key tests and model listing
+        self.engine_catalogue = EngineCatalogue(
+            self._fetch_engines,
+            settings.GOOSE_AI_ENGINE_CACHE_TTL,
+            failure_backoff=settings.GOOSE_AI_ENGINE_FAILURE_BACKOFF
+        )
+    
+    async def _fetch_engines(self) -> List[str]:
+        """Fetch the engine list from GooseAI using direct API call"""
+        # Use direct HTTP request to get engines (GooseAI's term for models)
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        response = await get_http_client().get(f"{self.base_url}/engines", headers=headers, timeout=30.0)
+        
+        if response.status_code != 200:
+            raise Exception(f"{response.status_code} - {response.text}")
+        
+        engines_data = response.json()
+        engines = engines_data.get("data", [])
+        return [engine.get("id") for engine in engines if engine.get("id")]
     
-    def _get_available_models(self) -> List[str]:
-        """Get list of available models from GooseAI using direct API call"""
+    async def _get_available_models(self) -> List[str]:
+        """Get list of available models from the cached engine catalogue"""
         try:
             if not self.available or not self.api_key:
                 return []
             
-            # Use direct HTTP request to get engines (GooseAI's term for models)
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.get(f"{self.base_url}/engines", headers=headers)
-            
-            if response.status_code == 200:
-                engines_data = response.json()
-                engines = engines_data.get("data", [])
-                return [engine.get("id") for engine in engines if engine.get("id")]
-            else:
-                logger.error(f"Failed to get engines: {response.status_code} - {response.text}")
-                return []
+            return await self.engine_catalogue.get()
                 
         except Exception as e:
             logger.error("Failed to get available models", error=str(e))
             return []
     
-    def _select_best_model(self, task_type: str = "conversation") -> str:
+    async def _select_best_model(self, task_type: str = "conversation") -> str:
         """Select the best model for the given task"""
-        available_models = self._get_available_models()
+        available_models = await self._get_available_models()
         
         # Model selection logic based on task type
         model_preferences = {
@@ -91,6 +180,10 @@ class GooseAIClient:
         # Fallback to first available model
         return available_models[0] if available_models else "gpt-j-6b"
     
+    async def conversation_model(self) -> str:
+        """Engine that serves conversation responses"""
+        return await self._select_best_model("conversation")
+    
     async def generate_conversation_response(self, prompt: str, context: Dict[str, Any] = None) -> str:
         """Generate a natural conversation response using GooseAI"""
         
@@ -99,7 +192,7 @@ class GooseAIClient:
         
         try:
             # Select appropriate model for conversation
-            model = self._select_best_model("conversation")
+            model = await self._select_best_model("conversation")
             
             # Build the full prompt with context
             full_prompt = prompt
@@ -108,7 +201,7 @@ class GooseAIClient:
                 full_prompt = f"Context: {json.dumps(history, indent=2)}\n\nUser: {prompt}\n\nAssistant:"
             
             # Generate response using GooseAI's completion API
-            response = self.client.completions.create(
+            response = await self.client.completions.create(
                 model=model,
                 prompt=full_prompt,
                 max_tokens=512,
@@ -118,7 +211,32 @@ class GooseAIClient:
                 
         except Exception as e:
             logger.error("GooseAI generation failed", error=str(e))
-            return "I'm having trouble responding right now. Please try again."
+            raise
+    
+    async def stream_conversation_response(self, prompt: str, context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """Stream a conversation response from GooseAI as text chunks"""
+        
+        if not self.available or not self.client:
+            raise Exception("GooseAI not available - missing API key")
+        
+        model = await self._select_best_model("conversation")
+        
+        full_prompt = prompt
+        if context and context.get("conversation_history"):
+            history = context["conversation_history"]
+            full_prompt = f"Context: {json.dumps(history, indent=2)}\n\nUser: {prompt}\n\nAssistant:"
+        
+        stream = await self.client.completions.create(
+            model=model,
+            prompt=full_prompt,
+            max_tokens=512,
+            temperature=0.7,
+            stream=True
+        )
+        
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].text:
+                yield chunk.choices[0].text
     
     async def generate_complete_project(self, project_idea: str, conversation_history: List[Dict]) -> Dict[str, Any]:
         """Generate complete project documentation using GooseAI"""
@@ -128,7 +246,7 @@ class GooseAIClient:
         
         try:
             # Select appropriate model for documentation
-            model = self._select_best_model("documentation")
+            model = await self._select_best_model("documentation")
             
             # Build context from conversation history
             context = self._build_context(conversation_history)
@@ -167,7 +285,7 @@ Please provide the documentation in this JSON format:
 Use ALL the information from the conversation to create relevant documentation. Make sure the documentation reflects what the user actually described about their project."""
 
             # Generate response using GooseAI's completion API
-            response = self.client.completions.create(
+            response = await self.client.completions.create(
                 model=model,
                 prompt=prompt,
                 max_tokens=4000,
@@ -180,30 +298,11 @@ Use ALL the information from the conversation to create relevant documentation.
             
         except Exception as e:
             logger.error("Failed to generate complete project with GooseAI", error=str(e))
-            return {
-                "project_name": "Project",
-                "overview": "Documentation generation failed. Please try again.",
-                "setup_guide": "",
-                "implementation_guide": "",
-                "backend": "",
-                "frontend": "",
-                "config": "",
-                "dependencies": [],
-                "github_issues": []
-            }
+            raise
     
-    def _build_context(self, conversation_history: List[Dict]) -> str:
-        """Build context string from conversation history"""
-        if not conversation_history:
-            return "No previous conversation."
-        
-        context_parts = []
-        for i, message in enumerate(conversation_history[-10:], 1):  # Last 10 messages
-            role = message.get("role", "user")
-            content = message.get("content", "")
-            context_parts.append(f"{i}. {role.title()}: {content}")
-        
-        return "\n".join(context_parts)
+    def _build_context(self, conversation_history: List[Any]) -> str:
+        """Build context string from conversation history within the documentation token budget"""
+        return build_context(conversation_history, "documentation")
     
     def _parse_response(self, response_text: str) -> Dict[str, Any]:
         """Parse GooseAI response into structured format"""
@@ -249,31 +348,16 @@ Use ALL the information from the conversation to create relevant documentation.
             return {"status": "missing", "message": "No API key configured"}
         
         try:
-            # Test by listing engines using direct API call
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.get(f"{self.base_url}/engines", headers=headers)
+            # Test by listing engines through the shared catalogue
+            engines = await self.engine_catalogue.get()
+            engine_count = len(engines)
             
-            if response.status_code == 200:
-                engines_data = response.json()
-                engines = engines_data.get("data", [])
-                engine_count = len(engines)
-                
-                logger.info("GooseAI API key test successful", engine_count=engine_count)
-                return {
-                    "status": "valid",
-                    "message": f"Connected successfully. {engine_count} engines available.",
-                    "engines": [engine.get("id") for engine in engines if engine.get("id")]
-                }
-            else:
-                logger.error(f"GooseAI API test failed: {response.status_code} - {response.text}")
-                return {
-                    "status": "invalid",
-                    "message": f"Connection failed: {response.status_code} - {response.text}"
-                }
+            logger.info("GooseAI API key test successful", engine_count=engine_count)
+            return {
+                "status": "valid",
+                "message": f"Connected successfully. {engine_count} engines available.",
+                "engines": engines
+            }
             
         except Exception as e:
             logger.error("GooseAI API key test failed", error=str(e))
@@ -284,7 +368,7 @@ Use ALL the information from the conversation to create relevant documentation.
     
     async def get_available_models(self) -> List[str]:
         """Get list of available models"""
-        return self._get_available_models()
+        return await self._get_available_models()
     
     async def is_available(self) -> bool:
         """Check if GooseAI is available"""
@@ -9,11 +9,13 @@ import asyncio
 from typing import Dict, List, Optional, Any, Callable
 import structlog
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 # Load environment variables
 load_dotenv()
 
+from app.integrations.http_transport import GOOSE_AI_BASE_URL, get_http_client
+
 logger = structlog.get_logger(__name__)
 
 
@@ -23,14 +25,15 @@ class GooseAIMCPClient:
     def __init__(self):
         # Load API key from environment variable
         self.api_key = os.getenv('GOOSE_AI_API_KEY')
-        self.base_url = "https://api.goose.ai/v1"
+        self.base_url = GOOSE_AI_BASE_URL
         self.available = bool(self.api_key)
         
         # Configure OpenAI client for GooseAI
         if self.available:
-            self.client = OpenAI(
+            self.client = AsyncOpenAI(
                 api_key=self.api_key,
-                base_url=self.base_url
+                base_url=self.base_url,
+                http_client=get_http_client()
             )
             logger.info("GooseAI MCP client initialized successfully", api_key_length=len(self.api_key) if self.api_key else 0)
         else:
@@ -321,7 +324,7 @@ Format as markdown."""
             # Select best model for the task
             model = "gpt-j-6b"  # Default to gpt-j-6b for tool execution
             
-            response = self.client.completions.create(
+            response = await self.client.completions.create(
                 model=model,
                 prompt=prompt,
                 max_tokens=2000,
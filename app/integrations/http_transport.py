@@ -0,0 +1,71 @@
+"""
+Shared HTTP transport for all provider integrations
+One pooled, keep-alive httpx client reused by Anthropic, GooseAI and direct API calls
+"""
+
+import asyncio
+import importlib.util
+from typing import List, Optional
+import httpx
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+ANTHROPIC_BASE_URL = "https://api.anthropic.com"
+GOOSE_AI_BASE_URL = "https://api.goose.ai/v1"
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_supported() -> bool:
+    """HTTP/2 needs the optional h2 package"""
+    return settings.HTTP_ENABLE_HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the process-wide pooled HTTP client, creating it on first use"""
+    global _http_client
+
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=_http2_supported(),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT)
+        )
+        logger.info("Shared HTTP client created",
+                   http2=_http2_supported(),
+                   max_connections=settings.HTTP_MAX_CONNECTIONS,
+                   max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS)
+
+    return _http_client
+
+
+async def preconnect(urls: List[str] = None):
+    """Open pooled connections ahead of the first real request"""
+    urls = urls or [ANTHROPIC_BASE_URL, GOOSE_AI_BASE_URL]
+    client = get_http_client()
+
+    async def _connect(url: str):
+        try:
+            # Any response means TCP and TLS are established and the connection is pooled
+            await client.head(url, timeout=settings.HTTP_CONNECT_TIMEOUT)
+        except Exception as e:
+            logger.warning("Pre-connect failed", url=url, error=str(e))
+
+    await asyncio.gather(*(_connect(url) for url in urls))
+    logger.info("Pre-connected provider endpoints", urls=urls)
+
+
+async def close_http_client():
+    """Close the shared HTTP client and its pooled connections"""
+    global _http_client
+
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
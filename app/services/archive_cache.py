@@ -0,0 +1,143 @@
+"""
+Content-addressed on-disk cache of built project archives
+Archives are keyed by a hash of what goes into them and evicted least-recently-used by total size
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Any, Callable, Iterator, List, Tuple
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def archive_key(complete_project: Dict[str, Any], *metadata: Any) -> str:
+    """Hash of the normalized project payload plus any metadata baked into the archive"""
+    normalized = json.dumps([complete_project, *metadata], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class ArchiveCache:
+    """Directory of archives named by key, evicted least-recently-used by modification time
+
+    Keys are file names, so callers put the archive format's extension in the key.
+    Several worker processes may share the directory: a hit touches the file's
+    mtime, and eviction rescans the directory, so max_bytes bounds the directory
+    as a whole rather than each process's share of it.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._building: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index(self._scan())
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """(mtime, key, size) of every archive in the directory, least recently used first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            # Skip archives being written, or half-written by a crashed build
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                # Evicted by another worker since listdir
+                continue
+            entries.append((stat.st_mtime, name, stat.st_size))
+        return sorted(entries)
+
+    def _load_index(self, entries: List[Tuple[float, str, int]]):
+        self._index.clear()
+        self._total_bytes = 0
+        for _, key, size in entries:
+            self._index[key] = size
+            self._total_bytes += size
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    async def get_or_build(self, key: str, build: Callable[[], Iterator[bytes]]) -> str:
+        """Path of the cached archive, building it on a worker thread on a miss"""
+        path = self.path_for(key)
+        try:
+            # Also finds archives another worker built; the touch marks it recently used for every worker
+            os.utime(path)
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            pass
+        else:
+            self._total_bytes += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self.stats["hits"] += 1
+            return path
+
+        # Concurrent misses for the same archive share one build
+        building = self._building.get(key)
+        if building is None:
+            self.stats["misses"] += 1
+            building = asyncio.ensure_future(asyncio.to_thread(self._write, key, build))
+            self._building[key] = building
+            building.add_done_callback(lambda _: self._building.pop(key, None))
+        await asyncio.shield(building)
+
+        # Other workers add and evict archives too, so evict from what is on disk
+        self._load_index(await asyncio.to_thread(self._scan))
+        self._evict(keep=key)
+        return self.path_for(key)
+
+    async def open(self, key: str, build: Callable[[], Iterator[bytes]]) -> BinaryIO:
+        """Open the cached archive, building it first on a miss
+
+        The file is opened before control returns to the event loop, so a
+        concurrent eviction can only unlink it under the open handle.
+        """
+        return open(await self.get_or_build(key, build), "rb")
+
+    def _write(self, key: str, build: Callable[[], Iterator[bytes]]):
+        # Write beside the final path and rename, so readers never see a partial archive
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                for chunk in build():
+                    tmp_file.write(chunk)
+            os.replace(tmp_path, self.path_for(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _evict(self, keep: str):
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            if key == keep:
+                self._index.move_to_end(key)
+                continue
+            size = self._index.pop(key)
+            self._total_bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                # An in-progress download keeps its open file descriptor
+                os.unlink(self.path_for(key))
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.stats["hits"],
+            "misses": self.stats["misses"],
+            "hit_rate": round(self.stats["hits"] / lookups * 100, 2) if lookups else 0,
+            "evictions": self.stats["evictions"]
+        }
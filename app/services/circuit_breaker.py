@@ -0,0 +1,108 @@
+"""
+Per-provider circuit breaker
+Stops sending requests to a failing provider and probes it again after a cool-down
+"""
+
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's circuit is open"""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker driven by consecutive failures"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        # Open circuits move to half-open lazily once the cool-down has passed
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self._transition(self.HALF_OPEN)
+        return self._state
+
+    def is_available(self) -> bool:
+        """Whether a request would currently be let through"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN:
+            return self.half_open_calls < self.half_open_max_calls
+        return False
+
+    def _transition(self, state: str):
+        if state == self._state:
+            return
+        logger.info("Circuit breaker state change", provider=self.name, old_state=self._state, new_state=state)
+        self._state = state
+        self.half_open_calls = 0
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+            self.stats["opened"] += 1
+        elif state == self.CLOSED:
+            self.consecutive_failures = 0
+
+    def _record_success(self):
+        self.consecutive_failures = 0
+        if self._state == self.HALF_OPEN:
+            self._transition(self.CLOSED)
+
+    def _record_failure(self):
+        self.consecutive_failures += 1
+        if self._state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(self.OPEN)
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """Admit one call through the breaker and record its outcome"""
+        if not self.is_available():
+            self.stats["rejected"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is {self.state}")
+
+        probing = self._state == self.HALF_OPEN
+        if probing:
+            self.half_open_calls += 1
+        try:
+            yield
+        except Exception:
+            self._record_failure()
+            raise
+        except BaseException:
+            # Cancelled (e.g. a losing hedge): no verdict on the provider's health
+            if probing and self._state == self.HALF_OPEN:
+                self.half_open_calls -= 1
+            raise
+        else:
+            self._record_success()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters"""
+        state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.stats["opened"],
+            "rejected": self.stats["rejected"],
+            "retry_in": round(max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 1)
+            if state == self.OPEN else 0
+        }
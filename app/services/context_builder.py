@@ -0,0 +1,134 @@
+"""
+Token-budgeted conversation context
+Shared by the conversation service and the provider clients so prompt size stays bounded
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from app.core.config import settings
+from app.services.message import Message
+
+HistoryMessage = Union[Message, Dict[str, Any]]
+
+# Role label, separator and newline around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARKER = "..."
+
+# Messages with this role carry a rolling summary; they are always kept and rendered first
+SUMMARY_ROLE = "summary"
+_ROLE_LABELS = {"user": "User", "assistant": "Assistant", SUMMARY_ROLE: "Summary of earlier conversation"}
+
+_WORD = re.compile(r"[a-z0-9]{4,}")
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count, about 4 characters per token"""
+    return (len(text) + 3) // 4
+
+
+def context_budget(task_type: str) -> int:
+    """Token budget for the conversation context of a task type"""
+    budgets = {
+        "conversation": settings.CONVERSATION_CONTEXT_TOKENS,
+        "documentation": settings.DOCUMENTATION_CONTEXT_TOKENS
+    }
+    return budgets.get(task_type, settings.CONVERSATION_CONTEXT_TOKENS)
+
+
+def message_fields(message: HistoryMessage) -> Tuple[str, str]:
+    if isinstance(message, Message):
+        return message.role, message.content
+    return message.get("role", "user"), str(message.get("content", ""))
+
+
+def message_tokens(message: HistoryMessage) -> int:
+    """Token count of a message's content, computed once per Message"""
+    if isinstance(message, Message):
+        if message.tokens is None:
+            message.tokens = count_tokens(message.content)
+        return message.tokens
+    return count_tokens(message_fields(message)[1])
+
+
+def _terms(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def select_context(messages: Sequence[HistoryMessage], budget: int,
+                   query: Optional[str] = None) -> List[Tuple[HistoryMessage, Optional[int]]]:
+    """Pick messages that fit the budget, in chronological order
+
+    Summary messages are reserved first. The newest messages are then taken
+    whole until one no longer fits, and the remaining budget goes to older
+    messages that share the most words with the query. Returns
+    (message, truncate_to_tokens) pairs; only a newest message larger than the
+    whole budget is truncated.
+    """
+    selected: Dict[int, Optional[int]] = {}
+    remaining = budget
+
+    for i, message in enumerate(messages):
+        if message_fields(message)[0] == SUMMARY_ROLE:
+            cost = message_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+            if cost > remaining // 2:
+                # A summary never takes more than half the budget
+                selected[i] = max(remaining // 2 - MESSAGE_OVERHEAD_TOKENS, 1)
+                remaining -= remaining // 2
+            else:
+                selected[i] = None
+                remaining -= cost
+    pinned = set(selected)
+
+    index = len(messages) - 1
+    while index >= 0:
+        if index in pinned:
+            index -= 1
+            continue
+        cost = message_tokens(messages[index]) + MESSAGE_OVERHEAD_TOKENS
+        if cost > remaining:
+            if len(selected) == len(pinned) and remaining > MESSAGE_OVERHEAD_TOKENS:
+                selected[index] = remaining - MESSAGE_OVERHEAD_TOKENS
+                remaining = 0
+            break
+        selected[index] = None
+        remaining -= cost
+        index -= 1
+
+    # Older turns that did not make the recency cut, most relevant first
+    if query and index > 0 and remaining > MESSAGE_OVERHEAD_TOKENS:
+        query_terms = _terms(query)
+        if query_terms:
+            scored = []
+            for older in range(index):
+                if older in pinned:
+                    continue
+                overlap = len(query_terms & _terms(message_fields(messages[older])[1]))
+                if overlap:
+                    scored.append((overlap, older))
+            for _, older in sorted(scored, reverse=True):
+                cost = message_tokens(messages[older]) + MESSAGE_OVERHEAD_TOKENS
+                if cost <= remaining:
+                    selected[older] = None
+                    remaining -= cost
+
+    return [(messages[i], selected[i]) for i in sorted(selected)]
+
+
+def build_context(messages: Sequence[HistoryMessage], task_type: str,
+                  query: Optional[str] = None, budget: Optional[int] = None) -> str:
+    """Format the budgeted context as "Role: content" lines"""
+    if not messages:
+        return "No previous conversation."
+
+    lines = []
+    for message, truncate_to in select_context(messages, budget or context_budget(task_type), query):
+        role, content = message_fields(message)
+        if truncate_to is not None:
+            if role == SUMMARY_ROLE:
+                content = content[:truncate_to * 4] + TRUNCATION_MARKER
+            else:
+                # Keep the end of the message; for a long answer the conclusion matters most
+                content = TRUNCATION_MARKER + content[-truncate_to * 4:]
+        lines.append(f"{_ROLE_LABELS.get(role, role.title())}: {content}")
+    return "\n".join(lines)
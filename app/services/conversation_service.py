@@ -3,60 +3,101 @@ Multi-Model Conversation Service
 Uses both Anthropic (Claude) and GooseAI for optimal performance
 """
 
+import asyncio
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Optional
 from datetime import datetime
 import structlog
 
-from app.services.multi_model_service import MultiModelService
+from app.core.config import settings
+from app.services.multi_model_service import MultiModelService, FALLBACK_RESPONSE, FALLBACK_PROJECT
+from app.services.idea_index import IdeaIndex
+from app.services.expiry_index import ExpiryIndex
+from app.services.message import Message
+from app.services.turn_lock import TurnLocks
+from app.services.context_builder import build_context, SUMMARY_ROLE
+from app.services.doc_intent import detect_documentation_intent
+from app.services.job_queue import DocumentationJobQueue
+from app.services.project_archive import build_manifest
+from app.services.conversation_store import ConversationStore, create_conversation_store
 
 logger = structlog.get_logger(__name__)
 
+# Closes a turn whose response failed or was abandoned, after any text the client already received
+INTERRUPTED_NOTE = "[Response interrupted]"
+
 
 class ConversationService:
     """Service that uses multiple AI models for natural conversation"""
     
-    def __init__(self):
-        self.multi_model_service = MultiModelService()
+    def __init__(self, multi_model_service: Optional[MultiModelService] = None,
+                 store: Optional[ConversationStore] = None):
+        self.multi_model_service = multi_model_service or MultiModelService()
+        # Working set of active conversations, backed by the configured store
         self.conversations: Dict[str, Dict[str, Any]] = {}
+        self.store = store or create_conversation_store()
+        
+        # Idle conversations leave the working set from a background sweep
+        self.expiry_index = ExpiryIndex()
+        self._expiry_task: Optional[asyncio.Task] = None
+        self.expiry_stats = {"sweeps": 0, "expired": 0}
+        
+        # Turns of one conversation run one at a time; other conversations are unaffected
+        self.turn_locks = TurnLocks(
+            max_queued=settings.CONVERSATION_MAX_QUEUED_TURNS,
+            max_wait=settings.CONVERSATION_TURN_WAIT
+        )
+        
+        # Rolling summaries are refreshed off the request path, one task per conversation
+        self._summary_tasks: Dict[str, asyncio.Task] = {}
+        self.summary_stats = {"started": 0, "applied": 0, "discarded": 0, "failed": 0}
+        
+        # Documentation is generated by background workers; a turn only enqueues it
+        self.job_queue = DocumentationJobQueue(
+            database_url=settings.DATABASE_URL,
+            workers=settings.JOB_WORKERS,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            poll_interval=settings.JOB_POLL_INTERVAL,
+            lease_seconds=settings.JOB_LEASE_SECONDS
+        )
+        
+        # Near-duplicate project ideas share initial responses and early documentation
+        self.idea_index = IdeaIndex(
+            similarity_threshold=settings.IDEA_CACHE_SIMILARITY,
+            max_entries=settings.IDEA_CACHE_MAX_ENTRIES
+        ) if settings.IDEA_CACHE_ENABLED else None
+    
+    async def start(self):
+        """Open the store and start the documentation workers, resuming unfinished jobs"""
+        await self.store.start()
+        await self.job_queue.start(self._run_documentation_job)
     
-    async def start_conversation(self, project_idea: str) -> Dict[str, Any]:
+    async def close(self):
+        """Stop background work and flush the store"""
+        await self.stop_expiry_sweeper()
+        await self.cancel_summary_updates()
+        await self.job_queue.close()
+        await self.store.close()
+    
+    async def start_conversation(self, project_idea: str, bypass_cache: bool = False) -> Dict[str, Any]:
         """Start a natural conversation about the project"""
-        conversation_id = str(uuid.uuid4())
-
-        logger.info(f"Starting conversation for project idea: {project_idea}")
-        
-        # Create conversation
-        conversation = {
-            "id": conversation_id,
-            "project_idea": project_idea,
-            "messages": [],
-            "started_at": datetime.utcnow().isoformat(),
-            "last_activity": datetime.utcnow().isoformat(),
-            "phase": "conversation"
-        }
+        conversation = self._create_conversation(project_idea)
+        conversation_id = conversation["id"]
 
         logger.info(f"Conversation created: {conversation}")
         
-        # Let AI respond naturally to the project idea
-        initial_response = await self.multi_model_service.generate_conversation_response(
-            f"""You are a helpful AI assistant. A user wants to build: {project_idea}
-
-Respond naturally and helpfully. Understand their project and be ready to help them with documentation when they ask for it."""
-        )
+        initial_response = self._cached_initial_response(conversation, bypass_cache)
+        if initial_response is None:
+            # Let AI respond naturally to the project idea
+            initial_response = await self.multi_model_service.generate_conversation_response(
+                self._initial_prompt(project_idea),
+                bypass_cache=bypass_cache
+            )
+            self._remember_idea(conversation, initial_response)
 
         logger.info(f"Initial response: {initial_response}")
         
-        # Add messages
-        conversation["messages"].extend([
-            {"role": "user", "content": project_idea, "timestamp": datetime.utcnow().isoformat()},
-            {"role": "assistant", "content": initial_response, "timestamp": datetime.utcnow().isoformat()}
-        ])
-
-        logger.info(f"Messages added: {conversation['messages']}")
-        
-        # Store conversation
-        self.conversations[conversation_id] = conversation
+        self._store_initial_turn(conversation, initial_response)
         
         logger.info("Started conversation", conversation_id=conversation_id, project_idea=project_idea)
         
@@ -66,38 +107,167 @@ Respond naturally and helpfully. Understand their project and be ready to help t
             "phase": "conversation"
         }
     
-    async def continue_conversation(self, conversation_id: str, user_message: str) -> Dict[str, Any]:
+    async def stream_start_conversation(self, project_idea: str, bypass_cache: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Start a conversation and stream the initial response as events"""
+        conversation = self._create_conversation(project_idea)
+        conversation_id = conversation["id"]
+        
+        yield {"type": "start", "conversation_id": conversation_id, "phase": "conversation"}
+        
+        initial_response = self._cached_initial_response(conversation, bypass_cache)
+        if initial_response is not None:
+            yield {"type": "token", "text": initial_response}
+        else:
+            chunks = []
+            try:
+                async for chunk in self.multi_model_service.stream_conversation_response(
+                    self._initial_prompt(project_idea),
+                    bypass_cache=bypass_cache
+                ):
+                    chunks.append(chunk)
+                    yield {"type": "token", "text": chunk}
+            except BaseException:
+                # The client already has the conversation id, so keep the conversation it refers to
+                self._store_initial_turn(conversation, self._interrupted_response(chunks))
+                raise
+            
+            initial_response = "".join(chunks)
+            self._remember_idea(conversation, initial_response)
+        
+        self._store_initial_turn(conversation, initial_response)
+        
+        logger.info("Started streamed conversation", conversation_id=conversation_id, response_length=len(initial_response))
+        
+        yield {"type": "done", "conversation_id": conversation_id, "phase": "conversation"}
+    
+    async def continue_conversation(self, conversation_id: str, user_message: str,
+                                    bypass_cache: bool = False) -> Dict[str, Any]:
         """Continue natural conversation with Claude"""
         
-        if conversation_id not in self.conversations:
+        async with self.turn_locks.hold(conversation_id):
+            conversation = await self._load_conversation(conversation_id)
+            if conversation is not None:
+                prompt = await self._prepare_turn(conversation, user_message)
+                try:
+                    response = await self.multi_model_service.generate_conversation_response(prompt, bypass_cache=bypass_cache)
+                except BaseException:
+                    self._finish_turn(conversation, self._interrupted_response([]))
+                    raise
+                
+                self._finish_turn(conversation, response)
+        
+        if conversation is None:
+            # Fallback: start new conversation
+            return await self.start_conversation(user_message, bypass_cache=bypass_cache)
+        
+        logger.info("Continued conversation", conversation_id=conversation_id, response_length=len(response))
+        
+        return {
+            "conversation_id": conversation_id,
+            "response": response,
+            "phase": conversation["phase"],
+            "job_id": conversation.get("documentation_job")
+        }
+    
+    async def stream_continue_conversation(self, conversation_id: str, user_message: str,
+                                           bypass_cache: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Continue a conversation and stream the assistant response as events"""
+        
+        async with self.turn_locks.hold(conversation_id):
+            conversation = await self._load_conversation(conversation_id)
+            if conversation is not None:
+                yield {"type": "start", "conversation_id": conversation_id, "phase": conversation["phase"]}
+                
+                prompt = await self._prepare_turn(conversation, user_message)
+                
+                chunks = []
+                try:
+                    async for chunk in self.multi_model_service.stream_conversation_response(prompt, bypass_cache=bypass_cache):
+                        chunks.append(chunk)
+                        yield {"type": "token", "text": chunk}
+                except BaseException:
+                    # Provider failure or client disconnect: the user message is already in the history
+                    self._finish_turn(conversation, self._interrupted_response(chunks))
+                    raise
+                
+                response = "".join(chunks)
+                self._finish_turn(conversation, response)
+        
+        if conversation is None:
             # Fallback: start new conversation
-            return await self.start_conversation(user_message)
+            async for event in self.stream_start_conversation(user_message, bypass_cache=bypass_cache):
+                yield event
+            return
+        
+        logger.info("Continued streamed conversation", conversation_id=conversation_id, response_length=len(response))
+        
+        yield {"type": "done", "conversation_id": conversation_id, "phase": conversation["phase"],
+               "job_id": conversation.get("documentation_job")}
+    
+    def _create_conversation(self, project_idea: str) -> Dict[str, Any]:
+        """Create a new, not yet stored, conversation record"""
+        conversation_id = str(uuid.uuid4())
+
+        logger.info(f"Starting conversation for project idea: {project_idea}")
+        
+        return {
+            "id": conversation_id,
+            "project_idea": project_idea,
+            "messages": [],
+            "started_at": datetime.utcnow().isoformat(),
+            "last_activity": datetime.utcnow().isoformat(),
+            "phase": "conversation"
+        }
+    
+    def _initial_prompt(self, project_idea: str) -> str:
+        """Build the prompt for the first assistant response"""
+        return f"""You are a helpful AI assistant. A user wants to build: {project_idea}
+
+Respond naturally and helpfully. Understand their project and be ready to help them with documentation when they ask for it."""
+    
+    def _store_initial_turn(self, conversation: Dict[str, Any], initial_response: str):
+        """Add the opening exchange and store the conversation"""
+        self._append_message(conversation, "user", conversation["project_idea"])
+        self._append_message(conversation, "assistant", initial_response)
+
+        logger.info(f"Messages added: {conversation['messages']}")
         
-        conversation = self.conversations[conversation_id]
+        self._activate(conversation)
+        self.store.save(conversation)
+    
+    async def _prepare_turn(self, conversation: Dict[str, Any], user_message: str) -> str:
+        """Record the user message, generate documentation if asked, and return the response prompt"""
         
         # Add user message
-        conversation["messages"].append({
-            "role": "user", 
-            "content": user_message, 
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        self._append_message(conversation, "user", user_message)
         
         # Check if user wants documentation
-        if self._should_generate_documentation(user_message):
-            try:
-                # Generate documentation
-                documentation = await self.multi_model_service.generate_complete_project(
-                    conversation["project_idea"],
-                    conversation["messages"]
-                )
+        if self._should_generate_documentation(conversation, user_message):
+            documentation = self._cached_documentation(conversation)
+            if documentation is None:
+                try:
+                    job_id = await self._enqueue_documentation(conversation)
+                except Exception as e:
+                    logger.error(f"Error queueing documentation: {e}")
+                    return f"""I encountered an issue creating the documentation. Let me try again or you can ask me to generate it later."""
                 
-                # Store documentation
-                conversation["documentation"] = documentation
-                conversation["phase"] = "documentation_generated"
-                
-                # Generate response about the documentation
-                response = await self.multi_model_service.generate_conversation_response(
-                    f"""Perfect! I've created documentation for your project: {documentation.get('project_name', 'Project')}
+                # Prompt a response about the queued documentation
+                return f"""Great! I've started creating documentation for your project: {conversation['project_idea']}
+
+Your docs/ folder will include:
+- Project overview
+- Backend and frontend guides
+- Setup instructions
+- Implementation guide
+
+It is being generated in the background (job {job_id}) and will be ready for download shortly."""
+            
+            # Store documentation
+            self._store_documentation(conversation, documentation)
+            conversation["phase"] = "documentation_generated"
+            
+            # Prompt a response about the documentation
+            return f"""Perfect! I've created documentation for your project: {documentation.get('project_name', 'Project')}
 
 Your docs/ folder includes:
 - Project overview
@@ -106,89 +276,405 @@ Your docs/ folder includes:
 - Implementation guide
 
 The documentation is ready for download!"""
-                )
-            except Exception as e:
-                logger.error(f"Error generating documentation: {e}")
-                response = await self.multi_model_service.generate_conversation_response(
-                    f"""I encountered an issue creating the documentation. Let me try again or you can ask me to generate it later."""
-                )
-        else:
-            # Continue natural conversation
-            context = self._build_context(conversation)
-            
-            response = await self.multi_model_service.generate_conversation_response(
-                f"""You are a helpful AI assistant continuing a conversation about a project.
+        
+        # Continue natural conversation
+        context = self._build_context(conversation, query=user_message)
+        
+        return f"""You are a helpful AI assistant continuing a conversation about a project.
 
 Project: {conversation['project_idea']}
 Recent conversation: {context}
 User's input: {user_message}
 
 Respond naturally and helpfully. If they ask for documentation, solutions, or help with implementation, be ready to help."""
+    
+    def _shared_idea_cache_id(self, conversation: Dict[str, Any]) -> Optional[int]:
+        """Idea cache entry whose documentation this conversation may share"""
+        # Docs depend on the whole history, so they are shared only when the user asked right after the idea
+        idea_only = not conversation.get("message_offset") and \
+            sum(1 for msg in conversation["messages"] if msg.role == "user") <= 2
+        return conversation.get("idea_cache_id") if self.idea_index and idea_only else None
+    
+    def _cached_documentation(self, conversation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Documentation of a similar idea, when only the idea is known"""
+        idea_cache_id = self._shared_idea_cache_id(conversation)
+        cached = self.idea_index.get(idea_cache_id) if idea_cache_id is not None else None
+        if cached and cached.get("documentation"):
+            logger.info("Reusing documentation from similar project idea", conversation_id=conversation["id"])
+            return cached["documentation"]
+        return None
+    
+    async def _enqueue_documentation(self, conversation: Dict[str, Any]) -> str:
+        """Queue documentation generation for the conversation's current state"""
+        if conversation.get("documentation_job"):
+            return conversation["documentation_job"]
+        
+        # Everything the worker needs, so the job can run after a restart
+        payload = {
+            "project_idea": conversation["project_idea"],
+            "history": [msg.to_dict() for msg in self._context_messages(conversation)],
+            "idea_cache_id": self._shared_idea_cache_id(conversation)
+        }
+        
+        # Recorded before the job is claimable: a worker may attach the result before enqueue() returns
+        job_id = str(uuid.uuid4())
+        previous_phase = conversation["phase"]
+        conversation["documentation_job"] = job_id
+        conversation["phase"] = "documentation_pending"
+        try:
+            await self.job_queue.enqueue(conversation["id"], payload, job_id=job_id)
+        except Exception:
+            del conversation["documentation_job"]
+            conversation["phase"] = previous_phase
+            raise
+        logger.info("Queued documentation", conversation_id=conversation["id"], job_id=job_id)
+        return job_id
+    
+    async def _run_documentation_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job handler: generate documentation and attach it to the conversation"""
+        payload = job["payload"]
+        try:
+            documentation = await self.multi_model_service.generate_complete_project(
+                payload["project_idea"],
+                payload["history"],
+                conversation_id=job["conversation_id"]
             )
+            if documentation == FALLBACK_PROJECT:
+                raise Exception("No model could generate the documentation")
+        except Exception as e:
+            if job["attempts"] >= self.job_queue.max_attempts:
+                await self._attach_documentation(job, None, str(e))
+            raise
         
-        # Add assistant response
-        conversation["messages"].append({
-            "role": "assistant", 
-            "content": response, 
-            "timestamp": datetime.utcnow().isoformat()
+        cached = self.idea_index.get(payload["idea_cache_id"]) \
+            if self.idea_index and payload.get("idea_cache_id") is not None else None
+        if cached is not None:
+            cached["documentation"] = documentation
+        
+        await self._attach_documentation(job, documentation, None)
+        return documentation
+    
+    async def _attach_documentation(self, job: Dict[str, Any], documentation: Optional[Dict[str, Any]],
+                                    error: Optional[str]):
+        """Record a finished job on its conversation, unless a newer job replaced it"""
+        conversation = await self._load_conversation(job["conversation_id"])
+        if conversation is None or conversation.get("documentation_job") != job["job_id"]:
+            return
+        
+        del conversation["documentation_job"]
+        if documentation is not None:
+            self._store_documentation(conversation, documentation)
+            conversation.pop("documentation_error", None)
+        else:
+            conversation["documentation_error"] = error
+        conversation["phase"] = "documentation_generated" if "documentation" in conversation else "conversation"
+        self.store.save(conversation)
+    
+    def _store_documentation(self, conversation: Dict[str, Any], documentation: Dict[str, Any]):
+        """Attach a documentation generation and record its file manifest"""
+        version = conversation.get("documentation_version", 0) + 1
+        conversation["documentation"] = documentation
+        conversation["documentation_generated_at"] = datetime.utcnow().isoformat()
+        conversation["documentation_version"] = version
+        
+        # Recent manifests let clients fetch only what changed since the version they hold
+        manifests = conversation.setdefault("manifests", [])
+        manifests.append({
+            "version": version,
+            "generated_at": conversation["documentation_generated_at"],
+            "files": build_manifest(documentation, conversation, conversation["id"])
         })
+        del manifests[:-settings.MANIFEST_HISTORY]
+    
+    def get_manifest(self, conversation: Dict[str, Any], version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """A retained manifest of the conversation's documentation, the latest by default"""
+        manifests = conversation.get("manifests", [])
+        if version is None:
+            return manifests[-1] if manifests else None
+        return next((manifest for manifest in manifests if manifest["version"] == version), None)
+    
+    async def get_documentation_job(self, job_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """Get a documentation job's status, optionally waiting for it to finish"""
+        if wait > 0:
+            return await self.job_queue.wait(job_id, wait)
+        return await self.job_queue.get(job_id)
+    
+    async def get_job_documentation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Documentation a finished job produced for a conversation that is no longer stored
+        
+        With the in-memory store, a job resumed after a restart has no conversation to
+        attach to; its result is still in the job row. Returned in the shape of a conversation.
+        """
+        job = await self.job_queue.latest_succeeded(conversation_id)
+        if job is None or not job["result"]:
+            return None
+        return {
+            "id": conversation_id,
+            "documentation": job["result"],
+            "documentation_generated_at": job["finished_at"],
+            "phase": "documentation_generated"
+        }
+    
+    def _context_messages(self, conversation: Dict[str, Any]) -> List[Any]:
+        """History to send to a model: the rolling summary, then the turns it does not cover"""
+        summary = conversation.get("summary")
+        if not summary:
+            return conversation["messages"]
+        
+        first_unsummarized = max(conversation["summary_upto"] - conversation.get("message_offset", 0), 0)
+        return [Message(SUMMARY_ROLE, summary)] + conversation["messages"][first_unsummarized:]
+    
+    def _maybe_schedule_summary(self, conversation: Dict[str, Any]):
+        """Start a background summary update once enough turns are not covered by the summary"""
+        if not settings.SUMMARY_ENABLED:
+            return
+        
+        conversation_id = conversation["id"]
+        task = self._summary_tasks.get(conversation_id)
+        if task is not None and not task.done():
+            return
+        
+        offset = conversation.get("message_offset", 0)
+        fold_end = offset + len(conversation["messages"]) - settings.SUMMARY_KEEP_MESSAGES
+        fold_start = max(conversation.get("summary_upto", 0), offset)
+        if fold_end - fold_start < 2 * settings.SUMMARY_INTERVAL_TURNS:
+            return
+        
+        self.summary_stats["started"] += 1
+        self._summary_tasks[conversation_id] = asyncio.ensure_future(
+            self._update_summary(conversation, fold_start, fold_end)
+        )
+    
+    async def _update_summary(self, conversation: Dict[str, Any], fold_start: int, fold_end: int):
+        """Fold messages [fold_start, fold_end) into the conversation's rolling summary"""
+        conversation_id = conversation["id"]
+        base_version = conversation.get("summary_version", 0)
+        offset = conversation.get("message_offset", 0)
+        # Snapshot now; turns keep appending while the model works
+        new_turns = build_context(
+            conversation["messages"][fold_start - offset:fold_end - offset],
+            "documentation"
+        )
+        
+        prompt = f"""You maintain a running summary of a project design conversation.
+
+Project: {conversation['project_idea']}
+Current summary: {conversation.get('summary') or 'None yet.'}
+
+New conversation turns:
+{new_turns}
+
+Rewrite the summary to include the new turns. Keep every decision, requirement, technology choice and open question; drop small talk. Use at most {settings.SUMMARY_MAX_WORDS} words and reply with the summary only."""
+        
+        try:
+            summary = await self.multi_model_service.generate_conversation_response(prompt, bypass_cache=True)
+        except asyncio.CancelledError:
+            self.summary_stats["discarded"] += 1
+            raise
+        except Exception as e:
+            self.summary_stats["failed"] += 1
+            logger.error("Summary update failed", conversation_id=conversation_id, error=str(e))
+            return
+        finally:
+            if self._summary_tasks.get(conversation_id) is asyncio.current_task():
+                del self._summary_tasks[conversation_id]
+        
+        # Apply only on top of the version this update started from, to a conversation still in use
+        if summary == FALLBACK_RESPONSE or self.conversations.get(conversation_id) is not conversation \
+                or conversation.get("summary_version", 0) != base_version:
+            self.summary_stats["discarded"] += 1
+            return
+        
+        conversation["summary"] = summary.strip()
+        conversation["summary_upto"] = fold_end
+        conversation["summary_version"] = base_version + 1
+        self.summary_stats["applied"] += 1
+        self.store.save(conversation)
+        
+        logger.info("Updated conversation summary", conversation_id=conversation_id,
+                    version=base_version + 1, summarized_messages=fold_end)
+    
+    def _cancel_summary(self, conversation_id: str):
+        task = self._summary_tasks.pop(conversation_id, None)
+        if task is not None:
+            task.cancel()
+    
+    async def cancel_summary_updates(self):
+        """Cancel all in-flight summary updates"""
+        tasks = list(self._summary_tasks.values())
+        self._summary_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def get_summary_stats(self) -> Dict[str, Any]:
+        """Get rolling summary statistics"""
+        return {
+            "enabled": settings.SUMMARY_ENABLED,
+            "interval_turns": settings.SUMMARY_INTERVAL_TURNS,
+            "in_flight": len(self._summary_tasks),
+            **self.summary_stats
+        }
+    
+    def _cached_initial_response(self, conversation: Dict[str, Any], bypass_cache: bool) -> Optional[str]:
+        """Reuse the initial response of a near-duplicate project idea, if any"""
+        if not self.idea_index or bypass_cache:
+            return None
+        
+        match = self.idea_index.lookup(conversation["project_idea"])
+        if not match or not match[1].get("initial_response"):
+            return None
+        
+        entry_id, payload, similarity = match
+        conversation["idea_cache_id"] = entry_id
+        logger.info("Reusing initial response from similar project idea", similarity=round(similarity, 3))
+        return payload["initial_response"]
+    
+    def _remember_idea(self, conversation: Dict[str, Any], initial_response: str):
+        """Index a newly answered project idea for later near-duplicate reuse"""
+        if not self.idea_index or initial_response == FALLBACK_RESPONSE:
+            return
+        
+        conversation["idea_cache_id"] = self.idea_index.add(
+            conversation["project_idea"],
+            {"initial_response": initial_response}
+        )
+    
+    def get_idea_cache_stats(self) -> Dict[str, Any]:
+        """Get near-duplicate idea cache statistics"""
+        if not self.idea_index:
+            return {"enabled": False}
+        return {"enabled": True, **self.idea_index.get_stats()}
+    
+    @staticmethod
+    def _interrupted_response(chunks: List[str]) -> str:
+        """What the client saw of an unfinished response, marked as cut off"""
+        partial = "".join(chunks).rstrip()
+        return f"{partial}\n\n{INTERRUPTED_NOTE}" if partial else INTERRUPTED_NOTE
+    
+    def _finish_turn(self, conversation: Dict[str, Any], response: str):
+        """Record the assistant response and update conversation state"""
+        
+        # Add assistant response
+        self._append_message(conversation, "assistant", response)
         
         # Update last activity
         conversation["last_activity"] = datetime.utcnow().isoformat()
-        if "documentation" in conversation:
+        self.expiry_index.touch(conversation["id"])
+        if conversation.get("documentation_job"):
+            conversation["phase"] = "documentation_pending"
+        elif "documentation" in conversation:
             conversation["phase"] = "documentation_generated"
         else:
             conversation["phase"] = "conversation"
         
-        logger.info("Continued conversation", conversation_id=conversation_id, response_length=len(response))
+        # Persisted in the background; the turn does not wait for the write
+        self.store.save(conversation)
+        self._maybe_schedule_summary(conversation)
+    
+    def _append_message(self, conversation: Dict[str, Any], role: str, content: str):
+        """Append a message, compacting the oldest ones beyond MAX_CONVERSATION_LENGTH"""
+        messages = conversation["messages"]
+        messages.append(Message(role, content))
         
-        return {
-            "conversation_id": conversation_id,
-            "response": response,
-            "phase": conversation["phase"]
-        }
+        overflow = len(messages) - settings.MAX_CONVERSATION_LENGTH
+        if overflow > 0:
+            # Dropped turns stay in the store's message log; message_offset counts them
+            del messages[:overflow]
+            conversation["message_offset"] = conversation.get("message_offset", 0) + overflow
     
-    def _should_generate_documentation(self, message: str) -> bool:
+    def _should_generate_documentation(self, conversation: Dict[str, Any], message: str) -> bool:
         """Check if user wants documentation"""
-        keywords = [
-            "generate docs", "create docs", "generate documentation", "create documentation",
-            "docs ready", "documentation ready", "generate project docs", "create project docs",
-            "ready for docs", "ready for documentation", "generate everything", "create everything",
-            "docs folder", "documentation folder", "project docs", "project documentation",
-            "generate project", "create project", "project ready", "docs please",
-            "yes", "yes please", "sure", "okay", "go ahead", "generate", "create", "do it",
-            "solution", "ideal solution", "best solution", "provide solution", "give me solution",
-            "help me", "show me", "tell me", "what should", "how should", "recommend"
-        ]
-        return any(keyword in message.lower() for keyword in keywords)
-    
-    def _build_context(self, conversation: Dict[str, Any]) -> str:
-        """Build conversation context"""
-        recent_messages = conversation["messages"][-6:]  # Last 6 messages
-        context_parts = []
-        
-        for msg in recent_messages:
-            role = "User" if msg["role"] == "user" else "Assistant"
-            content = msg["content"][:150] + "..." if len(msg["content"]) > 150 else msg["content"]
-            context_parts.append(f"{role}: {content}")
-        
-        return " | ".join(context_parts)
-    
-    def get_conversation(self, conversation_id: str) -> Dict[str, Any]:
+        previous_response = next(
+            (msg.content for msg in reversed(conversation["messages"]) if msg.role == "assistant"),
+            None
+        )
+        intent = detect_documentation_intent(message, conversation["phase"], previous_response)
+        if intent.triggered:
+            logger.info("Documentation requested", conversation_id=conversation["id"],
+                        score=intent.score, matched=intent.matched)
+        return intent.triggered
+    
+    def _build_context(self, conversation: Dict[str, Any], query: Optional[str] = None) -> str:
+        """Build conversation context within the conversation token budget"""
+        return build_context(self._context_messages(conversation), "conversation", query=query)
+    
+    async def _load_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Get a conversation from the working set, falling back to the store"""
+        conversation = self.conversations.get(conversation_id)
+        if conversation is not None and self.store.is_stale(conversation_id):
+            # Another worker appended to it; reload instead of building on an old history
+            conversation = None
+        if conversation is None:
+            conversation = await self.store.load(conversation_id)
+            if conversation is not None:
+                self._activate(conversation)
+        return conversation
+    
+    def _activate(self, conversation: Dict[str, Any]):
+        """Add a conversation to the working set and start its idle clock"""
+        self.conversations[conversation["id"]] = conversation
+        self.expiry_index.touch(conversation["id"])
+    
+    async def get_conversation(self, conversation_id: str) -> Dict[str, Any]:
         """Get conversation by ID"""
-        return self.conversations.get(conversation_id, {})
+        return await self._load_conversation(conversation_id) or {}
     
-    def cleanup_expired_conversations(self, max_age_hours: int = 24):
-        """Clean up old conversations"""
-        cutoff = datetime.utcnow().timestamp() - (max_age_hours * 3600)
+    def cleanup_expired_conversations(self, max_idle_seconds: Optional[float] = None,
+                                      limit: Optional[int] = None) -> int:
+        """Evict conversations idle longer than max_idle_seconds (CONVERSATION_TIMEOUT by default)
         
-        expired = [
-            conv_id for conv_id, conv in self.conversations.items()
-            if datetime.fromisoformat(conv["last_activity"]).timestamp() < cutoff
-        ]
-        
-        for conv_id in expired:
-            del self.conversations[conv_id]
+        Evicted conversations leave the working set; a persistent store keeps them on disk.
+        """
+        max_idle = settings.CONVERSATION_TIMEOUT if max_idle_seconds is None else max_idle_seconds
+        expired = []
+        for conv_id in self.expiry_index.pop_expired(max_idle, limit=limit):
+            conversation = self.conversations.get(conv_id)
+            if self.turn_locks.is_locked(conv_id) or (conversation and conversation.get("documentation_job")):
+                # A long turn is still running, or a job will attach its result; check again after the next timeout
+                self.expiry_index.touch(conv_id)
+                continue
+            self.conversations.pop(conv_id, None)
+            self.turn_locks.discard(conv_id)
+            self._cancel_summary(conv_id)
+            self.store.evict(conv_id)
+            expired.append(conv_id)
         
         if expired:
-            logger.info(f"Cleaned up {len(expired)} expired conversations") 
\ No newline at end of file
+            logger.info(f"Cleaned up {len(expired)} expired conversations")
+        return len(expired)
+    
+    def start_expiry_sweeper(self):
+        """Start the background task that evicts idle conversations"""
+        if self._expiry_task is None or self._expiry_task.done():
+            self._expiry_task = asyncio.ensure_future(self._expiry_loop())
+    
+    async def stop_expiry_sweeper(self):
+        if self._expiry_task is not None:
+            self._expiry_task.cancel()
+            try:
+                await self._expiry_task
+            except asyncio.CancelledError:
+                pass
+            self._expiry_task = None
+    
+    async def _expiry_loop(self):
+        while True:
+            await asyncio.sleep(settings.CONVERSATION_SWEEP_INTERVAL)
+            try:
+                # Bounded batches keep each sweep short; a large backlog drains over several ticks
+                expired = self.cleanup_expired_conversations(limit=settings.CONVERSATION_SWEEP_BATCH)
+                self.expiry_stats["sweeps"] += 1
+                self.expiry_stats["expired"] += expired
+            except Exception as e:
+                logger.error("Conversation expiry sweep failed", error=str(e))
+    
+    def get_expiry_stats(self) -> Dict[str, Any]:
+        """Get idle-expiry sweep statistics"""
+        return {
+            "timeout": settings.CONVERSATION_TIMEOUT,
+            "sweep_interval": settings.CONVERSATION_SWEEP_INTERVAL,
+            "running": self._expiry_task is not None and not self._expiry_task.done(),
+            **self.expiry_stats,
+            **self.expiry_index.get_stats()
+        }
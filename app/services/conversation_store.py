@@ -0,0 +1,444 @@
+"""
+Conversation persistence backends
+Pluggable store behind ConversationService, with a write-behind SQLite implementation
+"""
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, Set, Tuple
+import structlog
+
+from app.core.config import settings
+from app.services.message import Message
+
+logger = structlog.get_logger(__name__)
+
+# Keys stored in their own columns or tables; everything else goes into the state JSON
+_COLUMN_KEYS = ("id", "project_idea", "phase", "messages", "message_offset", "documentation", "manifests")
+
+
+class ConversationStore(ABC):
+    """Persistence for conversations beyond the in-process working set"""
+
+    async def start(self):
+        """Prepare the backend"""
+
+    async def close(self):
+        """Flush pending writes and release resources"""
+
+    @abstractmethod
+    async def load(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Load a conversation, or None if it is unknown"""
+
+    @abstractmethod
+    def save(self, conversation: Dict[str, Any]):
+        """Record the conversation's current state without waiting for I/O"""
+
+    @abstractmethod
+    def delete(self, conversation_id: str):
+        """Forget a conversation without waiting for I/O"""
+
+    def evict(self, conversation_id: str):
+        """A conversation left the working set; backends that only live in memory forget it"""
+        self.delete(conversation_id)
+
+    def is_stale(self, conversation_id: str) -> bool:
+        """Whether the stored conversation has moved on from the copy held in memory"""
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Process-local store; state is lost on restart"""
+
+    def __init__(self):
+        self._conversations: Dict[str, Dict[str, Any]] = {}
+
+    async def load(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        return self._conversations.get(conversation_id)
+
+    def save(self, conversation: Dict[str, Any]):
+        self._conversations[conversation["id"]] = conversation
+
+    def delete(self, conversation_id: str):
+        self._conversations.pop(conversation_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "conversations": len(self._conversations)}
+
+
+class SQLiteConversationStore(ConversationStore):
+    """SQLite-backed store on the Conversation model with write-behind batching
+
+    save() and delete() only mark the conversation dirty. A background task
+    coalesces dirty conversations and writes each batch in one transaction on a
+    worker thread, so a turn never waits on the disk.
+
+    Messages go to the append-only ConversationMessage log: a flush inserts only
+    the messages added since the last one, and load() reads back the most recent
+    history_limit messages as a range scan on (conversation_id, seq). Older
+    messages stay on disk; "message_offset" records how many precede the ones
+    held in memory.
+
+    Generated documentation and its manifests are large and change only when
+    documentation is regenerated, so they live in the ConversationDocumentation
+    table and are written only when "documentation_version" moves past the
+    version last written or read.
+
+    Several workers may share the database. Each append is checked against
+    the highest seq on disk; if another worker appended first, the new
+    messages are numbered after its rows and the conversation is marked stale
+    so the next turn reloads it instead of building on an old history.
+    """
+
+    def __init__(self, database_url: str, flush_interval: float, batch_size: int, history_limit: int):
+        self.database_url = database_url
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.history_limit = history_limit
+        # conversation id -> latest conversation, or None for a pending delete
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        # conversation id -> next message seq not yet on disk
+        self._persisted: Dict[str, int] = {}
+        # conversation id -> documentation version on disk
+        self._documents: Dict[str, int] = {}
+        # Conversations another worker wrote to since they were loaded
+        self._stale: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.stats = {
+            "saves": 0, "rows_written": 0, "documents_written": 0, "messages_appended": 0, "messages_loaded": 0,
+            "batches": 0, "flush_time": 0.0, "errors": 0, "conflicts": 0, "dropped": 0
+        }
+
+    async def start(self):
+        from app.database.database import init_database
+        await asyncio.to_thread(init_database, self.database_url)
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            # Let a burst of turns accumulate into one transaction
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error("Conversation store flush failed", error=str(e))
+
+    def save(self, conversation: Dict[str, Any]):
+        self._pending[conversation["id"]] = conversation
+        self.stats["saves"] += 1
+        self._ensure_flusher()
+        self._wakeup.set()
+
+    def delete(self, conversation_id: str):
+        self._pending[conversation_id] = None
+        self._ensure_flusher()
+        self._wakeup.set()
+
+    async def flush(self):
+        """Write all pending changes in batches"""
+        from sqlalchemy.exc import IntegrityError
+
+        async with self._write_lock:
+            while self._pending:
+                ids = list(self._pending)[:self.batch_size]
+                batch = {conversation_id: self._pending.pop(conversation_id) for conversation_id in ids}
+
+                # Snapshot on the event loop so the worker thread never sees a half-updated dict
+                rows = {
+                    conversation_id: self._to_row(conversation) if conversation is not None else None
+                    for conversation_id, conversation in batch.items()
+                }
+
+                start_time = time.perf_counter()
+                try:
+                    written = await asyncio.to_thread(self._write_batch, rows)
+                except IntegrityError:
+                    # Retrying the whole batch would fail forever; isolate the rows that cannot be written
+                    written = await self._write_each(rows, batch)
+                except Exception:
+                    self._requeue(batch)
+                    raise
+
+                for conversation_id, row in rows.items():
+                    if conversation_id not in written:
+                        continue
+                    if row is None:
+                        self._persisted.pop(conversation_id, None)
+                        self._documents.pop(conversation_id, None)
+                        self._stale.discard(conversation_id)
+                        continue
+                    next_seq, conflicted = written[conversation_id]
+                    self._persisted[conversation_id] = next_seq
+                    if row["documents"] is not None:
+                        self._documents[conversation_id] = row["documents"]["version"]
+                        self.stats["documents_written"] += 1
+                    self.stats["messages_appended"] += len(row["new_messages"])
+                    if conflicted:
+                        self._stale.add(conversation_id)
+                        self.stats["conflicts"] += 1
+
+                self.stats["batches"] += 1
+                self.stats["rows_written"] += len(rows)
+                self.stats["flush_time"] += time.perf_counter() - start_time
+
+    def _requeue(self, batch: Dict[str, Optional[Dict[str, Any]]]):
+        # Put the batch back unless newer state arrived meanwhile
+        for conversation_id, conversation in batch.items():
+            self._pending.setdefault(conversation_id, conversation)
+
+    async def _write_each(self, rows: Dict[str, Optional[Dict[str, Any]]],
+                          batch: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Tuple[int, bool]]:
+        """Write rows one transaction each; rows that still violate a constraint are dropped"""
+        from sqlalchemy.exc import IntegrityError
+
+        written = {}
+        for conversation_id, row in rows.items():
+            try:
+                written.update(await asyncio.to_thread(self._write_batch, {conversation_id: row}))
+            except IntegrityError as e:
+                # Reloading from disk is the only way forward for this conversation
+                self.stats["dropped"] += 1
+                self._stale.add(conversation_id)
+                logger.error("Dropped conversation write that cannot succeed",
+                             conversation_id=conversation_id, error=str(e))
+            except Exception:
+                self._requeue({conversation_id: batch[conversation_id]})
+                raise
+        return written
+
+    def _to_row(self, conversation: Dict[str, Any]) -> Dict[str, Any]:
+        offset = conversation.get("message_offset", 0)
+        messages = conversation.get("messages", [])
+        next_seq = offset + len(messages)
+        start = max(self._persisted.get(conversation["id"], 0), offset)
+        documents = None
+        version = conversation.get("documentation_version", 0)
+        if "documentation" in conversation and self._documents.get(conversation["id"]) != version:
+            documents = {
+                "version": version,
+                "documentation": conversation["documentation"],
+                # Copied because the service trims the list in place
+                "manifests": list(conversation.get("manifests", []))
+            }
+        return {
+            "values": {
+                "project_idea": conversation.get("project_idea"),
+                "phase": conversation.get("phase"),
+                "state": {k: v for k, v in conversation.items() if k not in _COLUMN_KEYS}
+            },
+            "new_messages": [
+                {
+                    "conversation_id": conversation["id"],
+                    "seq": seq,
+                    "role": messages[seq - offset].role,
+                    "content": messages[seq - offset].content,
+                    "timestamp": messages[seq - offset].timestamp
+                }
+                for seq in range(start, next_seq)
+            ],
+            "documents": documents,
+            "first_seq": start,
+            "next_seq": next_seq
+        }
+
+    def _write_batch(self, rows: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Tuple[int, bool]]:
+        """Write a batch in one transaction; returns id -> (next seq on disk, appended after another worker)"""
+        from sqlalchemy import func, insert
+        from app.database.database import get_database
+        from app.database.models import Conversation, ConversationDocumentation, ConversationMessage
+
+        session = get_database()
+        try:
+            existing = {
+                row.conversation_id: row
+                for row in session.query(Conversation).filter(Conversation.conversation_id.in_(list(rows)))
+            }
+            last_seqs = dict(
+                session.query(ConversationMessage.conversation_id, func.max(ConversationMessage.seq))
+                .filter(ConversationMessage.conversation_id.in_(list(rows)))
+                .group_by(ConversationMessage.conversation_id)
+            )
+            documented = [conversation_id for conversation_id, row in rows.items() if row and row["documents"]]
+            documents = {
+                record.conversation_id: record
+                for record in session.query(ConversationDocumentation).filter(
+                    ConversationDocumentation.conversation_id.in_(documented)
+                )
+            } if documented else {}
+            written = {}
+            new_messages = []
+            for conversation_id, row in rows.items():
+                record = existing.get(conversation_id)
+                if row is None:
+                    if record is not None:
+                        session.delete(record)
+                    session.query(ConversationMessage).filter(
+                        ConversationMessage.conversation_id == conversation_id
+                    ).delete(synchronize_session=False)
+                    session.query(ConversationDocumentation).filter(
+                        ConversationDocumentation.conversation_id == conversation_id
+                    ).delete(synchronize_session=False)
+                    written[conversation_id] = (0, False)
+                    continue
+                if record is None:
+                    record = Conversation(conversation_id=conversation_id)
+                    session.add(record)
+                for key, value in row["values"].items():
+                    setattr(record, key, value)
+                if row["documents"] is not None:
+                    document = documents.get(conversation_id)
+                    if document is None:
+                        document = ConversationDocumentation(conversation_id=conversation_id)
+                        session.add(document)
+                    document.documentation = row["documents"]["documentation"]
+                    document.manifests = row["documents"]["manifests"]
+
+                # Version check: the log must end where this worker last left it
+                disk_next = last_seqs.get(conversation_id, -1) + 1
+                conflicted = disk_next != row["first_seq"]
+                if conflicted:
+                    for seq, message in enumerate(row["new_messages"], start=disk_next):
+                        message["seq"] = seq
+                new_messages.extend(row["new_messages"])
+                written[conversation_id] = (disk_next + len(row["new_messages"]), conflicted)
+            if new_messages:
+                session.execute(insert(ConversationMessage), new_messages)
+            session.commit()
+            return written
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _read(self, conversation_id: str) -> Optional[Tuple[Dict[str, Any], int, Optional[int]]]:
+        """Read a conversation and its recent history
+
+        Returns (conversation, next seq on disk, documentation version on disk or None).
+        """
+        from app.database.database import get_database
+        from app.database.models import Conversation, ConversationDocumentation, ConversationMessage
+
+        session = get_database()
+        try:
+            row = session.query(Conversation).filter(Conversation.conversation_id == conversation_id).first()
+            if row is None:
+                return None
+
+            # Newest first so LIMIT bounds the scan, then back into chronological order
+            message_rows = session.query(ConversationMessage).filter(
+                ConversationMessage.conversation_id == conversation_id
+            ).order_by(ConversationMessage.seq.desc()).limit(self.history_limit).all()
+            message_rows.reverse()
+
+            if message_rows:
+                messages = [Message(message.role, message.content, message.timestamp) for message in message_rows]
+                next_seq = message_rows[-1].seq + 1
+            else:
+                # Rows written before the message log keep their history in the JSON column;
+                # it is appended to the log on the next flush
+                messages = [Message.from_dict(message) for message in row.messages or []]
+                next_seq = 0
+
+            conversation = {
+                **(row.state or {}),
+                "id": row.conversation_id,
+                "project_idea": row.project_idea,
+                "phase": row.phase,
+                "messages": messages,
+                "message_offset": max(next_seq - len(messages), 0)
+            }
+
+            document = session.query(ConversationDocumentation).filter(
+                ConversationDocumentation.conversation_id == conversation_id
+            ).first()
+            if document is None:
+                # Rows written before the documentation table keep it in the state JSON;
+                # a None version moves it over on the next flush
+                return conversation, next_seq, None
+            conversation["documentation"] = document.documentation
+            conversation["manifests"] = document.manifests or []
+            return conversation, next_seq, conversation.get("documentation_version", 0)
+        finally:
+            session.close()
+
+    async def load(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        if conversation_id in self._stale:
+            # Merge this worker's unflushed messages into the log before reading it back
+            await self.flush()
+        elif conversation_id in self._pending:
+            # Unflushed state is newer than anything on disk
+            return self._pending[conversation_id]
+        result = await asyncio.to_thread(self._read, conversation_id)
+        self._stale.discard(conversation_id)
+        if result is None:
+            return None
+        conversation, next_seq, documents_version = result
+        self._persisted[conversation_id] = next_seq
+        if documents_version is None:
+            self._documents.pop(conversation_id, None)
+        else:
+            self._documents[conversation_id] = documents_version
+        self.stats["messages_loaded"] += len(conversation["messages"])
+        return conversation
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._pending:
+            await self.flush()
+
+    def evict(self, conversation_id: str):
+        # The conversation stays on disk; load() reads it back when it is next used
+        if conversation_id not in self._pending:
+            self._persisted.pop(conversation_id, None)
+            self._documents.pop(conversation_id, None)
+            self._stale.discard(conversation_id)
+
+    def is_stale(self, conversation_id: str) -> bool:
+        return conversation_id in self._stale
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {
+            "backend": "sqlite",
+            "pending": len(self._pending),
+            "saves": self.stats["saves"],
+            "rows_written": self.stats["rows_written"],
+            "documents_written": self.stats["documents_written"],
+            "messages_appended": self.stats["messages_appended"],
+            "messages_loaded": self.stats["messages_loaded"],
+            "history_limit": self.history_limit,
+            "batches": batches,
+            "avg_batch_size": round(self.stats["rows_written"] / batches, 2) if batches else 0,
+            "avg_flush_ms": round(self.stats["flush_time"] / batches * 1000, 3) if batches else 0,
+            "errors": self.stats["errors"],
+            "conflicts": self.stats["conflicts"],
+            "dropped": self.stats["dropped"]
+        }
+
+
+def create_conversation_store() -> ConversationStore:
+    """Build the store selected by CONVERSATION_STORE"""
+    if settings.CONVERSATION_STORE == "sqlite":
+        return SQLiteConversationStore(
+            database_url=settings.DATABASE_URL,
+            flush_interval=settings.STORE_FLUSH_INTERVAL,
+            batch_size=settings.STORE_BATCH_SIZE,
+            history_limit=settings.MAX_CONVERSATION_LENGTH
+        )
+    return InMemoryConversationStore()
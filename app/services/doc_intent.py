@@ -0,0 +1,95 @@
+"""
+Documentation-intent detection
+Decides whether a user message asks for the full documentation generation, which is the most
+expensive call the service makes
+"""
+
+import re
+from typing import List, NamedTuple, Optional
+
+# Score at which a message triggers documentation generation
+INTENT_THRESHOLD = 3
+
+_DOCS = r"(?:docs|documentation|doc folder|docs folder|documentation folder)"
+_MAKE = r"(?:generate|create|make|write|produce|build|prepare|draft)"
+_REDO = r"(?:regenerate|redo|update|refresh|rewrite)"
+_DETERMINER = r"(?:(?:the|my|our|some|a|all|full|complete|project|its|of|that|this|those)\s+){0,3}"
+
+# (weight, pattern); every pattern is matched on word boundaries in one alternation
+_RULES = [
+    ("explicit", 3, rf"{_MAKE}\s+{_DETERMINER}{_DOCS}"),
+    ("explicit", 3, rf"{_DOCS}\s+(?:please|now|ready)"),
+    ("explicit", 3, rf"ready\s+for\s+{_DETERMINER}{_DOCS}"),
+    ("explicit", 3, rf"(?:project|docs|documentation)\s+folder"),
+    ("explicit", 3, rf"(?:^|please\s+|you\s+|to\s+|let'?s\s+)document\s+{_DETERMINER}(?:project|app|application|idea|it|this|everything)"),
+    ("want", 3, rf"(?:i|we)(?:\s+(?:really|just))?(?:\s+(?:need|want|would\s+like)|'d\s+like)\s+{_DETERMINER}{_DOCS}"),
+    ("redo", 3, rf"{_REDO}\s+{_DETERMINER}{_DOCS}"),
+    ("deliverable", 3, rf"{_MAKE}\s+(?:the\s+|my\s+)?(?:everything|project\s+files|whole\s+project)"),
+    ("solution", 2, r"(?:give\s+me|provide|show\s+me)\s+(?:the\s+|an?\s+)?(?:ideal|best|complete|full)?\s*solution"),
+    ("solution", 2, r"(?:ideal|best|complete|full)\s+solution"),
+    ("topic", 1, rf"{_DOCS}"),
+    ("affirmative", 1, r"yes(?:\s+please)?|sure|ok(?:ay)?|go\s+ahead|do\s+it|sounds\s+good|let'?s\s+do\s+it|please\s+do"),
+]
+
+_MATCHER = re.compile(
+    "|".join(f"(?P<r{i}>\\b{pattern}\\b)" for i, (_, _, pattern) in enumerate(_RULES)),
+    re.IGNORECASE
+)
+# A negation among the few words before a match cancels it
+_NEGATION = re.compile(
+    r"\b(?:no|not|don'?t|do\s+not|doesn'?t|never|without|stop|skip|hold\s+off|wait|before)\b\W*(?:\w+\W+){0,2}$",
+    re.IGNORECASE
+)
+# Deferring anywhere in the message outweighs a request
+_DEFERRAL = re.compile(
+    r"\b(?:not\s+yet|later|but\s+first|first\s+(?:let'?s|tell|show|explain|answer)|before\s+(?:that|we|you)|no\s+need)\b",
+    re.IGNORECASE
+)
+# "Do I need docs?" asks whether docs are needed, not for them
+_YES_NO_QUESTION = re.compile(r"^\W*(?:do|does|did|should|will|is|are|must)\b", re.IGNORECASE)
+# An assistant turn that offered documentation makes a bare "yes" a request for it
+_OFFER = re.compile(rf"\b(?:{_DOCS}|documentation)\b[^.!]*\?|\bshall\s+i\s+{_MAKE}\b|\bwould\s+you\s+like\b[^?]*{_DOCS}",
+                    re.IGNORECASE)
+
+
+class DocumentationIntent(NamedTuple):
+    score: int
+    matched: List[str]
+
+    @property
+    def triggered(self) -> bool:
+        return self.score >= INTENT_THRESHOLD
+
+
+def detect_documentation_intent(message: str, phase: str = "conversation",
+                                previous_response: Optional[str] = None) -> DocumentationIntent:
+    """Score how clearly a message asks for documentation, given the conversation phase"""
+    score = 0
+    matched = []
+    offered = bool(previous_response and _OFFER.search(previous_response))
+
+    for match in _MATCHER.finditer(message):
+        if _NEGATION.search(message, 0, match.start()):
+            continue
+        index = int(match.lastgroup[1:])
+        kind, weight, _ = _RULES[index]
+        if kind == "affirmative":
+            # Only a short reply to an offer counts, not a follow-up question
+            if not offered or "?" in message or len(message.split()) > 8:
+                continue
+            weight = INTENT_THRESHOLD
+        elif kind == "want" and _YES_NO_QUESTION.match(message):
+            continue
+        elif kind == "redo":
+            # Regenerating only makes sense once docs exist; otherwise it is a plain request
+            weight = INTENT_THRESHOLD
+        elif kind != "topic" and phase == "documentation_generated":
+            # Docs already exist, so talk about them is usually about their contents
+            weight -= 1
+        score += weight
+        matched.append(match.group(0))
+
+    if score and _DEFERRAL.search(message):
+        score -= INTENT_THRESHOLD
+
+    return DocumentationIntent(score=score, matched=matched)
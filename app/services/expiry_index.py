@@ -0,0 +1,61 @@
+"""
+Idle-expiry index for conversations
+Min-heap keyed by last activity with lazy invalidation, so a sweep only touches expired entries
+"""
+
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class ExpiryIndex:
+    """Tracks last activity per key and pops keys idle longer than a timeout
+
+    touch() pushes a new heap entry instead of updating the old one in place;
+    superseded entries are skipped when they surface. Touch is O(log n) and a
+    sweep costs O(k log n) for k popped entries, independent of how many keys
+    are live. The heap is rebuilt when stale entries outnumber live ones.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._last_activity: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._last_activity)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._last_activity
+
+    def touch(self, key: str, now: Optional[float] = None):
+        """Record activity for a key"""
+        now = time.monotonic() if now is None else now
+        self._last_activity[key] = now
+        heapq.heappush(self._heap, (now, key))
+        if len(self._heap) > 2 * len(self._last_activity) + 64:
+            self._compact()
+
+    def discard(self, key: str):
+        """Stop tracking a key; its heap entries become stale"""
+        self._last_activity.pop(key, None)
+
+    def pop_expired(self, max_idle: float, now: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """Remove and return keys idle for longer than max_idle, oldest first"""
+        now = time.monotonic() if now is None else now
+        cutoff = now - max_idle
+        expired = []
+        while self._heap and self._heap[0][0] < cutoff:
+            if limit is not None and len(expired) >= limit:
+                break
+            last_activity, key = heapq.heappop(self._heap)
+            if self._last_activity.get(key) == last_activity:
+                del self._last_activity[key]
+                expired.append(key)
+        return expired
+
+    def _compact(self):
+        self._heap = [(last_activity, key) for key, last_activity in self._last_activity.items()]
+        heapq.heapify(self._heap)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"tracked": len(self._last_activity), "heap_entries": len(self._heap)}
@@ -0,0 +1,173 @@
+"""
+Near-duplicate index over project ideas
+Character shingles, one-permutation MinHash and LSH banding; fully local, no external services
+"""
+
+import hashlib
+import re
+import time
+from array import array
+from collections import Counter, OrderedDict
+from operator import eq
+from typing import Dict, Any, List, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+SHINGLE_SIZE = 4
+NUM_BINS = 64  # signature length, must be a power of two
+BIN_BITS = 6
+BANDS = 16
+ROWS_PER_BAND = NUM_BINS // BANDS
+# Only the most recent ids of a crowded bucket are considered, and only the best few are compared exactly
+BUCKET_SCAN_LIMIT = 32
+MAX_EXACT_COMPARISONS = 8
+
+_EMPTY = 1 << 64
+_MASK64 = (1 << 64) - 1
+_DENSIFY_STEP = 0x9E3779B97F4A7C15
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_idea(text: str) -> str:
+    """Lowercase and reduce punctuation to single spaces ("To-Do app!" -> "to do app")"""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def minhash_signature(text: str) -> array:
+    """One-permutation MinHash over character shingles, densified so every bin is filled"""
+    normalized = normalize_idea(text)
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+    # One hash per shingle: low bits pick the bin, high bits compete for its minimum
+    bins = [_EMPTY] * NUM_BINS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        index = h & (NUM_BINS - 1)
+        value = h >> BIN_BITS
+        if value < bins[index]:
+            bins[index] = value
+
+    # Short texts leave empty bins; borrow from the next filled bin so similarity stays comparable
+    if _EMPTY in bins and any(value != _EMPTY for value in bins):
+        source = list(bins)
+        for i in range(NUM_BINS):
+            if source[i] == _EMPTY:
+                j, distance = i, 0
+                while source[j] == _EMPTY:
+                    j = (j + 1) & (NUM_BINS - 1)
+                    distance += 1
+                bins[i] = (source[j] + distance * _DENSIFY_STEP) & _MASK64
+
+    return array("Q", bins)
+
+
+class IdeaIndex:
+    """LSH index mapping similar project ideas to a shared cached payload"""
+
+    def __init__(self, similarity_threshold: float, max_entries: int):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._next_id = 0
+        # entry id -> (signature, payload), oldest first
+        self._entries: "OrderedDict[int, Tuple[array, Dict[str, Any]]]" = OrderedDict()
+        # One table per band; a bucket holds a single id or a list of ids
+        self._bands: List[Dict[int, Any]] = [{} for _ in range(BANDS)]
+        self.stats = {"hits": 0, "misses": 0, "lookups": 0, "total_lookup_time": 0.0, "max_lookup_time": 0.0}
+
+    @staticmethod
+    def _band_keys(signature: array) -> List[int]:
+        return [
+            hash(tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]))
+            for band in range(BANDS)
+        ]
+
+    def lookup(self, project_idea: str) -> Optional[Tuple[int, Dict[str, Any], float]]:
+        """Find the most similar cached idea above the threshold: (entry id, payload, similarity)"""
+        start_time = time.perf_counter()
+        signature = minhash_signature(project_idea)
+        match = self._best_match(signature)
+
+        elapsed = time.perf_counter() - start_time
+        self.stats["lookups"] += 1
+        self.stats["total_lookup_time"] += elapsed
+        self.stats["max_lookup_time"] = max(self.stats["max_lookup_time"], elapsed)
+        self.stats["hits" if match else "misses"] += 1
+        return match
+
+    def _best_match(self, signature: array) -> Optional[Tuple[int, Dict[str, Any], float]]:
+        # Ids sharing more bands are likelier to be similar, so compare those exactly first
+        collisions = Counter()
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._bands[band].get(key)
+            if bucket is None:
+                continue
+            if isinstance(bucket, list):
+                collisions.update(bucket[-BUCKET_SCAN_LIMIT:])
+            else:
+                collisions[bucket] += 1
+
+        best = None
+        for entry_id, _ in collisions.most_common(MAX_EXACT_COMPARISONS):
+            candidate_signature, payload = self._entries[entry_id]
+            similarity = sum(map(eq, signature, candidate_signature)) / NUM_BINS
+            if similarity >= self.similarity_threshold and (best is None or similarity > best[2]):
+                best = (entry_id, payload, similarity)
+        return best
+
+    def add(self, project_idea: str, payload: Dict[str, Any]) -> int:
+        """Index an idea with its payload, evicting the oldest entry when full"""
+        signature = minhash_signature(project_idea)
+        entry_id = self._next_id
+        self._next_id += 1
+
+        self._entries[entry_id] = (signature, payload)
+        for band, key in enumerate(self._band_keys(signature)):
+            table = self._bands[band]
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = entry_id
+            elif isinstance(bucket, list):
+                bucket.append(entry_id)
+            else:
+                table[key] = [bucket, entry_id]
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+        return entry_id
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """Get the payload of a still-indexed entry"""
+        entry = self._entries.get(entry_id)
+        return entry[1] if entry else None
+
+    def _remove(self, entry_id: int):
+        signature, _ = self._entries.pop(entry_id)
+        for band, key in enumerate(self._band_keys(signature)):
+            table = self._bands[band]
+            bucket = table.get(key)
+            if isinstance(bucket, list):
+                bucket.remove(entry_id)
+                if len(bucket) == 1:
+                    table[key] = bucket[0]
+            elif bucket == entry_id:
+                del table[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit rate and lookup latency"""
+        lookups = self.stats["lookups"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "similarity_threshold": self.similarity_threshold,
+            "lookups": lookups,
+            "hits": self.stats["hits"],
+            "misses": self.stats["misses"],
+            "hit_rate": round(self.stats["hits"] / lookups * 100, 2) if lookups else 0,
+            "avg_lookup_ms": round(self.stats["total_lookup_time"] / lookups * 1000, 4) if lookups else 0,
+            "max_lookup_ms": round(self.stats["max_lookup_time"] * 1000, 4)
+        }
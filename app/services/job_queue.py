@@ -0,0 +1,359 @@
+"""
+Durable job queue for documentation generation
+Jobs live in SQLite, so a request returns a job id at once and unfinished work resumes after a restart
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+TERMINAL_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class DocumentationJobQueue:
+    """SQLite-backed queue drained by a fixed pool of asyncio workers
+
+    Claiming a job flips it from queued to running in one conditional UPDATE,
+    so two workers never run the same job. The claim is a lease: it records
+    which process holds the job, and that process renews heartbeat_at while
+    it runs. Several processes may share the database, so only jobs whose
+    lease has expired (a crashed or stopped process) go back to queued,
+    unless they have used up their attempts. Expired leases are collected
+    on start and on every heartbeat.
+    """
+
+    def __init__(self, database_url: str, workers: int, max_attempts: int, poll_interval: float,
+                 lease_seconds: float = 60.0):
+        self.database_url = database_url
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        # Unique per queue instance, so a restarted process never inherits a lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handler: Optional[JobHandler] = None
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.stats = {
+            "enqueued": 0, "succeeded": 0, "failed": 0, "retried": 0, "recovered": 0, "lost_leases": 0,
+            "run_time": 0.0
+        }
+
+    async def start(self, handler: JobHandler):
+        """Recover interrupted jobs and start the workers"""
+        from app.database.database import init_database
+        await asyncio.to_thread(init_database, self.database_url)
+
+        self._handler = handler
+        await self._recover_expired()
+
+        if not self._workers:
+            self._workers = [asyncio.ensure_future(self._worker(i)) for i in range(self.worker_count)]
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.ensure_future(self._heartbeat())
+        self._wakeup.set()
+
+    async def close(self):
+        """Stop the workers; their running jobs are requeued once the lease expires"""
+        tasks, self._workers = self._workers, []
+        if self._heartbeat_task is not None:
+            tasks.append(self._heartbeat_task)
+            self._heartbeat_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def enqueue(self, conversation_id: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        """Persist a new job and return its id
+
+        Callers that must record the id before a worker can claim the job pass it in.
+        """
+        job_id = job_id or str(uuid.uuid4())
+        await asyncio.to_thread(self._insert, job_id, conversation_id, payload)
+        self.stats["enqueued"] += 1
+        self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a job, or None if it is unknown"""
+        return await asyncio.to_thread(self._read, job_id)
+
+    async def latest_succeeded(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Most recent successful job of a conversation, or None"""
+        return await asyncio.to_thread(self._read_latest_succeeded, conversation_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Long-poll until the job finishes or the timeout passes"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATUSES or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0)))
+
+    async def _recover_expired(self):
+        recovered = await asyncio.to_thread(self._recover)
+        self.stats["recovered"] += recovered
+        if recovered:
+            logger.info("Recovered interrupted documentation jobs", count=recovered)
+
+    async def _heartbeat(self):
+        # Renew this process's leases well before they expire, and collect leases other processes let lapse
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self._renew)
+                await self._recover_expired()
+            except Exception as e:
+                logger.error("Documentation job heartbeat failed", error=str(e))
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                # For example "database is locked" while the store flushes; the job stays queued
+                logger.error("Failed to claim documentation job", worker=index, error=str(e))
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if job is None:
+                # Wake on enqueue, or poll in case another process added work
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            start_time = time.perf_counter()
+            try:
+                result = await self._handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                retry = job["attempts"] < self.max_attempts
+                self.stats["retried" if retry else "failed"] += 1
+                logger.error("Documentation job failed", job_id=job["job_id"], attempt=job["attempts"],
+                             retry=retry, error=str(e))
+                await self._record(job["job_id"], JOB_QUEUED if retry else JOB_FAILED, None, str(e))
+                continue
+            finally:
+                self.stats["run_time"] += time.perf_counter() - start_time
+
+            self.stats["succeeded"] += 1
+            await self._record(job["job_id"], JOB_SUCCEEDED, result, None)
+            logger.info("Documentation job finished", job_id=job["job_id"], worker=index)
+
+    async def _record(self, job_id: str, status: str, result: Optional[Dict[str, Any]], error: Optional[str]):
+        """Store a job's outcome, retrying until the database accepts it"""
+        delay = self.poll_interval
+        while True:
+            try:
+                if not await asyncio.to_thread(self._finish, job_id, status, result, error):
+                    # The lease expired and the job was requeued; its new run records the outcome
+                    self.stats["lost_leases"] += 1
+                    logger.warning("Lost the lease on a documentation job", job_id=job_id, status=status)
+                return
+            except Exception as e:
+                # Giving up would leave the job marked running until the next restart
+                logger.error("Failed to record documentation job outcome", job_id=job_id, status=status, error=str(e))
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        return {
+            "job_id": row.job_id,
+            "conversation_id": row.conversation_id,
+            "status": row.status,
+            "attempts": row.attempts,
+            "claimed_by": row.claimed_by,
+            "payload": row.payload,
+            "result": row.result,
+            "error": row.error,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "started_at": row.started_at.isoformat() if row.started_at else None,
+            "finished_at": row.finished_at.isoformat() if row.finished_at else None
+        }
+
+    def _insert(self, job_id: str, conversation_id: str, payload: Dict[str, Any]):
+        from app.database.database import get_database
+        from app.database.models import DocumentationJob
+
+        session = get_database()
+        try:
+            session.add(DocumentationJob(job_id=job_id, conversation_id=conversation_id,
+                                         status=JOB_QUEUED, attempts=0, payload=payload))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        from app.database.database import get_database
+        from app.database.models import DocumentationJob
+
+        session = get_database()
+        try:
+            while True:
+                row = session.query(DocumentationJob).filter(
+                    DocumentationJob.status == JOB_QUEUED
+                ).order_by(DocumentationJob.id).first()
+                if row is None:
+                    return None
+
+                claimed = session.query(DocumentationJob).filter(
+                    DocumentationJob.id == row.id,
+                    DocumentationJob.status == JOB_QUEUED
+                ).update({
+                    "status": JOB_RUNNING,
+                    "attempts": DocumentationJob.attempts + 1,
+                    "claimed_by": self.owner,
+                    "started_at": datetime.utcnow(),
+                    "heartbeat_at": datetime.utcnow()
+                }, synchronize_session=False)
+                session.commit()
+                if claimed:
+                    session.refresh(row)
+                    return self._to_dict(row)
+                # Another worker won the race; try the next job
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> bool:
+        """Record an outcome if this process still holds the job's lease"""
+        from app.database.database import get_database
+        from app.database.models import DocumentationJob
+
+        session = get_database()
+        try:
+            updated = session.query(DocumentationJob).filter(
+                DocumentationJob.job_id == job_id,
+                DocumentationJob.status == JOB_RUNNING,
+                DocumentationJob.claimed_by == self.owner
+            ).update({
+                "status": status,
+                "result": result,
+                "error": error,
+                "claimed_by": None,
+                "heartbeat_at": None,
+                "finished_at": datetime.utcnow() if status in TERMINAL_STATUSES else None
+            }, synchronize_session=False)
+            session.commit()
+            return bool(updated)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _renew(self):
+        from app.database.database import get_database
+        from app.database.models import DocumentationJob
+
+        session = get_database()
+        try:
+            session.query(DocumentationJob).filter(
+                DocumentationJob.status == JOB_RUNNING,
+                DocumentationJob.claimed_by == self.owner
+            ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _recover(self) -> int:
+        """Requeue running jobs whose lease expired; returns how many"""
+        from sqlalchemy import or_
+        from app.database.database import get_database
+        from app.database.models import DocumentationJob
+
+        session = get_database()
+        try:
+            # Rows without a heartbeat were claimed before leases existed
+            expired_before = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+            interrupted = (DocumentationJob.status == JOB_RUNNING) & or_(
+                DocumentationJob.heartbeat_at.is_(None), DocumentationJob.heartbeat_at < expired_before
+            )
+            exhausted = session.query(DocumentationJob).filter(
+                interrupted, DocumentationJob.attempts >= self.max_attempts
+            ).update({
+                "status": JOB_FAILED,
+                "error": "Interrupted too many times",
+                "claimed_by": None,
+                "heartbeat_at": None,
+                "finished_at": datetime.utcnow()
+            }, synchronize_session=False)
+            requeued = session.query(DocumentationJob).filter(interrupted).update(
+                {"status": JOB_QUEUED, "claimed_by": None, "heartbeat_at": None}, synchronize_session=False
+            )
+            session.commit()
+            if exhausted:
+                logger.warning("Gave up on repeatedly interrupted documentation jobs", count=exhausted)
+            return requeued
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        from app.database.database import get_database
+        from app.database.models import DocumentationJob
+
+        session = get_database()
+        try:
+            row = session.query(DocumentationJob).filter(DocumentationJob.job_id == job_id).first()
+            return self._to_dict(row) if row else None
+        finally:
+            session.close()
+
+    def _read_latest_succeeded(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        from app.database.database import get_database
+        from app.database.models import DocumentationJob
+
+        session = get_database()
+        try:
+            row = session.query(DocumentationJob).filter(
+                DocumentationJob.conversation_id == conversation_id,
+                DocumentationJob.status == JOB_SUCCEEDED
+            ).order_by(DocumentationJob.id.desc()).first()
+            return self._to_dict(row) if row else None
+        finally:
+            session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        finished = self.stats["succeeded"] + self.stats["failed"] + self.stats["retried"]
+        return {
+            "workers": len(self._workers),
+            "max_attempts": self.max_attempts,
+            "enqueued": self.stats["enqueued"],
+            "succeeded": self.stats["succeeded"],
+            "failed": self.stats["failed"],
+            "retried": self.stats["retried"],
+            "recovered": self.stats["recovered"],
+            "lost_leases": self.stats["lost_leases"],
+            "avg_run_s": round(self.stats["run_time"] / finished, 3) if finished else 0
+        }
@@ -0,0 +1,45 @@
+"""
+Compact conversation message record
+"""
+
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+
+class Message:
+    """One conversation message
+
+    Slots instead of a per-message dict, an epoch-seconds float instead of an
+    ISO string, and interned roles so every message shares the same two role
+    strings.
+    """
+
+    __slots__ = ("role", "content", "timestamp", "tokens")
+
+    def __init__(self, role: str, content: str, timestamp: Optional[float] = None):
+        self.role = sys.intern(role)
+        self.content = content
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.tokens: Optional[int] = None  # filled in lazily by the context builder
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Message":
+        """Build from a {role, content, timestamp} dict; ISO timestamps are accepted"""
+        timestamp = data.get("timestamp")
+        if isinstance(timestamp, str):
+            # Stored ISO timestamps are naive UTC
+            timestamp = datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+        return cls(data.get("role", "user"), data.get("content", ""), timestamp)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for provider prompts and JSON, with an ISO timestamp"""
+        return {"role": self.role, "content": self.content, "timestamp": self.iso_timestamp}
+
+    @property
+    def iso_timestamp(self) -> str:
+        return datetime.utcfromtimestamp(self.timestamp).isoformat()
+
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content[:40]!r}, timestamp={self.timestamp})"
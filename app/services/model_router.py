@@ -0,0 +1,140 @@
+"""
+Adaptive model routing for MultiModelService
+Orders models per task type by EWMA latency, error rate and timeout rate over a rolling window
+"""
+
+import asyncio
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def is_timeout_error(error: Exception) -> bool:
+    """Detect timeouts across asyncio, httpx and the provider SDKs"""
+    return isinstance(error, asyncio.TimeoutError) or "timeout" in type(error).__name__.lower()
+
+
+class RouteStats:
+    """Rolling outcome window and EWMA latency for one (task type, model) pair"""
+
+    def __init__(self, window: int, alpha: float):
+        self.alpha = alpha
+        self.ewma_latency = None
+        # Each outcome is "success", "error" or "timeout"
+        self.outcomes = deque(maxlen=window)
+
+    def record_success(self, latency: float):
+        self.outcomes.append("success")
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+
+    def record_failure(self, timeout: bool):
+        self.outcomes.append("timeout" if timeout else "error")
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count("error") / len(self.outcomes) if self.outcomes else 0.0
+
+    @property
+    def timeout_rate(self) -> float:
+        return self.outcomes.count("timeout") / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ModelRouter:
+    """Ranks models for each task type by expected cost in seconds"""
+
+    def __init__(self, window: int, alpha: float, min_samples: int,
+                 error_penalty: float, timeout_penalty: float):
+        self.window = window
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.error_penalty = error_penalty
+        self.timeout_penalty = timeout_penalty
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+
+    def _route(self, task_type: str, model: str) -> RouteStats:
+        key = (task_type, model)
+        if key not in self.routes:
+            self.routes[key] = RouteStats(self.window, self.alpha)
+        return self.routes[key]
+
+    def record_success(self, task_type: str, model: str, latency: float):
+        self._route(task_type, model).record_success(latency)
+
+    def record_failure(self, task_type: str, model: str, error: Exception):
+        self._route(task_type, model).record_failure(is_timeout_error(error))
+
+    def _cost(self, route: RouteStats) -> float:
+        """Expected seconds per request: EWMA latency plus penalties for failures"""
+        return (
+            (route.ewma_latency or 0.0)
+            + self.error_penalty * route.error_rate
+            + self.timeout_penalty * route.timeout_rate
+        )
+
+    def _is_known(self, task_type: str, model: str) -> bool:
+        route = self.routes.get((task_type, model))
+        return route is not None and len(route.outcomes) >= self.min_samples
+
+    def _prior_cost(self, task_type: str, default_order: List[str]) -> Optional[float]:
+        """What a model with no data is assumed to cost: the typical latency of the models measured so far"""
+        latencies = [
+            self.routes[(task_type, m)].ewma_latency for m in default_order
+            if self._is_known(task_type, m) and self.routes[(task_type, m)].ewma_latency is not None
+        ]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def _ranking_cost(self, task_type: str, model: str, prior: float) -> float:
+        """Measured cost, shrunk toward the prior until the model has min_samples outcomes"""
+        route = self.routes.get((task_type, model))
+        samples = len(route.outcomes) if route is not None else 0
+        if samples >= self.min_samples:
+            return self._cost(route)
+        weight = samples / self.min_samples
+        return weight * self._cost(route) + (1 - weight) * prior if samples else prior
+
+    def rank(self, task_type: str, default_order: List[str]) -> List[str]:
+        """Order models by cost; models short of min_samples are costed at the prior, ties keep the default order
+
+        A known model that keeps failing costs more than the typical latency, so
+        an untried model is ranked ahead of it instead of always after it.
+        """
+        prior = self._prior_cost(task_type, default_order)
+        if prior is None:
+            # Nothing has succeeded often enough to compare against
+            known = [m for m in default_order if self._is_known(task_type, m)]
+            unknown = [m for m in default_order if not self._is_known(task_type, m)]
+            if not known:
+                return list(default_order)
+            # Known models that never succeed are worse than any untried model
+            return unknown + sorted(known, key=lambda m: self._cost(self.routes[(task_type, m)]))
+        return sorted(default_order, key=lambda m: self._ranking_cost(task_type, m, prior))
+
+    def describe(self, task_type: str, default_order: List[str]) -> Dict[str, Any]:
+        """Decision inputs and resulting order for one task type"""
+        order = self.rank(task_type, default_order)
+        inputs = {}
+        for model in default_order:
+            route = self.routes.get((task_type, model))
+            if route is None:
+                inputs[model] = {"samples": 0}
+                continue
+            inputs[model] = {
+                "samples": len(route.outcomes),
+                "ewma_latency": round(route.ewma_latency, 3) if route.ewma_latency is not None else None,
+                "error_rate": round(route.error_rate, 3),
+                "timeout_rate": round(route.timeout_rate, 3),
+                "cost": round(self._cost(route), 3),
+                "ranked_by_data": self._is_known(task_type, model)
+            }
+        prior = self._prior_cost(task_type, default_order)
+        return {
+            "recommended": order[0] if order else None,
+            "order": order,
+            "prior_cost": round(prior, 3) if prior is not None else None,
+            "inputs": inputs
+        }
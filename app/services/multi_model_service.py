@@ -4,7 +4,9 @@ Orchestrates between Anthropic (Claude) and GooseAI for optimal performance
 """
 
 import asyncio
-from typing import Dict, List, Optional, Any
+import hashlib
+from collections import deque, OrderedDict
+from typing import Dict, List, Optional, Any, AsyncIterator, Awaitable, Callable, Tuple
 import structlog
 from dotenv import load_dotenv
 
@@ -13,9 +15,39 @@ load_dotenv()
 
 from app.integrations.anthropic_client import AnthropicClient
 from app.integrations.goose_ai_client import GooseAIClient
+from app.core.config import settings
+from app.services.rate_limiter import ProviderLimiter, ProviderBusyError
+from app.services.model_router import ModelRouter
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.response_cache import ResponseCache
+from app.services.context_builder import context_budget, message_tokens, message_fields
 
 logger = structlog.get_logger(__name__)
 
+# Output token ceilings used to reserve tokens-per-minute budget
+CONVERSATION_MAX_TOKENS = 512
+DOCUMENTATION_MAX_TOKENS = 8000
+
+# Sampling temperature the clients use for conversation responses
+CONVERSATION_TEMPERATURE = 0.7
+
+# Finished documentation kept for reuse, one entry per conversation
+PROJECT_RESULTS_MAX_ENTRIES = 256
+
+# Returned when every model fails
+FALLBACK_RESPONSE = "I'm having trouble responding right now. Please try again."
+FALLBACK_PROJECT = {
+    "project_name": "Project",
+    "overview": "Documentation generation failed. Please try again.",
+    "setup_guide": "",
+    "implementation_guide": "",
+    "backend": "",
+    "frontend": "",
+    "config": "",
+    "dependencies": [],
+    "github_issues": []
+}
+
 
 class MultiModelService:
     """Service that orchestrates multiple AI models for optimal performance"""
@@ -25,7 +57,7 @@ class MultiModelService:
         self.anthropic_client = AnthropicClient()
         self.goose_ai_client = GooseAIClient()
         
-        # Model preferences and fallback strategy
+        # Default model order per task, used until the router has enough samples
         self.model_preferences = {
             "conversation": ["anthropic", "goose_ai"],
             "documentation": ["anthropic", "goose_ai"],
@@ -39,95 +71,367 @@ class MultiModelService:
             "goose_ai": {"success": 0, "failure": 0, "avg_response_time": 0}
         }
         
+        # Adaptive per-task routing from recent latency, errors and timeouts
+        self.router = ModelRouter(
+            window=settings.ROUTER_WINDOW,
+            alpha=settings.ROUTER_EWMA_ALPHA,
+            min_samples=settings.ROUTER_MIN_SAMPLES,
+            error_penalty=settings.ROUTER_ERROR_PENALTY,
+            timeout_penalty=settings.ROUTER_TIMEOUT_PENALTY
+        )
+        
+        # Per-provider admission control so bursts queue instead of hitting rate limits
+        self.limiters = {
+            "anthropic": ProviderLimiter(
+                "anthropic",
+                max_in_flight=settings.ANTHROPIC_MAX_IN_FLIGHT,
+                requests_per_minute=settings.ANTHROPIC_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.ANTHROPIC_TOKENS_PER_MINUTE,
+                max_queue=settings.PROVIDER_MAX_QUEUE,
+                max_wait=settings.PROVIDER_MAX_WAIT
+            ),
+            "goose_ai": ProviderLimiter(
+                "goose_ai",
+                max_in_flight=settings.GOOSE_AI_MAX_IN_FLIGHT,
+                requests_per_minute=settings.GOOSE_AI_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.GOOSE_AI_TOKENS_PER_MINUTE,
+                max_queue=settings.PROVIDER_MAX_QUEUE,
+                max_wait=settings.PROVIDER_MAX_WAIT
+            )
+        }
+        
+        # Circuit breakers skip a failing provider until it recovers
+        self.breakers = {
+            model: CircuitBreaker(
+                model,
+                failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+                recovery_timeout=settings.BREAKER_RECOVERY_TIMEOUT,
+                half_open_max_calls=settings.BREAKER_HALF_OPEN_MAX_CALLS
+            )
+            for model in ("anthropic", "goose_ai")
+        }
+        
+        # Opt-in cache of conversation responses
+        self.response_cache = ResponseCache(
+            max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+            ttl=settings.RESPONSE_CACHE_TTL
+        ) if settings.RESPONSE_CACHE_ENABLED else None
+        
+        # Recent latencies per (model, task type) and hedging counters
+        self.latency_samples: Dict[Tuple[str, str], deque] = {}
+        self.hedge_stats = {"requests": 0, "fired": 0, "won": 0}
+        
+        # Documentation generations in flight per (conversation, history digest), and the latest
+        # finished one per conversation
+        self._project_flights: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._project_results: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+        self.project_dedup_stats = {"generated": 0, "joined": 0, "reused": 0}
+        
         logger.info("MultiModelService initialized", 
                    anthropic_available=self.anthropic_client.client is not None,
                    goose_ai_available=self.goose_ai_client.available)
     
-    async def generate_conversation_response(self, prompt: str, context: Dict[str, Any] = None) -> str:
+    async def generate_conversation_response(self, prompt: str, context: Dict[str, Any] = None,
+                                             bypass_cache: bool = False) -> str:
         """Generate conversation response using the best available model"""
+        use_cache, cached = await self._cache_lookup(prompt, context, bypass_cache)
+        if cached is not None:
+            return cached
         
-        # Try Anthropic first (preferred for conversation)
-        if self.anthropic_client.client:
+        estimated_tokens = self._estimate_tokens(prompt, CONVERSATION_MAX_TOKENS)
+        
+        result = await self._generate(
+            "conversation",
+            lambda client: client.generate_conversation_response(prompt, context),
+            estimated_tokens
+        )
+        if result:
+            model, response = result
+            logger.info("Generated response", model=model, response_length=len(response))
+            if use_cache:
+                await self._cache_store(model, prompt, context, response)
+            return response
+        
+        # If every model fails, return a basic response
+        return FALLBACK_RESPONSE
+    
+    async def stream_conversation_response(self, prompt: str, context: Dict[str, Any] = None,
+                                           bypass_cache: bool = False) -> AsyncIterator[str]:
+        """Stream a conversation response, falling back to the next model if one fails before its first token"""
+        use_cache, cached = await self._cache_lookup(prompt, context, bypass_cache)
+        if cached is not None:
+            yield cached
+            return
+        
+        estimated_tokens = self._estimate_tokens(prompt, CONVERSATION_MAX_TOKENS)
+        
+        for model, client in self._available_models("conversation"):
+            produced = False
+            chunks = []
             try:
-                start_time = asyncio.get_event_loop().time()
-                response = await self.anthropic_client.generate_conversation_response(prompt, context)
-                end_time = asyncio.get_event_loop().time()
+                async with self.limiters[model].acquire(estimated_tokens):
+                    async with self.breakers[model].guard():
+                        start_time = asyncio.get_event_loop().time()
+                        async for chunk in client.stream_conversation_response(prompt, context):
+                            produced = True
+                            chunks.append(chunk)
+                            yield chunk
+                        end_time = asyncio.get_event_loop().time()
                 
-                # Update performance metrics
-                self._update_performance("anthropic", True, end_time - start_time)
-                logger.info("Generated response with Anthropic", response_length=len(response))
-                return response
+                self._update_performance(model, True, end_time - start_time)
+                self._record_latency(model, "conversation", end_time - start_time)
+                logger.info("Streamed response", model=model)
+                if use_cache:
+                    await self._cache_store(model, prompt, context, "".join(chunks))
+                return
                 
+            except (ProviderBusyError, CircuitOpenError) as e:
+                logger.warning("Model unavailable, trying next model", model=model, error=str(e))
             except Exception as e:
-                logger.warning("Anthropic failed, trying GooseAI", error=str(e))
-                self._update_performance("anthropic", False, 0)
+                self._update_performance(model, False, 0)
+                self.router.record_failure("conversation", model, e)
+                if produced:
+                    # Tokens already reached the client, so a fallback would garble the message
+                    logger.error("Stream interrupted", model=model, error=str(e))
+                    raise
+                logger.warning("Streaming failed, trying next model", model=model, error=str(e))
         
-        # Fallback to GooseAI
-        if self.goose_ai_client.available:
+        # If every model fails, return a basic response
+        yield FALLBACK_RESPONSE
+    
+    async def generate_complete_project(self, project_idea: str, conversation_history: List[Any],
+                                        conversation_id: Optional[str] = None) -> Dict[str, Any]:
+        """Generate complete project documentation using the best available model
+        
+        With a conversation_id, identical concurrent requests share one generation and a
+        finished result is reused until the conversation's history changes.
+        """
+        if conversation_id is None:
+            return await self._generate_complete_project(project_idea, conversation_history)
+        
+        digest = self._history_digest(project_idea, conversation_history)
+        finished = self._project_results.get(conversation_id)
+        if finished is not None and finished[0] == digest:
+            self._project_results.move_to_end(conversation_id)
+            self.project_dedup_stats["reused"] += 1
+            return finished[1]
+        
+        key = (conversation_id, digest)
+        flight = self._project_flights.get(key)
+        if flight is None:
+            self.project_dedup_stats["generated"] += 1
+            flight = asyncio.ensure_future(self._generate_complete_project(project_idea, conversation_history))
+            self._project_flights[key] = flight
+            flight.add_done_callback(lambda done: self._finish_project_flight(key, done))
+        else:
+            self.project_dedup_stats["joined"] += 1
+            logger.info("Joining in-flight documentation generation", conversation_id=conversation_id)
+        
+        # One caller giving up must not cancel the generation for the others
+        return await asyncio.shield(flight)
+    
+    def _finish_project_flight(self, key: Tuple[str, str], flight: asyncio.Future):
+        self._project_flights.pop(key, None)
+        if flight.cancelled() or flight.exception() is not None or flight.result() == FALLBACK_PROJECT:
+            return
+        
+        conversation_id, digest = key
+        self._project_results[conversation_id] = (digest, flight.result())
+        self._project_results.move_to_end(conversation_id)
+        while len(self._project_results) > PROJECT_RESULTS_MAX_ENTRIES:
+            self._project_results.popitem(last=False)
+    
+    @staticmethod
+    def _history_digest(project_idea: str, conversation_history: List[Any]) -> str:
+        """Hash of the idea and message roles/contents; timestamps do not matter"""
+        digest = hashlib.blake2b(project_idea.encode("utf-8"), digest_size=16)
+        for message in conversation_history:
+            role, content = message_fields(message)
+            digest.update(b"\x00" + role.encode("utf-8") + b"\x01" + content.encode("utf-8"))
+        return digest.hexdigest()
+    
+    async def _generate_complete_project(self, project_idea: str, conversation_history: List[Any]) -> Dict[str, Any]:
+        # Providers pack the history into the documentation context budget
+        history_tokens = min(sum(map(message_tokens, conversation_history)), context_budget("documentation"))
+        estimated_tokens = self._estimate_tokens(project_idea, DOCUMENTATION_MAX_TOKENS) + history_tokens
+        
+        result = await self._generate(
+            "documentation",
+            lambda client: client.generate_complete_project(project_idea, conversation_history),
+            estimated_tokens
+        )
+        if result:
+            model, response = result
+            logger.info("Generated project", model=model, project_name=response.get("project_name"))
+            return response
+        
+        # If every model fails, return a basic response
+        return dict(FALLBACK_PROJECT)
+    
+    async def _cache_lookup(self, prompt: str, context: Optional[Dict[str, Any]],
+                            bypass_cache: bool) -> Tuple[bool, Optional[str]]:
+        """Return (whether to cache the response, cached response from the model the router would pick)"""
+        if not self.response_cache:
+            return False, None
+        if bypass_cache:
+            self.response_cache.record_bypass()
+            return False, None
+        
+        models = self._available_models("conversation")
+        if not models:
+            return True, None
+        
+        cached = self.response_cache.get(await self._cache_key(models[0][0], prompt, context))
+        if cached is not None:
+            logger.info("Served response from cache", model=models[0][0], response_length=len(cached))
+        return True, cached
+    
+    async def _cache_store(self, model: str, prompt: str, context: Optional[Dict[str, Any]], response: str):
+        """Cache a response under the model that produced it, which a fallback or hedge may have changed"""
+        self.response_cache.set(await self._cache_key(model, prompt, context), response)
+    
+    async def _cache_key(self, model: str, prompt: str, context: Optional[Dict[str, Any]]) -> str:
+        """Key on the provider and its model version, so a model upgrade does not serve stale responses"""
+        version = await self._model_clients()[model].conversation_model()
+        return ResponseCache.make_key(prompt, f"{model}:{version}", CONVERSATION_TEMPERATURE, context)
+    
+    def _model_clients(self) -> Dict[str, Any]:
+        """Configured model clients by provider name"""
+        return {
+            "anthropic": self.anthropic_client if self.anthropic_client.client else None,
+            "goose_ai": self.goose_ai_client if self.goose_ai_client.available else None
+        }
+    
+    def _available_models(self, task_type: str) -> List[Tuple[str, Any]]:
+        """Get configured model clients whose circuit admits requests, in the router's order"""
+        clients = self._model_clients()
+        order = self.router.rank(task_type, self.model_preferences.get(task_type, ["anthropic", "goose_ai"]))
+        return [
+            (model, clients[model]) for model in order
+            if clients.get(model) and self.breakers[model].is_available()
+        ]
+    
+    async def _generate(self, task_type: str, make_call: Callable[[Any], Awaitable[Any]],
+                        estimated_tokens: int) -> Optional[Tuple[str, Any]]:
+        """Try models in preference order, hedging the primary when enabled; None if all fail"""
+        models = self._available_models(task_type)
+        
+        if settings.HEDGING_ENABLED and len(models) >= 2:
+            return await self._generate_hedged(task_type, models[0], models[1], make_call, estimated_tokens)
+        
+        for model, client in models:
             try:
-                start_time = asyncio.get_event_loop().time()
-                response = await self.goose_ai_client.generate_conversation_response(prompt, context)
-                end_time = asyncio.get_event_loop().time()
-                
-                # Update performance metrics
-                self._update_performance("goose_ai", True, end_time - start_time)
-                logger.info("Generated response with GooseAI", response_length=len(response))
-                return response
-                
+                response = await self._call_model(model, task_type, lambda: make_call(client), estimated_tokens)
+                return model, response
             except Exception as e:
-                logger.error("GooseAI also failed", error=str(e))
-                self._update_performance("goose_ai", False, 0)
+                self._record_model_error(model, task_type, e)
         
-        # If both fail, return a basic response
-        return "I'm having trouble responding right now. Please try again."
+        return None
     
-    async def generate_complete_project(self, project_idea: str, conversation_history: List[Dict]) -> Dict[str, Any]:
-        """Generate complete project documentation using the best available model"""
+    async def _generate_hedged(self, task_type: str, primary: Tuple[str, Any], secondary: Tuple[str, Any],
+                               make_call: Callable[[Any], Awaitable[Any]],
+                               estimated_tokens: int) -> Optional[Tuple[str, Any]]:
+        """Race a secondary request if the primary is slower than its recent p95; first success wins"""
+        primary_model, primary_client = primary
+        secondary_model, secondary_client = secondary
         
-        # Try Anthropic first (preferred for documentation)
-        if self.anthropic_client.client:
-            try:
-                start_time = asyncio.get_event_loop().time()
-                response = await self.anthropic_client.generate_complete_project(project_idea, conversation_history)
-                end_time = asyncio.get_event_loop().time()
+        def start(model: str, client: Any) -> asyncio.Task:
+            return asyncio.ensure_future(
+                self._call_model(model, task_type, lambda: make_call(client), estimated_tokens)
+            )
+        
+        self.hedge_stats["requests"] += 1
+        delay = self._hedge_delay(primary_model, task_type)
+        pending = {start(primary_model, primary_client): primary_model}
+        secondary_started = False
+        hedge_fired = False
+        
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending.keys(),
+                    timeout=None if secondary_started else delay,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
                 
-                # Update performance metrics
-                self._update_performance("anthropic", True, end_time - start_time)
-                logger.info("Generated project with Anthropic", project_name=response.get("project_name"))
-                return response
+                if not done:
+                    # Primary passed its latency threshold, so race the secondary
+                    hedge_fired = True
+                    self.hedge_stats["fired"] += 1
+                    logger.info("Hedging request", primary=primary_model, secondary=secondary_model,
+                               task_type=task_type, threshold=round(delay, 3))
+                    secondary_started = True
+                    pending[start(secondary_model, secondary_client)] = secondary_model
+                    continue
                 
-            except Exception as e:
-                logger.warning("Anthropic failed for project generation, trying GooseAI", error=str(e))
-                self._update_performance("anthropic", False, 0)
+                for task in done:
+                    model = pending.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        self._record_model_error(model, task_type, e)
+                        continue
+                    
+                    if hedge_fired and model == secondary_model:
+                        self.hedge_stats["won"] += 1
+                    return model, response
+                
+                if not secondary_started:
+                    # Primary failed before the threshold: plain fallback, not a hedge
+                    secondary_started = True
+                    pending[start(secondary_model, secondary_client)] = secondary_model
+        finally:
+            # Cancel the loser (or everything, if we were cancelled ourselves)
+            for task in pending:
+                task.cancel()
         
-        # Fallback to GooseAI
-        if self.goose_ai_client.available:
-            try:
+        return None
+    
+    def _hedge_delay(self, model: str, task_type: str) -> float:
+        """Hedge threshold: the model's recent p95 latency for this task, floored at HEDGE_MIN_DELAY"""
+        samples = self.latency_samples.get((model, task_type))
+        if not samples or len(samples) < settings.HEDGE_MIN_SAMPLES:
+            return settings.HEDGE_DEFAULT_DELAY
+        
+        ordered = sorted(samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return max(p95, settings.HEDGE_MIN_DELAY)
+    
+    async def _call_model(self, model: str, task_type: str, call: Callable[[], Awaitable[Any]],
+                          estimated_tokens: int) -> Any:
+        """Run one model call inside its admission slot and record its latency"""
+        async with self.limiters[model].acquire(estimated_tokens):
+            async with self.breakers[model].guard():
                 start_time = asyncio.get_event_loop().time()
-                response = await self.goose_ai_client.generate_complete_project(project_idea, conversation_history)
+                response = await call()
                 end_time = asyncio.get_event_loop().time()
-                
-                # Update performance metrics
-                self._update_performance("goose_ai", True, end_time - start_time)
-                logger.info("Generated project with GooseAI", project_name=response.get("project_name"))
-                return response
-                
-            except Exception as e:
-                logger.error("GooseAI also failed for project generation", error=str(e))
-                self._update_performance("goose_ai", False, 0)
         
-        # If both fail, return a basic response
-        return {
-            "project_name": "Project",
-            "overview": "Documentation generation failed. Please try again.",
-            "setup_guide": "",
-            "implementation_guide": "",
-            "backend": "",
-            "frontend": "",
-            "config": "",
-            "dependencies": [],
-            "github_issues": []
-        }
+        # Update performance metrics
+        self._update_performance(model, True, end_time - start_time)
+        self._record_latency(model, task_type, end_time - start_time)
+        return response
+    
+    def _record_model_error(self, model: str, task_type: str, error: Exception):
+        """Log a failed model call; admission and circuit rejections are not counted as failures"""
+        if isinstance(error, (ProviderBusyError, CircuitOpenError)):
+            logger.warning("Model unavailable, trying next model", model=model, task_type=task_type, error=str(error))
+            return
+        
+        logger.warning("Model failed, trying next model", model=model, task_type=task_type, error=str(error))
+        self._update_performance(model, False, 0)
+        self.router.record_failure(task_type, model, error)
+    
+    def _record_latency(self, model: str, task_type: str, response_time: float):
+        """Keep a rolling window of successful latencies per model and task"""
+        self.router.record_success(task_type, model, response_time)
+        key = (model, task_type)
+        if key not in self.latency_samples:
+            self.latency_samples[key] = deque(maxlen=settings.HEDGE_LATENCY_WINDOW)
+        self.latency_samples[key].append(response_time)
+    
+    def _estimate_tokens(self, text: str, max_output_tokens: int) -> int:
+        """Rough token estimate (about 4 characters per token) plus the output ceiling"""
+        return len(text) // 4 + max_output_tokens
     
     async def test_all_models(self) -> Dict[str, Any]:
         """Test all available models and return status"""
@@ -192,11 +496,49 @@ class MultiModelService:
                 "success_rate": round(success_rate, 2),
                 "avg_response_time": round(metrics["avg_response_time"], 3),
                 "success_count": metrics["success"],
-                "failure_count": metrics["failure"]
+                "failure_count": metrics["failure"],
+                "admission": self.limiters[model].get_stats(),
+                "circuit_breaker": self.breakers[model].get_stats()
             }
         
         return stats
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache statistics"""
+        if not self.response_cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.response_cache.get_stats()}
+    
+    def get_project_dedup_stats(self) -> Dict[str, Any]:
+        """Get documentation single-flight statistics"""
+        return {
+            "in_flight": len(self._project_flights),
+            "finished_entries": len(self._project_results),
+            **self.project_dedup_stats
+        }
+    
+    def get_circuit_states(self) -> Dict[str, str]:
+        """Get the circuit breaker state for each model"""
+        return {model: breaker.state for model, breaker in self.breakers.items()}
+    
+    def get_hedging_stats(self) -> Dict[str, Any]:
+        """Get how often hedges fire and win, plus the current thresholds"""
+        requests = self.hedge_stats["requests"]
+        fired = self.hedge_stats["fired"]
+        
+        return {
+            "enabled": settings.HEDGING_ENABLED,
+            "hedged_requests": requests,
+            "hedges_fired": fired,
+            "hedges_won": self.hedge_stats["won"],
+            "fire_rate": round(fired / requests * 100, 2) if requests else 0,
+            "win_rate": round(self.hedge_stats["won"] / fired * 100, 2) if fired else 0,
+            "thresholds": {
+                f"{model}:{task_type}": round(self._hedge_delay(model, task_type), 3)
+                for model, task_type in self.latency_samples
+            }
+        }
+    
     async def get_available_models(self) -> Dict[str, List[str]]:
         """Get available models from all providers"""
         models = {}
@@ -217,22 +559,9 @@ class MultiModelService:
         
         return models
     
-    def get_model_recommendations(self) -> Dict[str, str]:
-        """Get model recommendations based on performance"""
-        recommendations = {}
-        
-        for task_type in ["conversation", "documentation", "code", "analysis"]:
-            # Simple recommendation logic based on success rates
-            anthropic_success_rate = self.model_performance["anthropic"]["success"] / max(
-                self.model_performance["anthropic"]["success"] + self.model_performance["anthropic"]["failure"], 1
-            )
-            goose_ai_success_rate = self.model_performance["goose_ai"]["success"] / max(
-                self.model_performance["goose_ai"]["success"] + self.model_performance["goose_ai"]["failure"], 1
-            )
-            
-            if anthropic_success_rate >= goose_ai_success_rate:
-                recommendations[task_type] = "anthropic"
-            else:
-                recommendations[task_type] = "goose_ai"
-        
-        return recommendations 
\ No newline at end of file
+    def get_model_recommendations(self) -> Dict[str, Any]:
+        """Get per-task model order with the routing inputs behind it"""
+        return {
+            task_type: self.router.describe(task_type, default_order)
+            for task_type, default_order in self.model_preferences.items()
+        }
@@ -0,0 +1,282 @@
+"""
+Project archive building
+Turns generated documentation into archive members and streams the archive without temp files
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tarfile
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Tuple
+
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Format name -> media type
+ARCHIVE_FORMATS = {
+    "zip": "application/zip",
+    "tar.gz": "application/gzip",
+    "tar.zst": "application/zstd"
+}
+
+ARCHIVE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ARCHIVE_MTIME = 315532800  # the same instant as a Unix timestamp
+
+DEFLATE_LEVEL = 6
+ZSTD_LEVEL = 3
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_MAX_BLOCK = 128 * 1024
+
+# Recompressing these only costs CPU, so they are stored as-is
+COMPRESSED_EXTENSIONS = frozenset({
+    ".7z", ".br", ".bz2", ".gif", ".gz", ".jpeg", ".jpg", ".mp3", ".mp4", ".png",
+    ".tgz", ".webm", ".webp", ".woff", ".woff2", ".xz", ".zip", ".zst"
+})
+
+# zlib and zstandard release the GIL while compressing, so members compress in parallel
+_compression_pool = ThreadPoolExecutor(max_workers=settings.ARCHIVE_COMPRESSION_WORKERS,
+                                       thread_name_prefix="archive")
+
+
+def generation_time(conversation: Dict[str, Any]) -> str:
+    """When the conversation's documentation was generated; later turns do not change it"""
+    return conversation.get("documentation_generated_at") or conversation.get("last_activity", "")
+
+
+def project_files(complete_project: Dict[str, Any], conversation: Dict[str, Any],
+                  conversation_id: str) -> Iterator[Tuple[str, bytes]]:
+    """Yield (path, content) for every archive member of a generated project"""
+
+    generated_at = generation_time(conversation)
+    
+    # Add project metadata
+    metadata = {
+        "project_name": complete_project.get("project_name", "Project"),
+        "description": complete_project.get("description", ""),
+        "generated_at": generated_at,
+        "conversation_id": conversation_id
+    }
+    yield "project-metadata.json", json.dumps(metadata, indent=2).encode("utf-8")
+
+    # Add file structure
+    file_structure = complete_project.get("file_structure", {})
+
+    # Add backend, frontend and configuration files
+    for section in ("backend", "frontend", "config"):
+        for file_config in file_structure.get(section, []):
+            yield file_config.get("path", ""), str(file_config.get("content", "")).encode("utf-8")
+
+    # Add documentation files
+    docs_structure = file_structure.get("docs", {})
+    for category, files in docs_structure.items():
+        if not isinstance(files, dict):
+            continue
+        for filename, file_data in files.items():
+            if isinstance(file_data, dict):
+                yield f"docs/{category}/{filename}", str(file_data.get("content", "")).encode("utf-8")
+
+    # Add dependencies
+    dependencies = complete_project.get("dependencies", {})
+    if dependencies:
+        yield "dependencies.json", json.dumps(dependencies, indent=2).encode("utf-8")
+
+    # Add GitHub issues
+    github_issues = complete_project.get("github_issues", [])
+    if github_issues:
+        yield "github-issues.json", json.dumps(github_issues, indent=2).encode("utf-8")
+
+    # Add README
+    readme_content = f"""# {complete_project.get("project_name", "Project")}
+
+{complete_project.get("description", "Project description")}
+
+## Project Structure
+
+This project was generated using the Project Architect AI system.
+
+### Components
+- Backend: {len(file_structure.get("backend", []))} files
+- Frontend: {len(file_structure.get("frontend", []))} files
+- Documentation: {len(docs_structure.get("architecture", {})) + len(docs_structure.get("technical", {})) + len(docs_structure.get("business", {}))} files
+
+### Getting Started
+
+1. Install dependencies
+2. Configure environment variables
+3. Run the application
+
+See the documentation in the `docs/` folder for detailed instructions.
+
+Generated on: {generated_at}
+"""
+    yield "README.md", readme_content.encode("utf-8")
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def build_manifest(complete_project: Dict[str, Any], conversation: Dict[str, Any],
+                   conversation_id: str) -> Dict[str, str]:
+    """Map every archive path to the hash of its content"""
+    return {
+        path: content_hash(content)
+        for path, content in project_files(complete_project, conversation, conversation_id)
+    }
+
+
+def diff_manifests(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, list]:
+    """Paths added, changed and deleted going from one manifest to another"""
+    return {
+        "added": sorted(path for path in new if path not in old),
+        "changed": sorted(path for path in new if path in old and old[path] != new[path]),
+        "deleted": sorted(path for path in old if path not in new)
+    }
+
+
+def supported_formats() -> List[str]:
+    """Archive formats that can be built with the installed packages"""
+    return [name for name in ARCHIVE_FORMATS if name != "tar.zst" or zstandard is not None]
+
+
+def is_precompressed(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS
+
+
+def _parallel_map(function: Callable[[str, bytes], Any], files: Iterable[Tuple[str, bytes]]) -> Iterator[Any]:
+    """Apply function to each member on the compression pool, yielding results in input order
+
+    At most two results per worker are outstanding, so memory stays bounded
+    while the consumer is slower than the pool.
+    """
+    pending = deque()
+    lookahead = settings.ARCHIVE_COMPRESSION_WORKERS * 2
+    for path, content in files:
+        pending.append(_compression_pool.submit(function, path, content))
+        if len(pending) >= lookahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _deflate_member(path: str, content: bytes) -> Tuple[str, int, int, int, bytes]:
+    if not is_precompressed(path):
+        compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        data = compressor.compress(content) + compressor.flush()
+        if len(data) < len(content):
+            return path, zipfile.ZIP_DEFLATED, zlib.crc32(content), len(content), data
+    return path, zipfile.ZIP_STORED, zlib.crc32(content), len(content), content
+
+
+def _dos_date_time() -> Tuple[int, int]:
+    year, month, day, hour, minute, second = ARCHIVE_DATE_TIME
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+def stream_zip(files: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Build a ZIP archive incrementally from members compressed in parallel
+
+    Each member is deflated whole on the compression pool, so its CRC and sizes
+    are known before its local header is written and no data descriptors are
+    needed. Members are emitted in input order. ZIP64 is not written; generated
+    projects are far below its 4 GiB and 65535-member limits.
+    """
+    dos_date, dos_time = _dos_date_time()
+    central_directory = []
+    offset = 0
+
+    for path, method, crc, size, data in _parallel_map(_deflate_member, files):
+        name = path.encode("utf-8")
+        flags = 0x800 if not name.isascii() else 0  # UTF-8 file name
+        local_header = struct.pack(
+            zipfile.structFileHeader, zipfile.stringFileHeader, 20, 0, flags, method,
+            dos_time, dos_date, crc, len(data), size, len(name), 0
+        )
+        central_directory.append(struct.pack(
+            zipfile.structCentralDir, zipfile.stringCentralDir, 20, 3, 20, 0, flags, method,
+            dos_time, dos_date, crc, len(data), size, len(name), 0, 0, 0, 0, 0o644 << 16, offset
+        ) + name)
+        if offset + len(data) > zipfile.ZIP64_LIMIT or len(central_directory) > zipfile.ZIP_FILECOUNT_LIMIT:
+            raise ValueError("Project is too large for a ZIP archive without ZIP64")
+        yield local_header + name
+        yield data
+        offset += len(local_header) + len(name) + len(data)
+
+    directory = b"".join(central_directory)
+    yield directory + struct.pack(
+        zipfile.structEndArchive, zipfile.stringEndArchive, 0, 0,
+        len(central_directory), len(central_directory), len(directory), offset, 0
+    )
+
+
+def _tar_member(path: str, content: bytes) -> bytes:
+    info = tarfile.TarInfo(path)
+    info.size = len(content)
+    info.mtime = ARCHIVE_MTIME
+    info.mode = 0o644
+    padding = -len(content) % tarfile.BLOCKSIZE
+    return info.tobuf(tarfile.PAX_FORMAT) + content + tarfile.NUL * padding
+
+
+def _gzip(data: bytes, precompressed: bool = False) -> bytes:
+    # Concatenated gzip members decompress as one stream; level 0 stores compressed files
+    return zlib.compress(data, 0 if precompressed else DEFLATE_LEVEL, wbits=16 + zlib.MAX_WBITS)
+
+
+def _zstd(data: bytes, precompressed: bool = False) -> bytes:
+    # Likewise for zstd frames; compressed files go into a frame of raw blocks
+    if precompressed:
+        return _zstd_raw_frame(data)
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def _zstd_raw_frame(data: bytes) -> bytes:
+    """A zstd frame that stores data uncompressed, the zstd counterpart of deflate level 0"""
+    # Single-segment frame with an 8-byte content size, so no window descriptor follows
+    parts = [ZSTD_MAGIC, b"\xe0", struct.pack("<Q", len(data))]
+    blocks = [data[start:start + ZSTD_MAX_BLOCK] for start in range(0, len(data), ZSTD_MAX_BLOCK)] or [b""]
+    for index, block in enumerate(blocks):
+        # 3-byte block header: last-block bit, block type 0 (raw), then the size
+        last = index == len(blocks) - 1
+        parts.append(struct.pack("<I", len(block) << 3 | last)[:3])
+        parts.append(block)
+    return b"".join(parts)
+
+
+def _stream_tar(files: Iterable[Tuple[str, bytes]], compress: Callable[[bytes, bool], bytes]) -> Iterator[bytes]:
+    """Build a compressed tar archive from members compressed independently in parallel
+
+    Every member becomes its own gzip member or zstd frame, and both formats
+    decompress a concatenation of those as a single stream.
+    """
+    def compress_member(path: str, content: bytes) -> Tuple[int, bytes]:
+        member = _tar_member(path, content)
+        return len(member), compress(member, is_precompressed(path))
+
+    size = 0
+    for member_size, data in _parallel_map(compress_member, files):
+        size += member_size
+        yield data
+
+    # End-of-archive marker, padded to a whole record like tarfile does
+    trailer = 2 * tarfile.BLOCKSIZE
+    trailer += -(size + trailer) % tarfile.RECORDSIZE
+    yield compress(tarfile.NUL * trailer)
+
+
+def stream_archive(files: Iterable[Tuple[str, bytes]], archive_format: str = "zip") -> Iterator[bytes]:
+    """Stream project files as an archive in one of ARCHIVE_FORMATS"""
+    if archive_format not in supported_formats():
+        raise ValueError(f"Unsupported archive format: {archive_format}")
+    if archive_format == "zip":
+        return stream_zip(files)
+    return _stream_tar(files, _gzip if archive_format == "tar.gz" else _zstd)
@@ -0,0 +1,120 @@
+"""
+Per-provider admission control for model requests
+Caps in-flight calls and paces requests and tokens per minute so bursts queue instead of hitting 429s
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class ProviderBusyError(Exception):
+    """Raised when a provider's wait queue is full or the wait took too long"""
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.fill_rate = per_minute / 60.0
+        self.updated_at = time.monotonic()
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.fill_rate)
+        self.updated_at = now
+
+    async def take(self, amount: float):
+        """Wait until `amount` tokens are available, then consume them"""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(float(amount), self.capacity)
+
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.fill_rate)
+                self._refill()
+            self.tokens -= amount
+
+
+class ProviderLimiter:
+    """Max-in-flight semaphore plus request and token buckets behind a bounded wait queue"""
+
+    def __init__(self, name: str, max_in_flight: int, requests_per_minute: int,
+                 tokens_per_minute: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        # A rate of 0 disables that bucket
+        self._request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.stats = {"admitted": 0, "rejected": 0, "timed_out": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    async def _admit(self, estimated_tokens: int):
+        await self._semaphore.acquire()
+        try:
+            if self._request_bucket:
+                await self._request_bucket.take(1)
+            if self._token_bucket:
+                await self._token_bucket.take(estimated_tokens)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    @asynccontextmanager
+    async def acquire(self, estimated_tokens: int = 0) -> AsyncIterator[None]:
+        """Hold an admission slot for the duration of one provider call"""
+        if self.queue_depth >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise ProviderBusyError(f"{self.name} wait queue is full ({self.max_queue})")
+
+        self.queue_depth += 1
+        start_time = time.monotonic()
+        try:
+            await asyncio.wait_for(self._admit(estimated_tokens), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise ProviderBusyError(f"{self.name} admission wait exceeded {self.max_wait}s")
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - start_time
+        self.stats["admitted"] += 1
+        self.stats["total_wait"] += waited
+        self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+        if waited > 1.0:
+            logger.info("Request queued for provider", provider=self.name, wait_time=round(waited, 3))
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, in-flight count and wait times"""
+        admitted = self.stats["admitted"]
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "admitted": admitted,
+            "rejected": self.stats["rejected"],
+            "timed_out": self.stats["timed_out"],
+            "avg_wait_time": round(self.stats["total_wait"] / admitted, 3) if admitted else 0,
+            "max_wait_time": round(self.stats["max_wait"], 3)
+        }
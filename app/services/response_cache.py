@@ -0,0 +1,95 @@
+"""
+Response cache for conversation generation
+Byte-bounded LRU with TTL expiry, keyed by a hash of the normalized prompt, model and temperature
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Rough per-entry bookkeeping cost on top of key and value bytes
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace and case so trivially different prompts share a key"""
+    return " ".join(prompt.lower().split())
+
+
+class ResponseCache:
+    """LRU cache of generated responses bounded by total bytes"""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (response, expires_at, size)
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self.current_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "evictions": 0, "expirations": 0}
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float, context: Dict[str, Any] = None) -> str:
+        """Hash the normalized prompt with the model, temperature and any context"""
+        parts = [normalize_prompt(prompt), model, f"{temperature:.3f}"]
+        if context:
+            parts.append(json.dumps(context, sort_keys=True, default=str))
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response, refreshing its LRU position"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        response, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return response
+
+    def set(self, key: str, response: str):
+        """Store a response, evicting least recently used entries to stay under max_bytes"""
+        size = len(key) + len(response.encode("utf-8")) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (response, time.monotonic() + self.ttl, size)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats["evictions"] += 1
+
+    def record_bypass(self):
+        self.stats["bypassed"] += 1
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups * 100, 2) if lookups else 0,
+            "entries": len(self._entries),
+            "current_bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl
+        }
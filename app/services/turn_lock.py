@@ -0,0 +1,106 @@
+"""
+Per-conversation turn serialization
+One async lock per active conversation, so turns of the same conversation run in order
+while different conversations never wait on each other
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class ConversationBusyError(Exception):
+    """Raised when a conversation already has the maximum number of turns waiting"""
+
+
+class _TurnSlot:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # the running turn plus queued ones
+
+
+class TurnLocks:
+    """Lock map keyed by conversation id with a bounded per-conversation queue
+
+    A slot exists only while a turn holds or waits for it and is dropped when
+    the last user leaves, so memory is bounded by the number of turns in
+    progress rather than by the number of conversations ever seen.
+    """
+
+    def __init__(self, max_queued: int, max_wait: float):
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self._slots: Dict[str, _TurnSlot] = {}
+        self.stats = {"acquired": 0, "queued": 0, "rejected": 0, "timed_out": 0, "total_wait": 0.0, "max_slots": 0}
+
+    def is_busy(self, conversation_id: str) -> bool:
+        """True when a new turn would be rejected right away"""
+        slot = self._slots.get(conversation_id)
+        return slot is not None and slot.users > self.max_queued
+
+    def is_locked(self, conversation_id: str) -> bool:
+        slot = self._slots.get(conversation_id)
+        return slot is not None and slot.lock.locked()
+
+    def discard(self, conversation_id: str):
+        """Drop an unused slot, e.g. when its conversation expires"""
+        slot = self._slots.get(conversation_id)
+        if slot is not None and slot.users == 0:
+            del self._slots[conversation_id]
+
+    @asynccontextmanager
+    async def hold(self, conversation_id: str) -> AsyncIterator[None]:
+        """Run one turn of a conversation exclusively, queueing behind the current one"""
+        slot = self._slots.get(conversation_id)
+        if slot is None:
+            slot = self._slots[conversation_id] = _TurnSlot()
+            self.stats["max_slots"] = max(self.stats["max_slots"], len(self._slots))
+        elif slot.users > self.max_queued:
+            self.stats["rejected"] += 1
+            raise ConversationBusyError(
+                f"Conversation {conversation_id} already has a turn in progress and {self.max_queued} queued"
+            )
+
+        slot.users += 1
+        try:
+            if slot.users > 1:
+                self.stats["queued"] += 1
+            start_time = time.monotonic()
+            try:
+                await asyncio.wait_for(slot.lock.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                self.stats["timed_out"] += 1
+                raise ConversationBusyError(
+                    f"Timed out after {self.max_wait}s waiting for the previous turn of conversation {conversation_id}"
+                )
+            self.stats["total_wait"] += time.monotonic() - start_time
+            self.stats["acquired"] += 1
+
+            try:
+                yield
+            finally:
+                slot.lock.release()
+        finally:
+            slot.users -= 1
+            if slot.users == 0 and self._slots.get(conversation_id) is slot:
+                del self._slots[conversation_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        acquired = self.stats["acquired"]
+        return {
+            "active": len(self._slots),
+            "max_queued": self.max_queued,
+            "max_wait": self.max_wait,
+            "acquired": acquired,
+            "queued": self.stats["queued"],
+            "rejected": self.stats["rejected"],
+            "timed_out": self.stats["timed_out"],
+            "avg_wait_ms": round(self.stats["total_wait"] / acquired * 1000, 3) if acquired else 0,
+            "max_slots": self.stats["max_slots"]
+        }
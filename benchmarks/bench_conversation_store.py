@@ -0,0 +1,80 @@
+"""
+Per-turn overhead of the conversation stores
+
+Measures what a turn pays on the request path (save()), what the write-behind
+flusher pays per turn, and what a cold load of a full history costs.
+
+    python benchmarks/bench_conversation_store.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+# Settings are read at import; keep the benchmark database out of the working tree
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.conversation_store import InMemoryConversationStore, SQLiteConversationStore  # noqa: E402
+from app.services.message import Message  # noqa: E402
+
+CONVERSATIONS = 200
+TURNS = 25
+MESSAGE = "Could the backend use Postgres with a read replica for the reporting queries? " * 4
+
+
+def _conversation():
+    return {"id": str(uuid.uuid4()), "project_idea": "A todo app for remote teams", "phase": "conversation",
+            "messages": [], "started_at": "2024-01-01T00:00:00"}
+
+
+async def _run_turns(store, between_rounds=None):
+    """Interleave turns across conversations the way concurrent users would; returns save() time"""
+    conversations = [_conversation() for _ in range(CONVERSATIONS)]
+    save_time = 0.0
+    for _ in range(TURNS):
+        for conversation in conversations:
+            conversation["messages"].append(Message("user", MESSAGE))
+            conversation["messages"].append(Message("assistant", MESSAGE))
+            start = time.perf_counter()
+            store.save(conversation)
+            save_time += time.perf_counter() - start
+        # Turns are seconds apart in practice, long enough for the flusher to write each round
+        if between_rounds is not None:
+            await between_rounds()
+    return conversations, save_time
+
+
+async def main():
+    turns = CONVERSATIONS * TURNS
+    print(f"{CONVERSATIONS} conversations x {TURNS} turns, {len(MESSAGE)} chars per message")
+
+    memory = InMemoryConversationStore()
+    _, save_time = await _run_turns(memory)
+    print(f"memory  save(): {save_time / turns * 1e6:8.2f} us/turn")
+
+    sqlite = SQLiteConversationStore(settings.DATABASE_URL, flush_interval=settings.STORE_FLUSH_INTERVAL,
+                                     batch_size=settings.STORE_BATCH_SIZE, history_limit=settings.MAX_CONVERSATION_LENGTH)
+    await sqlite.start()
+    conversations, save_time = await _run_turns(sqlite, sqlite.flush)
+    stats = sqlite.get_stats()
+    flush_time = stats["avg_flush_ms"] * stats["batches"] / 1000
+    print(f"sqlite  save(): {save_time / turns * 1e6:8.2f} us/turn on the request path")
+    print(f"sqlite  flush:  {flush_time / turns * 1e6:8.2f} us/turn off the request path "
+          f"({stats['batches']} batches, {stats['avg_batch_size']} conversations each)")
+
+    start = time.perf_counter()
+    for conversation in conversations[:50]:
+        await sqlite.load(conversation["id"])
+    cold = (time.perf_counter() - start) / 50
+    print(f"sqlite  load(): {cold * 1000:8.2f} ms per cold load of {len(conversations[0]['messages'])} messages "
+          f"(last {settings.MAX_CONVERSATION_LENGTH} read)")
+    await sqlite.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
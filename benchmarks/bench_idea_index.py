@@ -0,0 +1,93 @@
+"""
+Hit rate and lookup latency of the near-duplicate idea index at 100k ideas
+
+Indexes 100k project ideas built from shared templates, so many of them differ
+by a single word, then looks up rewordings of indexed ideas (should hit the
+idea they came from) and ideas from an unrelated vocabulary (should miss).
+
+    python benchmarks/bench_idea_index.py
+"""
+
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.idea_index import IdeaIndex  # noqa: E402
+
+IDEAS = 100_000
+QUERIES = 2_000
+
+PRODUCTS = ["todo app", "recipe site", "budget tracker", "fitness log", "chat app", "booking system",
+            "inventory tool", "job board", "learning platform", "photo gallery", "crm", "event planner",
+            "habit tracker", "note taking app", "expense splitter", "music player", "news reader",
+            "pet care app", "travel planner", "wiki"]
+AUDIENCES = ["remote teams", "families", "students", "small shops", "freelancers", "nonprofits",
+             "clinics", "gyms", "schools", "restaurants", "landlords", "artists", "developers",
+             "retirees", "startups", "churches", "farmers", "musicians", "coaches", "libraries"]
+FEATURES = ["a shared calendar", "offline mode", "push reminders", "a public api", "dark mode",
+            "csv export", "team chat", "role based access", "a mobile app", "payments", "analytics",
+            "map view", "file uploads", "voice notes", "two factor login", "email digests",
+            "kanban boards", "a browser extension", "slack integration", "multi currency"]
+UNRELATED = ["quantum", "telescope", "violin", "glacier", "harbor", "orchid", "volcano", "saffron",
+             "monsoon", "lantern", "compass", "meteor", "canyon", "falcon", "tundra", "mosaic"]
+
+
+def _ideas():
+    combos = itertools.product(PRODUCTS, AUDIENCES, FEATURES, FEATURES)
+    ideas = (f"A {product} for {audience} with {first} and {second}"
+             for product, audience, first, second in combos if first != second)
+    return list(itertools.islice(ideas, IDEAS))
+
+
+def _reword(idea: str, rng: random.Random) -> str:
+    """The kind of rewording a user produces when asking for the same thing again"""
+    choice = rng.randrange(3)
+    if choice == 0:
+        return idea.upper().replace(" WITH ", ", with ") + "!"
+    if choice == 1:
+        return idea.replace("A ", "", 1).replace(" a ", " ")
+    position = rng.randrange(2, len(idea) - 2)
+    return idea[:position] + idea[position + 1:]  # a dropped character
+
+
+def main():
+    rng = random.Random(1)
+    ideas = _ideas()
+    index = IdeaIndex(similarity_threshold=settings.IDEA_CACHE_SIMILARITY, max_entries=IDEAS)
+    start = time.perf_counter()
+    for i, idea in enumerate(ideas):
+        index.add(idea, {"idea": i})
+    print(f"indexed {len(ideas)} ideas in {time.perf_counter() - start:.1f} s, "
+          f"threshold {settings.IDEA_CACHE_SIMILARITY}")
+
+    sources = rng.sample(range(len(ideas)), QUERIES)
+    timings, hits, same_idea = [], 0, 0
+    for source in sources:
+        start = time.perf_counter()
+        match = index.lookup(_reword(ideas[source], rng))
+        timings.append(time.perf_counter() - start)
+        if match is not None:
+            hits += 1
+            same_idea += match[1]["idea"] == source
+
+    false_hits = 0
+    for _ in range(QUERIES):
+        idea = "A " + " ".join(rng.sample(UNRELATED, 6))
+        start = time.perf_counter()
+        false_hits += index.lookup(idea) is not None
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    print(f"rewordings:  hit rate {hits / QUERIES:.1%}, matched their own idea {same_idea / QUERIES:.1%}")
+    print(f"unrelated:   false hit rate {false_hits / QUERIES:.1%}")
+    print(f"lookup:      avg {sum(timings) / len(timings) * 1000:.3f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1000:.3f} ms, max {timings[-1] * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
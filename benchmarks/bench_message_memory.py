@@ -0,0 +1,90 @@
+"""
+Memory held per conversation by the message history
+
+Builds the same conversations three ways and measures them with tracemalloc:
+the old {role, content, timestamp} dicts with ISO strings and no length cap,
+Message records without the cap, and Message records appended through
+ConversationService, which keeps the last MAX_CONVERSATION_LENGTH messages.
+
+    python benchmarks/bench_message_memory.py
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+# Settings are read at import; keep the benchmark database out of the working tree
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.conversation_service import ConversationService  # noqa: E402
+from app.services.conversation_store import InMemoryConversationStore  # noqa: E402
+from app.services.message import Message  # noqa: E402
+
+CONVERSATIONS = 200
+TURNS = 50
+MESSAGE_CHARS = 370  # about the mean message length of a planning conversation
+
+
+def _contents():
+    # One distinct string per message, created before measuring so all three layouts share them
+    return [[f"{c:04d}-{m:03d} " + "x" * (MESSAGE_CHARS - 9) for m in range(2 * TURNS)]
+            for c in range(CONVERSATIONS)]
+
+
+def _dict_messages(contents):
+    return [{"id": str(c), "messages": [
+        {"role": "user" if m % 2 == 0 else "assistant", "content": content,
+         "timestamp": datetime.utcnow().isoformat()}
+        for m, content in enumerate(messages)
+    ]} for c, messages in enumerate(contents)]
+
+
+def _message_records(contents):
+    return [{"id": str(c), "messages": [
+        Message("user" if m % 2 == 0 else "assistant", content) for m, content in enumerate(messages)
+    ]} for c, messages in enumerate(contents)]
+
+
+def _capped_records(contents):
+    service = ConversationService(multi_model_service=object(), store=InMemoryConversationStore())
+    conversations = []
+    for c, messages in enumerate(contents):
+        conversation = {"id": str(c), "messages": []}
+        for m, content in enumerate(messages):
+            service._append_message(conversation, "user" if m % 2 == 0 else "assistant", content)
+        conversations.append(conversation)
+    return conversations
+
+
+def _measure(build, contents):
+    """Bytes held per conversation, and how much of it is message content"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    conversations = build(contents)
+    held = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    tracemalloc.stop()
+
+    content = sum(sys.getsizeof(message["content"] if isinstance(message, dict) else message.content)
+                  for conversation in conversations for message in conversation["messages"])
+    return held / CONVERSATIONS, content / CONVERSATIONS, len(conversations[0]["messages"])
+
+
+def main():
+    contents = _contents()
+    print(f"{CONVERSATIONS} conversations x {TURNS} turns, {MESSAGE_CHARS} chars per message, "
+          f"MAX_CONVERSATION_LENGTH={settings.MAX_CONVERSATION_LENGTH}")
+
+    for name, build in (("dict messages", _dict_messages), ("Message records", _message_records),
+                        ("records, capped", _capped_records)):
+        held, content, count = _measure(build, contents)
+        # Content strings exist before measuring, so "held" is the structure the history adds on top
+        print(f"{name:16s} {count:4d} messages  {held / 1024:6.1f} KB structure + {content / 1024:5.1f} KB content "
+              f"= {(held + content) / 1024:6.1f} KB per conversation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Peak memory and time to first byte of a project ZIP download
+
+Compares the streamed ZIP against the temp-file path it replaced: a zipfile
+written to a NamedTemporaryFile, then read back in chunks the way FileResponse
+sends it. Each path runs in its own process so peak RSS is not shared.
+
+    python benchmarks/bench_zip_streaming.py
+"""
+
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.project_archive import project_files, stream_zip  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+FILES = 500
+FILE_BYTES = 20 * 1024
+CHUNK_SIZE = 64 * 1024  # FileResponse's read size
+
+
+def _project():
+    """A generated project of FILES source files cut from the repo's own code"""
+    source = "\n".join(path.read_text() for path in sorted((ROOT / "app").rglob("*.py")))
+    rng = random.Random(1)
+    files = []
+    for i in range(FILES):
+        start = rng.randrange(len(source) - FILE_BYTES)
+        files.append({"path": f"backend/module{i}.py", "content": source[start:start + FILE_BYTES]})
+    complete_project = {"project_name": "Bench", "description": "Benchmark project",
+                        "file_structure": {"backend": files}}
+    return complete_project, {"documentation_generated_at": "2024-01-01T00:00:00"}
+
+
+def _temp_file_download(complete_project, conversation):
+    """The old endpoint: build the whole archive on disk, then send it"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmp_file:
+        with zipfile.ZipFile(tmp_file.name, "w", zipfile.ZIP_DEFLATED) as archive:
+            for path, content in project_files(complete_project, conversation, "bench"):
+                archive.writestr(path, content)
+    try:
+        with open(tmp_file.name, "rb") as file:
+            while chunk := file.read(CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.unlink(tmp_file.name)
+
+
+def _streamed_download(complete_project, conversation):
+    return stream_zip(project_files(complete_project, conversation, "bench"))
+
+
+def _measure(mode: str):
+    complete_project, conversation = _project()
+    download = _temp_file_download if mode == "temp-file" else _streamed_download
+    # ru_maxrss is a high-water mark in KB, so the payload is already counted here
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    chunks = download(complete_project, conversation)
+    size = len(next(chunks))
+    first_byte = time.perf_counter() - start
+    for chunk in chunks:
+        size += len(chunk)
+    total = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode:10s} TTFB {first_byte * 1000:8.1f} ms  total {total:6.2f} s  "
+          f"peak RSS {peak_kb / 1024:6.1f} MB (+{(peak_kb - baseline_kb) / 1024:.1f} MB over the payload)  "
+          f"{size / 1e6:.1f} MB archive")
+
+
+def main():
+    print(f"{FILES} files x {FILE_BYTES // 1024} KB")
+    for mode in ("temp-file", "streamed"):
+        subprocess.run([sys.executable, __file__, mode], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        _measure(sys.argv[1])
+    else:
+        main()
@@ -10,9 +10,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from dotenv import load_dotenv
 
-from app.api.conversation import router as conversation_router
+from app.api.conversation import router as conversation_router, get_services, shutdown_services
 from app.api.mcp import router as mcp_router
-from app.services.multi_model_service import MultiModelService
+from app.integrations.http_transport import preconnect, close_http_client
 
 # Load environment variables
 load_dotenv()
@@ -38,20 +38,19 @@ structlog.configure(
 
 logger = structlog.get_logger(__name__)
 
-# Global services
-multi_model_service: MultiModelService = None
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
-    global multi_model_service
     
     # Startup
     logger.info("Starting Multi-Model Project Architect")
     
-    # Initialize multi-model service
-    multi_model_service = MultiModelService()
+    # Open provider connections before the first request needs them
+    await preconnect()
+    
+    # The same services handle every request, so /health reports their breakers
+    conversation_service, multi_model_service = await get_services()
     
     # Test all models
     try:
@@ -60,10 +59,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error("Failed to initialize multi-model service", error=str(e))
     
+    # Evict idle conversations in the background
+    conversation_service.start_expiry_sweeper()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Multi-Model Project Architect")
+    await shutdown_services()
+    await close_http_client()
 
 
 # Create FastAPI app
@@ -103,7 +107,6 @@ app.include_router(mcp_router)
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    global multi_model_service
     
     try:
         import os
@@ -113,6 +116,7 @@ async def health_check():
         goose_key = os.getenv('GOOSE_AI_API_KEY')
         
         # Check service status
+        _, multi_model_service = await get_services()
         service_status = "initialized" if multi_model_service else "not initialized"
         
         # Check API key status
@@ -126,6 +130,7 @@ async def health_check():
                 "anthropic": anthropic_status,
                 "goose_ai": goose_status
             },
+            "circuit_breakers": multi_model_service.get_circuit_states() if multi_model_service else {},
             "message": "API is ready" if (anthropic_key or goose_key) else "API keys needed"
         }
     except Exception as e:
@@ -0,0 +1,11 @@
+"""
+Test configuration: keep the SQLite database and archive cache out of the working tree
+"""
+
+import os
+import tempfile
+
+# Settings are read once at import, so this must run before any app module is imported
+_TEST_DIR = tempfile.mkdtemp(prefix="project-architect-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}")
+os.environ.setdefault("ARCHIVE_CACHE_DIR", os.path.join(_TEST_DIR, "archives"))
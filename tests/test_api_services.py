@@ -0,0 +1,64 @@
+"""
+Global service start-up: concurrent first requests share one started service
+"""
+
+import asyncio
+
+import pytest
+
+from app.api import conversation as api
+
+
+class FakeConversationService:
+    """Takes a moment to start, like opening the store and resuming jobs"""
+
+    instances = []
+
+    def __init__(self, multi_model_service, fail: bool = False):
+        self.multi_model_service = multi_model_service
+        self.started = False
+        self.fail = fail
+        FakeConversationService.instances.append(self)
+
+    async def start(self):
+        await asyncio.sleep(0.02)
+        if self.fail:
+            raise RuntimeError("database is locked")
+        self.started = True
+
+
+@pytest.fixture
+def fresh_services(monkeypatch):
+    FakeConversationService.instances = []
+    monkeypatch.setattr(api, "_conversation_service", None)
+    monkeypatch.setattr(api, "_multi_model_service", None)
+    monkeypatch.setattr(api, "_services_lock", None)
+    monkeypatch.setattr(api, "MultiModelService", object)
+    monkeypatch.setattr(api, "ConversationService", FakeConversationService)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_requests_get_one_started_service(fresh_services):
+    first = asyncio.ensure_future(api.get_services())
+    await asyncio.sleep(0.005)
+    # Still starting: nothing is published yet
+    assert api._conversation_service is None
+
+    results = await asyncio.gather(first, *(api.get_services() for _ in range(4)))
+
+    assert len(FakeConversationService.instances) == 1
+    service = FakeConversationService.instances[0]
+    assert all(result == (service, service.multi_model_service) for result in results)
+    assert service.started
+
+
+@pytest.mark.asyncio
+async def test_failed_start_publishes_nothing_and_is_retried(fresh_services, monkeypatch):
+    monkeypatch.setattr(api, "ConversationService", lambda models: FakeConversationService(models, fail=True))
+    with pytest.raises(RuntimeError):
+        await api.get_services()
+    assert api._conversation_service is None
+
+    monkeypatch.setattr(api, "ConversationService", FakeConversationService)
+    service, _ = await api.get_services()
+    assert service.started and len(FakeConversationService.instances) == 2
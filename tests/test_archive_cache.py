@@ -0,0 +1,90 @@
+"""
+On-disk archive cache: eviction under open downloads, workers sharing one directory,
+and unwritable directories
+"""
+
+import os
+
+import pytest
+
+from app.api import conversation as api
+from app.core.config import settings
+from app.services.archive_cache import ArchiveCache
+
+
+def _build(size: int):
+    return lambda: iter([b"x" * size])
+
+
+@pytest.mark.asyncio
+async def test_eviction_does_not_break_an_open_download(tmp_path):
+    cache = ArchiveCache(str(tmp_path), max_bytes=150)
+
+    download = await cache.open("first.zip", _build(100))
+    # The second archive pushes the cache over its limit and evicts the first
+    await cache.get_or_build("second.tar.gz", _build(100))
+
+    assert not (tmp_path / "first.zip").exists()
+    with download:
+        assert download.read() == b"x" * 100
+    assert cache.get_stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_build(tmp_path):
+    cache = ArchiveCache(str(tmp_path), max_bytes=1024)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return iter([b"archive"])
+
+    first = await cache.get_or_build("key", build)
+    second = await cache.get_or_build("key", build)
+
+    assert first == second and len(builds) == 1
+    assert cache.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_restart_reindexes_archives_by_format(tmp_path):
+    cache = ArchiveCache(str(tmp_path), max_bytes=1024)
+    await cache.get_or_build("key.tar.zst", _build(10))
+    (tmp_path / "abandoned.tmp").write_bytes(b"partial")
+
+    restarted = ArchiveCache(str(tmp_path), max_bytes=1024)
+    path = await restarted.get_or_build("key.tar.zst", _build(10))
+
+    assert path == str(tmp_path / "key.tar.zst")
+    assert restarted.get_stats()["entries"] == 1 and restarted.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_workers_sharing_a_directory_share_its_size_bound(tmp_path):
+    worker_a = ArchiveCache(str(tmp_path), max_bytes=250)
+    worker_b = ArchiveCache(str(tmp_path), max_bytes=250)
+
+    await worker_a.get_or_build("a1.zip", _build(100))
+    await worker_b.get_or_build("b1.zip", _build(100))
+    # File timestamps are coarse, so age them explicitly
+    os.utime(tmp_path / "a1.zip", (1, 1))
+    os.utime(tmp_path / "b1.zip", (2, 2))
+    # Built by A, so B's first lookup is a hit that marks it recently used
+    await worker_b.get_or_build("a1.zip", _build(100))
+    await worker_a.get_or_build("a2.zip", _build(100))
+
+    assert sorted(os.listdir(tmp_path)) == ["a1.zip", "a2.zip"]
+    assert worker_b.get_stats()["hits"] == 1
+    assert worker_a.get_stats()["bytes"] == 200
+
+
+def test_unwritable_directory_disables_the_cache(tmp_path, monkeypatch):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    monkeypatch.setattr(settings, "ARCHIVE_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "ARCHIVE_CACHE_DIR", str(blocker / "archives"))
+    monkeypatch.setattr(api, "_archive_cache", None)
+    monkeypatch.setattr(api, "_archive_cache_unavailable", False)
+
+    assert api.get_archive_cache() is None
+    assert api._archive_cache_unavailable
@@ -0,0 +1,69 @@
+"""
+Provider clients must not block the event loop: concurrent calls overlap in time
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.integrations.anthropic_client import AnthropicClient
+from app.integrations.goose_ai_client import GooseAIClient
+
+LATENCY = 0.2
+CONCURRENT_CALLS = 10
+
+
+class SlowEndpoint:
+    """Stands in for an SDK create() call: sleeps for LATENCY and tracks how many calls overlap"""
+
+    def __init__(self, make_response):
+        self.make_response = make_response
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(LATENCY)
+            return self.make_response()
+        finally:
+            self.in_flight -= 1
+
+
+async def _timed_concurrent_calls(call):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call(f"prompt {i}") for i in range(CONCURRENT_CALLS)))
+    return results, time.perf_counter() - start
+
+
+@pytest.mark.asyncio
+async def test_anthropic_calls_overlap(monkeypatch):
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    client = AnthropicClient()
+    messages = SlowEndpoint(lambda: SimpleNamespace(content=[SimpleNamespace(text="ok")]))
+    client.client = SimpleNamespace(messages=messages)  # stubbed AsyncAnthropic
+
+    results, elapsed = await _timed_concurrent_calls(client.generate_conversation_response)
+
+    assert results == ["ok"] * CONCURRENT_CALLS
+    assert messages.max_in_flight == CONCURRENT_CALLS
+    # Serial calls would take CONCURRENT_CALLS * LATENCY
+    assert elapsed < LATENCY * 3
+
+
+@pytest.mark.asyncio
+async def test_goose_ai_calls_overlap(monkeypatch):
+    monkeypatch.delenv("GOOSE_AI_API_KEY", raising=False)
+    client = GooseAIClient()
+    completions = SlowEndpoint(lambda: SimpleNamespace(choices=[SimpleNamespace(text=" ok ")]))
+    client.client = SimpleNamespace(completions=completions)  # stubbed AsyncOpenAI
+    client.available = True
+
+    results, elapsed = await _timed_concurrent_calls(client.generate_conversation_response)
+
+    assert results == ["ok"] * CONCURRENT_CALLS
+    assert completions.max_in_flight == CONCURRENT_CALLS
+    assert elapsed < LATENCY * 3
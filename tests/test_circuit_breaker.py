@@ -0,0 +1,86 @@
+"""
+Circuit breaker transitions: closed -> open -> half-open -> closed or open again
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+RECOVERY = 0.05
+
+
+async def _call(breaker: CircuitBreaker, fail: bool = False):
+    async with breaker.guard():
+        if fail:
+            raise ConnectionError("provider down")
+
+
+async def _call_and_wait(breaker: CircuitBreaker):
+    async with breaker.guard():
+        await asyncio.sleep(10)
+
+
+async def _fail(breaker: CircuitBreaker, times: int = 1):
+    for _ in range(times):
+        with pytest.raises(ConnectionError):
+            await _call(breaker, fail=True)
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker("test", failure_threshold=3, recovery_timeout=RECOVERY, half_open_max_calls=1)
+
+
+@pytest.mark.asyncio
+async def test_opens_after_consecutive_failures_and_rejects(breaker):
+    await _fail(breaker, 2)
+    await _call(breaker)  # a success resets the streak
+    await _fail(breaker, 2)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    await _fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        await _call(breaker)
+    assert breaker.get_stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_success_closes(breaker):
+    await _fail(breaker, 3)
+    await asyncio.sleep(RECOVERY)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    await _call(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_failure_reopens(breaker):
+    await _fail(breaker, 3)
+    await asyncio.sleep(RECOVERY)
+
+    await _fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.get_stats()["times_opened"] == 2
+
+
+@pytest.mark.asyncio
+async def test_half_open_admits_one_probe_and_a_cancelled_probe_frees_it(breaker):
+    await _fail(breaker, 3)
+    await asyncio.sleep(RECOVERY)
+
+    probe = asyncio.create_task(_call_and_wait(breaker))
+    await asyncio.sleep(0)
+    assert not breaker.is_available()
+    with pytest.raises(CircuitOpenError):
+        await _call(breaker)
+
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.is_available()
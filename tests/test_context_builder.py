@@ -0,0 +1,70 @@
+"""
+Token-budgeted context: recency first, relevant older turns, pinned summaries, truncation
+"""
+
+from app.services.context_builder import (
+    MESSAGE_OVERHEAD_TOKENS, SUMMARY_ROLE, build_context, count_tokens, message_tokens, select_context
+)
+from app.services.message import Message
+
+# 40 characters: 10 tokens, 14 with the per-message overhead
+TURNS = [Message("user" if i % 2 == 0 else "assistant", f"turn {i:02d} " + "x" * 32) for i in range(10)]
+
+
+def _contents(selection):
+    return [message.content[:7] for message, _ in selection]
+
+
+def _cost(selection) -> int:
+    return sum((truncate_to or message_tokens(message)) + MESSAGE_OVERHEAD_TOKENS for message, truncate_to in selection)
+
+
+def test_keeps_the_newest_messages_that_fit_in_order():
+    selection = select_context(TURNS, budget=45)
+
+    assert _contents(selection) == ["turn 07", "turn 08", "turn 09"]
+    assert _cost(selection) <= 45
+
+
+def test_relevant_older_message_fills_the_remaining_budget():
+    history = list(TURNS)
+    history[1] = Message("assistant", "Postgres with row level security")  # 8 tokens
+
+    selection = select_context(history, budget=68, query="Which postgres setup did we pick?")
+
+    assert _contents(selection) == ["Postgre", "turn 06", "turn 07", "turn 08", "turn 09"]
+    assert _cost(selection) <= 68
+
+
+def test_summary_is_pinned_first_and_capped_at_half_the_budget():
+    summary = Message(SUMMARY_ROLE, "s" * 400)  # 100 tokens
+    selection = select_context([summary] + TURNS, budget=60)
+
+    assert selection[0] == (summary, 60 // 2 - MESSAGE_OVERHEAD_TOKENS)
+    assert _contents(selection)[1:] == ["turn 08", "turn 09"]
+    assert _cost(selection) <= 60
+
+
+def test_newest_message_larger_than_the_budget_keeps_its_end():
+    long_answer = Message("assistant", "preamble " * 100 + "the conclusion")
+
+    context = build_context(TURNS[:2] + [long_answer], "conversation", budget=20)
+
+    assert context.startswith("Assistant: ...")
+    assert context.endswith("the conclusion")
+    assert count_tokens(context) <= 20 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_dict_messages_and_empty_history():
+    history = [{"role": "user", "content": "A todo app"}, {"role": "assistant", "content": "Who uses it?"}]
+
+    assert build_context(history, "conversation") == "User: A todo app\nAssistant: Who uses it?"
+    assert build_context([], "conversation") == "No previous conversation."
+
+
+def test_message_token_count_is_computed_once():
+    message = Message("user", "x" * 40)
+    assert message_tokens(message) == 10
+
+    message.content = "changed"
+    assert message_tokens(message) == 10
@@ -0,0 +1,185 @@
+"""
+Smoke tests for the conversation service with the AI providers stubbed out
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.conversation_service import ConversationService
+from app.services.conversation_store import InMemoryConversationStore, SQLiteConversationStore
+
+
+class StubMultiModelService:
+    """Answers every prompt with a fixed response and records the prompts"""
+
+    def __init__(self, response: str = "Tell me more about who will use it."):
+        self.response = response
+        self.prompts = []
+
+    async def generate_conversation_response(self, prompt: str, bypass_cache: bool = False, **kwargs) -> str:
+        self.prompts.append(prompt)
+        return self.response
+
+    async def stream_conversation_response(self, prompt: str, bypass_cache: bool = False, **kwargs):
+        self.prompts.append(prompt)
+        for word in self.response.split(" "):
+            yield word + " "
+
+
+class BrokenStreamMultiModelService(StubMultiModelService):
+    """Streams one token, then loses the provider connection"""
+
+    async def stream_conversation_response(self, prompt: str, bypass_cache: bool = False, **kwargs):
+        self.prompts.append(prompt)
+        yield "Tell "
+        raise ConnectionError("provider closed the stream")
+
+
+class SlowMultiModelService(StubMultiModelService):
+    """Takes a while to answer and numbers its replies"""
+
+    async def generate_conversation_response(self, prompt: str, bypass_cache: bool = False, **kwargs) -> str:
+        self.prompts.append(prompt)
+        await asyncio.sleep(0.02)
+        return f"Reply {len(self.prompts)}"
+
+
+@pytest.fixture
+def service():
+    return ConversationService(multi_model_service=StubMultiModelService(), store=InMemoryConversationStore())
+
+
+@pytest.mark.asyncio
+async def test_start_conversation(service):
+    result = await service.start_conversation("A todo app for remote teams")
+
+    assert result["phase"] == "conversation"
+    assert result["response"] == "Tell me more about who will use it."
+
+    conversation = await service.get_conversation(result["conversation_id"])
+    assert [message.role for message in conversation["messages"]] == ["user", "assistant"]
+
+
+@pytest.mark.asyncio
+async def test_stream_start_conversation(service):
+    events = [event async for event in service.stream_start_conversation("A recipe sharing site")]
+
+    assert events[0]["type"] == "start"
+    assert events[-1]["type"] == "done"
+    text = "".join(event["text"] for event in events if event["type"] == "token")
+    assert text.strip() == "Tell me more about who will use it."
+
+    conversation = await service.get_conversation(events[0]["conversation_id"])
+    assert len(conversation["messages"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_similar_idea_reuses_initial_response(monkeypatch):
+    monkeypatch.setattr(settings, "IDEA_CACHE_ENABLED", True)
+    service = ConversationService(multi_model_service=StubMultiModelService(), store=InMemoryConversationStore())
+
+    first = await service.start_conversation("A todo app for remote teams with a shared calendar")
+    second = await service.start_conversation("A todo app for remote teams with shared calendar")
+
+    assert second["response"] == first["response"]
+    assert len(service.multi_model_service.prompts) == 1
+
+
+@pytest.mark.asyncio
+async def test_expiry_skips_conversations_with_pending_documentation(service):
+    idle = await service.start_conversation("A todo app for remote teams")
+    waiting = await service.start_conversation("A recipe sharing site")
+    service.conversations[waiting["conversation_id"]]["documentation_job"] = "job-1"
+
+    assert service.cleanup_expired_conversations(max_idle_seconds=0) == 1
+
+    assert idle["conversation_id"] not in service.conversations
+    assert waiting["conversation_id"] in service.conversations
+
+
+@pytest.mark.asyncio
+async def test_expiry_keeps_persisted_conversations_on_disk():
+    store = SQLiteConversationStore(settings.DATABASE_URL, flush_interval=0, batch_size=200, history_limit=50)
+    service = ConversationService(multi_model_service=StubMultiModelService(), store=store)
+    await store.start()
+    try:
+        result = await service.start_conversation("A todo app for remote teams")
+        await store.flush()
+
+        assert service.cleanup_expired_conversations(max_idle_seconds=0) == 1
+        assert result["conversation_id"] not in service.conversations
+
+        reloaded = await service.get_conversation(result["conversation_id"])
+        assert [message.role for message in reloaded["messages"]] == ["user", "assistant"]
+    finally:
+        await store.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_still_closes_the_turn(service):
+    started = await service.start_conversation("A todo app for remote teams")
+    service.multi_model_service = BrokenStreamMultiModelService()
+
+    events = []
+    with pytest.raises(ConnectionError):
+        async for event in service.stream_continue_conversation(started["conversation_id"], "Who are the users?"):
+            events.append(event)
+    assert [event["type"] for event in events] == ["start", "token"]
+
+    conversation = await service.get_conversation(started["conversation_id"])
+    assert [message.role for message in conversation["messages"]] == ["user", "assistant", "user", "assistant"]
+    assert conversation["messages"][-1].content == "Tell\n\n[Response interrupted]"
+
+    # The next turn builds on a complete exchange
+    service.multi_model_service = StubMultiModelService()
+    await service.continue_conversation(started["conversation_id"], "Remote teams of up to 50 people")
+    assert [message.role for message in conversation["messages"]][-2:] == ["user", "assistant"]
+    assert len(conversation["messages"]) == 6
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_mid_stream_closes_the_turn(service):
+    started = await service.start_conversation("A todo app for remote teams")
+
+    events = service.stream_continue_conversation(started["conversation_id"], "Who are the users?")
+    assert (await events.__anext__())["type"] == "start"
+    assert (await events.__anext__())["type"] == "token"
+    await events.aclose()
+
+    conversation = await service.get_conversation(started["conversation_id"])
+    assert [message.role for message in conversation["messages"]] == ["user", "assistant", "user", "assistant"]
+    assert conversation["messages"][-1].content == "Tell\n\n[Response interrupted]"
+    assert not service.turn_locks.is_locked(started["conversation_id"])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_turns_of_one_conversation_do_not_interleave(service):
+    started = await service.start_conversation("A todo app for remote teams")
+    service.multi_model_service = SlowMultiModelService()
+    conversation_id = started["conversation_id"]
+
+    await asyncio.gather(*(service.continue_conversation(conversation_id, f"Answer {i}") for i in range(2)))
+
+    messages = (await service.get_conversation(conversation_id))["messages"][2:]
+    assert [message.content for message in messages] == ["Answer 0", "Reply 1", "Answer 1", "Reply 2"]
+    # The second turn was built on the finished first exchange
+    assert "Reply 1" in service.multi_model_service.prompts[1]
+
+
+@pytest.mark.asyncio
+async def test_expiry_waits_for_a_running_turn(service):
+    started = await service.start_conversation("A todo app for remote teams")
+    service.multi_model_service = SlowMultiModelService()
+    conversation_id = started["conversation_id"]
+
+    turn = asyncio.create_task(service.continue_conversation(conversation_id, "Who are the users?"))
+    await asyncio.sleep(0.005)
+    assert service.turn_locks.is_locked(conversation_id)
+    assert service.cleanup_expired_conversations(max_idle_seconds=0) == 0
+
+    await turn
+    assert service.cleanup_expired_conversations(max_idle_seconds=0) == 1
+    assert conversation_id not in service.conversations
+    assert service.turn_locks.get_stats()["active"] == 0
@@ -0,0 +1,168 @@
+"""
+SQLite conversation store shared by several workers, with documentation stored apart from turns
+"""
+
+import uuid
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.database.database import get_database
+from app.database.models import Conversation, ConversationDocumentation
+from app.services.conversation_store import SQLiteConversationStore
+from app.services.message import Message
+
+
+def _make_store() -> SQLiteConversationStore:
+    return SQLiteConversationStore(settings.DATABASE_URL, flush_interval=0, batch_size=200, history_limit=50)
+
+
+def _conversation(*contents: str):
+    return {
+        "id": str(uuid.uuid4()),
+        "project_idea": "A todo app",
+        "phase": "conversation",
+        "messages": [Message("user" if i % 2 == 0 else "assistant", content) for i, content in enumerate(contents)]
+    }
+
+
+@pytest_asyncio.fixture
+async def workers():
+    stores = [_make_store(), _make_store()]
+    for store in stores:
+        await store.start()
+    yield stores
+    for store in stores:
+        await store.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_from_two_workers_are_merged(workers):
+    worker_a, worker_b = workers
+    conversation = _conversation("idea", "first answer")
+    worker_a.save(conversation)
+    await worker_a.flush()
+
+    on_b = await worker_b.load(conversation["id"])
+
+    # Both workers take a turn on the same history
+    conversation["messages"].append(Message("user", "from worker A"))
+    worker_a.save(conversation)
+    await worker_a.flush()
+
+    on_b["messages"].append(Message("user", "from worker B"))
+    worker_b.save(on_b)
+    await worker_b.flush()
+
+    assert worker_b.get_stats()["conflicts"] == 1
+    assert worker_b.is_stale(conversation["id"])
+
+    reloaded = await worker_b.load(conversation["id"])
+    assert [message.content for message in reloaded["messages"]] == [
+        "idea", "first answer", "from worker A", "from worker B"
+    ]
+    assert not worker_b.is_stale(conversation["id"])
+
+    # The reloaded copy appends cleanly
+    reloaded["messages"].append(Message("assistant", "answer"))
+    worker_b.save(reloaded)
+    await worker_b.flush()
+    assert worker_b.get_stats()["conflicts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_row_that_cannot_be_written_does_not_block_the_batch(workers):
+    store, _ = workers
+    good = _conversation("idea", "answer")
+    bad = _conversation("idea", "answer")
+    bad["messages"][1].content = None  # violates NOT NULL on every attempt
+
+    store.save(bad)
+    store.save(good)
+    await store.flush()
+
+    stats = store.get_stats()
+    assert stats["pending"] == 0
+    assert stats["dropped"] == 1
+    assert [message.content for message in (await store.load(good["id"]))["messages"]] == ["idea", "answer"]
+
+
+def _rows(conversation_id: str):
+    session = get_database()
+    try:
+        state = session.query(Conversation.state).filter(Conversation.conversation_id == conversation_id).scalar()
+        document = session.query(ConversationDocumentation).filter(
+            ConversationDocumentation.conversation_id == conversation_id
+        ).first()
+        return state, document
+    finally:
+        session.close()
+
+
+def _document(conversation, version: int):
+    conversation["documentation"] = {"project_name": f"Team Todo v{version}"}
+    conversation["documentation_version"] = version
+    conversation.setdefault("manifests", []).append({"version": version, "files": {"README.md": "abc"}})
+
+
+@pytest.mark.asyncio
+async def test_documentation_is_written_only_when_regenerated(workers):
+    store, other = workers
+    conversation = _conversation("idea", "answer")
+    _document(conversation, 1)
+    store.save(conversation)
+    await store.flush()
+
+    conversation["messages"].append(Message("user", "another turn"))
+    store.save(conversation)
+    await store.flush()
+    assert store.get_stats()["documents_written"] == 1
+
+    state, document = _rows(conversation["id"])
+    assert "documentation" not in state and "manifests" not in state
+    assert state["documentation_version"] == 1
+    assert document.documentation == {"project_name": "Team Todo v1"}
+
+    _document(conversation, 2)
+    store.save(conversation)
+    await store.flush()
+    assert store.get_stats()["documents_written"] == 2
+
+    reloaded = await other.load(conversation["id"])
+    assert reloaded["documentation"] == {"project_name": "Team Todo v2"}
+    assert [manifest["version"] for manifest in reloaded["manifests"]] == [1, 2]
+
+    # A worker that read the documentation does not write it back either
+    reloaded["messages"].append(Message("assistant", "from the other worker"))
+    other.save(reloaded)
+    await other.flush()
+    assert other.get_stats()["documents_written"] == 0
+
+
+@pytest.mark.asyncio
+async def test_documentation_in_legacy_state_moves_to_its_own_table(workers):
+    store, _ = workers
+    conversation = _conversation("idea", "answer")
+    store.save(conversation)
+    await store.flush()
+
+    # As written before documentation had its own table
+    session = get_database()
+    try:
+        record = session.query(Conversation).filter(Conversation.conversation_id == conversation["id"]).one()
+        record.state = {"documentation": {"project_name": "Legacy"}, "documentation_version": 1, "manifests": []}
+        session.commit()
+    finally:
+        session.close()
+    store.evict(conversation["id"])
+
+    loaded = await store.load(conversation["id"])
+    assert loaded["documentation"] == {"project_name": "Legacy"}
+    loaded["messages"].append(Message("user", "next turn"))
+    store.save(loaded)
+    await store.flush()
+
+    state, document = _rows(conversation["id"])
+    assert "documentation" not in state
+    assert document.documentation == {"project_name": "Legacy"}
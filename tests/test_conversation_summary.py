@@ -0,0 +1,113 @@
+"""
+Rolling summaries: an update applies only on top of the version it started from
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.services.context_builder import SUMMARY_ROLE
+from app.services.conversation_service import ConversationService
+from app.services.conversation_store import InMemoryConversationStore
+from app.services.multi_model_service import FALLBACK_RESPONSE
+
+
+class GatedModel:
+    """Returns a summary only once the test opens the gate"""
+
+    def __init__(self, response: str = "Remote-team todo app with a shared calendar."):
+        self.response = response
+        self.gate = asyncio.Event()
+
+    async def generate_conversation_response(self, prompt: str, bypass_cache: bool = False, **kwargs) -> str:
+        await self.gate.wait()
+        return self.response
+
+
+@pytest_asyncio.fixture
+async def conversation_and_service():
+    service = ConversationService(multi_model_service=GatedModel(), store=InMemoryConversationStore())
+    conversation = service._create_conversation("A todo app for remote teams")
+    service._activate(conversation)
+    for i in range(12):
+        service._append_message(conversation, "user" if i % 2 == 0 else "assistant", f"message {i}")
+    yield conversation, service
+    await service.cancel_summary_updates()
+
+
+def _start_update(service: ConversationService, conversation, fold_end: int = 8) -> asyncio.Task:
+    task = asyncio.ensure_future(service._update_summary(conversation, 0, fold_end))
+    service._summary_tasks[conversation["id"]] = task
+    return task
+
+
+@pytest.mark.asyncio
+async def test_update_applies_on_the_version_it_started_from(conversation_and_service):
+    conversation, service = conversation_and_service
+    task = _start_update(service, conversation)
+
+    service.multi_model_service.gate.set()
+    await task
+
+    assert conversation["summary_version"] == 1
+    assert conversation["summary_upto"] == 8
+    context = service._context_messages(conversation)
+    assert context[0].role == SUMMARY_ROLE
+    assert [message.content for message in context[1:]] == ["message 8", "message 9", "message 10", "message 11"]
+    assert service.get_summary_stats()["applied"] == 1
+
+
+@pytest.mark.asyncio
+async def test_update_is_discarded_when_a_newer_summary_landed_first(conversation_and_service):
+    conversation, service = conversation_and_service
+    task = _start_update(service, conversation)
+    await asyncio.sleep(0)
+
+    conversation.update(summary="newer summary", summary_upto=10, summary_version=1)
+    service.multi_model_service.gate.set()
+    await task
+
+    assert (conversation["summary"], conversation["summary_upto"], conversation["summary_version"]) == \
+        ("newer summary", 10, 1)
+    assert service.get_summary_stats()["discarded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_update_is_discarded_for_an_evicted_conversation(conversation_and_service):
+    conversation, service = conversation_and_service
+    task = _start_update(service, conversation)
+    await asyncio.sleep(0)
+
+    service.conversations.pop(conversation["id"])
+    service.multi_model_service.gate.set()
+    await task
+
+    assert "summary" not in conversation or not conversation["summary"]
+    assert service.get_summary_stats()["discarded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fallback_response_is_never_stored_as_a_summary(conversation_and_service):
+    conversation, service = conversation_and_service
+    service.multi_model_service.response = FALLBACK_RESPONSE
+    task = _start_update(service, conversation)
+
+    service.multi_model_service.gate.set()
+    await task
+
+    assert conversation.get("summary_version", 0) == 0
+    assert service.get_summary_stats()["discarded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_update_counts_as_discarded_and_frees_the_slot(conversation_and_service):
+    conversation, service = conversation_and_service
+    _start_update(service, conversation)
+    await asyncio.sleep(0)
+
+    service._cancel_summary(conversation["id"])
+    await asyncio.sleep(0)
+
+    assert service.get_summary_stats()["discarded"] == 1
+    assert service.get_summary_stats()["in_flight"] == 0
@@ -0,0 +1,131 @@
+"""
+Labeled corpus for the documentation-intent detector
+
+Every false positive starts the most expensive generation the service makes, so
+precision matters more than recall. Messages are scored in the context of the
+previous assistant turn, since a bare "yes" only counts as a request after an offer.
+"""
+
+import time
+
+import pytest
+
+from app.services.doc_intent import detect_documentation_intent
+
+OFFER = "Would you like me to generate the documentation for your project now?"
+PLAIN = "A REST API with FastAPI and Postgres would work well. What auth method do you prefer?"
+
+# (message, phase, previous assistant response, asks for documentation)
+CORPUS = [
+    ("Generate the docs please", "conversation", PLAIN, True),
+    ("Please create documentation for this project", "conversation", PLAIN, True),
+    ("ok, generate documentation", "conversation", PLAIN, True),
+    ("Create the project docs", "conversation", PLAIN, True),
+    ("I'm ready for docs", "conversation", PLAIN, True),
+    ("docs please", "conversation", PLAIN, True),
+    ("Can you write the documentation now?", "conversation", PLAIN, True),
+    ("make the docs folder", "conversation", PLAIN, True),
+    ("Let's generate everything", "conversation", PLAIN, True),
+    ("yes", "conversation", OFFER, True),
+    ("Yes please", "conversation", OFFER, True),
+    ("sure, go ahead", "conversation", OFFER, True),
+    ("do it", "conversation", OFFER, True),
+    ("sounds good", "conversation", OFFER, True),
+    ("Build the complete documentation for me", "conversation", PLAIN, True),
+    ("regenerate the docs with the new auth flow", "documentation_generated", PLAIN, True),
+    ("Update the documentation to use MongoDB instead", "documentation_generated", PLAIN, True),
+    ("Generate the project files", "conversation", PLAIN, True),
+    ("give me the documentation folder", "conversation", PLAIN, True),
+    ("Draft the full docs now", "conversation", PLAIN, True),
+    ("Alright, prepare the documentation", "conversation", PLAIN, True),
+    ("Please produce all the docs", "conversation", PLAIN, True),
+    ("ready for documentation", "conversation", PLAIN, True),
+    ("create docs", "conversation", PLAIN, True),
+    ("I need documentation", "conversation", PLAIN, True),
+    ("We'd like the docs for this", "conversation", PLAIN, True),
+    ("Could you document this project?", "conversation", PLAIN, True),
+    ("Please document the app", "conversation", PLAIN, True),
+    ("Document everything we discussed", "conversation", PLAIN, True),
+
+    ("yes, I'd like JWT auth", "conversation", PLAIN, False),
+    ("Sure, Postgres is fine", "conversation", PLAIN, False),
+    ("yes", "conversation", PLAIN, False),
+    ("okay", "conversation", PLAIN, False),
+    ("Can you help me choose between React and Vue?", "conversation", PLAIN, False),
+    ("Show me how the auth flow would work", "conversation", PLAIN, False),
+    ("Tell me more about websockets", "conversation", PLAIN, False),
+    ("What should the database schema look like?", "conversation", PLAIN, False),
+    ("How should I structure the backend?", "conversation", PLAIN, False),
+    ("Do you recommend Redis for caching?", "conversation", PLAIN, False),
+    ("I want to create a new user profile page", "conversation", PLAIN, False),
+    ("Users should be able to create tasks and generate reports", "conversation", PLAIN, False),
+    ("Don't generate the docs yet", "conversation", OFFER, False),
+    ("not yet, I want to add payments first", "conversation", OFFER, False),
+    ("No, let's discuss the API first", "conversation", OFFER, False),
+    ("Let's hold off on the documentation", "conversation", PLAIN, False),
+    ("We'll generate documentation later", "conversation", PLAIN, False),
+    ("What's the best solution for file uploads?", "conversation", PLAIN, False),
+    ("Do I need docs for the API?", "conversation", PLAIN, False),
+    ("Do we need documentation for the admin panel?", "conversation", PLAIN, False),
+    ("The docs look great, thanks!", "documentation_generated", PLAIN, False),
+    ("In the setup docs, which Python version?", "documentation_generated", PLAIN, False),
+    ("yes", "documentation_generated", PLAIN, False),
+    ("I'd like to create an admin dashboard too", "conversation", PLAIN, False),
+    ("the project should also support dark mode", "conversation", PLAIN, False),
+    ("Okay, and what about testing?", "conversation", OFFER, False),
+    ("Sure, but first let's talk about deployment", "conversation", OFFER, False),
+    ("sure, but first tell me about the DB", "conversation", OFFER, False),
+    ("Yes, first explain the caching layer", "conversation", OFFER, False),
+    ("ok, before that how do we handle auth", "conversation", OFFER, False),
+    ("creating documents is a core feature of the app", "conversation", PLAIN, False),
+    ("The document it exports should be a PDF", "conversation", PLAIN, False),
+    ("It should generate PDF invoices", "conversation", PLAIN, False),
+    ("show me an example endpoint", "conversation", PLAIN, False),
+    ("Before you create the docs, add a section on auth", "conversation", PLAIN, False),
+    ("without docs for now, just explain", "conversation", PLAIN, False),
+    ("I'm not sure about the stack", "conversation", PLAIN, False),
+]
+
+MIN_PRECISION = 0.95
+MIN_RECALL = 0.9
+
+
+def _predictions():
+    return [
+        (message, detect_documentation_intent(message, phase, previous).triggered, expected)
+        for message, phase, previous, expected in CORPUS
+    ]
+
+
+def test_precision_and_recall():
+    predictions = _predictions()
+    true_positives = sum(1 for _, predicted, expected in predictions if predicted and expected)
+    predicted_positives = sum(1 for _, predicted, _ in predictions if predicted)
+    actual_positives = sum(1 for _, _, expected in predictions if expected)
+
+    precision = true_positives / predicted_positives
+    recall = true_positives / actual_positives
+    wrong = [message for message, predicted, expected in predictions if predicted != expected]
+
+    assert precision >= MIN_PRECISION, wrong
+    assert recall >= MIN_RECALL, wrong
+
+
+@pytest.mark.parametrize("message", [
+    "sure, but first tell me about the DB",
+    "Yes, first explain the caching layer",
+])
+def test_deferred_affirmative_after_offer_does_not_trigger(message):
+    assert not detect_documentation_intent(message, "conversation", OFFER).triggered
+
+
+def test_latency():
+    calls = 20000
+    start = time.perf_counter()
+    for i in range(calls):
+        message, phase, previous, _ = CORPUS[i % len(CORPUS)]
+        detect_documentation_intent(message, phase, previous)
+    per_call = (time.perf_counter() - start) / calls
+
+    # Runs on every turn; it has to stay far below a model call
+    assert per_call < 0.001
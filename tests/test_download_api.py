@@ -0,0 +1,157 @@
+"""
+Download endpoints over HTTP: the text response download's ETag, gzip and Range handling,
+and manifest deltas between documentation generations
+"""
+
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import conversation as api
+from app.services.conversation_service import ConversationService
+from app.services.conversation_store import InMemoryConversationStore
+
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = ConversationService(multi_model_service=object(), store=InMemoryConversationStore())
+    monkeypatch.setattr(api, "_conversation_service", service)
+    monkeypatch.setattr(api, "_multi_model_service", service.multi_model_service)
+    return service
+
+
+@pytest.fixture
+def client(service):
+    app = FastAPI()
+    app.include_router(api.router)
+    return TestClient(app)
+
+
+def _conversation(service: ConversationService, answer: str) -> str:
+    conversation = service._create_conversation("A todo app for remote teams")
+    service._activate(conversation)
+    service._append_message(conversation, "user", conversation["project_idea"])
+    service._append_message(conversation, "assistant", answer)
+    return conversation["id"]
+
+
+def _text_url(conversation_id: str) -> str:
+    return f"/api/v1/conversation/{conversation_id}/response/download"
+
+
+def test_text_download_revalidates_with_its_etag(client, service):
+    url = _text_url(_conversation(service, "Who will use it?"))
+
+    first = client.get(url, headers=IDENTITY)
+    assert first.status_code == 200
+    assert "Who will use it?" in first.text
+    assert first.headers["accept-ranges"] == "bytes"
+
+    again = client.get(url, headers={**IDENTITY, "If-None-Match": f'W/{first.headers["etag"]}'})
+    assert again.status_code == 304
+    assert again.content == b""
+
+
+def test_text_download_serves_single_ranges(client, service):
+    url = _text_url(_conversation(service, "Who will use it?"))
+    body = client.get(url, headers=IDENTITY).content
+
+    head = client.get(url, headers={**IDENTITY, "Range": "bytes=0-9"})
+    assert head.status_code == 206
+    assert head.content == body[:10]
+    assert head.headers["content-range"] == f"bytes 0-9/{len(body)}"
+
+    tail = client.get(url, headers={**IDENTITY, "Range": "bytes=-5"})
+    assert tail.content == body[-5:]
+
+    beyond = client.get(url, headers={**IDENTITY, "Range": f"bytes={len(body)}-"})
+    assert beyond.status_code == 416
+    assert beyond.headers["content-range"] == f"bytes */{len(body)}"
+
+
+def test_large_text_download_is_gzipped_under_its_own_etag(client, service):
+    url = _text_url(_conversation(service, "A long plan. " * 200))
+    plain = client.get(url, headers=IDENTITY)
+
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.headers["etag"] != plain.headers["etag"]
+    assert int(compressed.headers["content-length"]) < len(plain.content)
+    assert compressed.content == plain.content  # the client decodes it
+
+    # Either representation's ETag revalidates
+    for etag in (plain.headers["etag"], compressed.headers["etag"]):
+        assert client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag}).status_code == 304
+
+    refused = client.get(url, headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+
+
+def _project(files: dict) -> dict:
+    return {
+        "project_name": "Team Todo",
+        "description": "Todo app for remote teams",
+        "file_structure": {"backend": [{"path": path, "content": content} for path, content in files.items()]}
+    }
+
+
+@pytest.fixture
+def regenerated(service):
+    """A conversation whose documentation was generated twice"""
+    conversation_id = _conversation(service, "Here is your project.")
+    conversation = service.conversations[conversation_id]
+    service._store_documentation(conversation, _project({"backend/app.py": "v1", "backend/db.py": "db",
+                                                         "backend/old.py": "x"}))
+    service._store_documentation(conversation, _project({"backend/app.py": "v2", "backend/db.py": "db",
+                                                         "backend/new.py": "y"}))
+    return conversation_id
+
+
+def test_manifest_lists_the_latest_generation(client, regenerated):
+    manifest = client.get(f"/api/v1/conversation/{regenerated}/manifest").json()
+
+    assert manifest["version"] == 2
+    assert {"backend/app.py", "backend/db.py", "backend/new.py", "README.md"} <= set(manifest["files"])
+    assert "backend/old.py" not in manifest["files"]
+
+
+def test_zip_delta_holds_only_added_and_changed_files(client, regenerated):
+    response = client.get(f"/api/v1/conversation/{regenerated}/download/delta", params={"since": 1})
+    assert response.headers["x-manifest-version"] == "2"
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        delta = json.loads(archive.read("delta-manifest.json"))
+        members = set(archive.namelist()) - {"delta-manifest.json"}
+        assert archive.read("backend/app.py") == b"v2"
+
+    assert (delta["from_version"], delta["to_version"]) == (1, 2)
+    assert delta["added"] == ["backend/new.py"]
+    assert "backend/app.py" in delta["changed"] and "backend/db.py" not in delta["changed"]
+    assert delta["deleted"] == ["backend/old.py"]
+    assert members == set(delta["added"]) | set(delta["changed"])
+
+
+def test_ndjson_delta_streams_the_summary_then_the_files(client, regenerated):
+    response = client.get(f"/api/v1/conversation/{regenerated}/download/delta",
+                          params={"since": 1, "format": "ndjson"})
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert events[0]["type"] == "delta" and events[0]["deleted"] == ["backend/old.py"]
+    files = {event["path"]: event for event in events[1:]}
+    assert files["backend/new.py"]["op"] == "added"
+    assert files["backend/app.py"] == {"type": "file", "op": "changed", "path": "backend/app.py", "content": "v2"}
+
+
+def test_delta_from_an_unknown_version_asks_for_the_full_download(client, service, regenerated):
+    assert client.get(f"/api/v1/conversation/{regenerated}/download/delta", params={"since": 7}).status_code == 410
+
+    fresh = _conversation(service, "No documentation yet.")
+    assert client.get(f"/api/v1/conversation/{fresh}/download/delta", params={"since": 1}).status_code == 404
+    assert client.get(f"/api/v1/conversation/{fresh}/manifest").status_code == 404
@@ -0,0 +1,70 @@
+"""
+GooseAI engine catalogue: a failed refresh keeps the last good list and backs off
+"""
+
+import asyncio
+
+import pytest
+
+from app.integrations.goose_ai_client import EngineCatalogue
+
+BACKOFF = 0.05
+
+
+class FlakyEngines:
+    """Engine endpoint that can be switched between answering and failing"""
+
+    def __init__(self):
+        self.calls = 0
+        self.down = False
+
+    async def __call__(self):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("503 - engines unavailable")
+        return ["gpt-j-6b", "gpt-neo-20b"]
+
+
+async def _settle():
+    # Let a background refresh and its done callback run
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_serving_the_last_good_list():
+    fetch = FlakyEngines()
+    catalogue = EngineCatalogue(fetch, ttl=0, failure_backoff=BACKOFF)
+    engines = await catalogue.get()
+
+    fetch.down = True
+    for _ in range(5):
+        assert await catalogue.get() == engines
+        await _settle()
+    assert fetch.calls == 2  # the first load and one failed refresh, then backing off
+    assert catalogue.get_stats()["last_error"] == "503 - engines unavailable"
+
+    fetch.down = False
+    await asyncio.sleep(BACKOFF)
+    await catalogue.get()
+    await _settle()
+    assert fetch.calls == 3
+    assert catalogue.get_stats()["last_error"] is None
+
+
+@pytest.mark.asyncio
+async def test_failed_first_load_is_negative_cached():
+    fetch = FlakyEngines()
+    fetch.down = True
+    catalogue = EngineCatalogue(fetch, ttl=300, failure_backoff=BACKOFF)
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            await catalogue.get()
+    assert fetch.calls == 1
+    assert catalogue.get_stats()["backed_off"] == 2
+
+    fetch.down = False
+    await asyncio.sleep(BACKOFF)
+    assert await catalogue.get() == ["gpt-j-6b", "gpt-neo-20b"]
+    assert fetch.calls == 2
@@ -0,0 +1,51 @@
+"""
+Near-duplicate idea index at the configured similarity threshold
+"""
+
+import pytest
+
+from app.core.config import settings
+from app.services.idea_index import IdeaIndex
+
+IDEA = "A todo app for remote teams with a shared calendar"
+
+
+@pytest.fixture
+def index():
+    index = IdeaIndex(similarity_threshold=settings.IDEA_CACHE_SIMILARITY, max_entries=100)
+    index.add(IDEA, {"initial_response": "todo"})
+    index.add("A recipe sharing site for home cooks", {"initial_response": "recipes"})
+    return index
+
+
+@pytest.mark.parametrize("variant", [
+    "A To-Do app for remote teams, with a shared calendar!",
+    "A todo app for remote teams with shared calendar",
+    "a todo app for remote team with a shared calender",
+])
+def test_near_duplicate_hits(index, variant):
+    match = index.lookup(variant)
+
+    assert match is not None
+    _, payload, similarity = match
+    assert payload["initial_response"] == "todo"
+    assert similarity >= settings.IDEA_CACHE_SIMILARITY
+
+
+@pytest.mark.parametrize("idea", [
+    "An inventory tracker for small warehouses",
+    # Same template, different audience: the docs would differ, so it must not share them
+    "A todo app for families with a shared calendar",
+])
+def test_unrelated_idea_misses(index, idea):
+    assert index.lookup(idea) is None
+
+
+def test_evicted_ideas_no_longer_match():
+    index = IdeaIndex(similarity_threshold=settings.IDEA_CACHE_SIMILARITY, max_entries=1)
+    entry_id = index.add(IDEA, {"initial_response": "todo"})
+    index.add("A recipe sharing site for home cooks", {"initial_response": "recipes"})
+
+    assert index.get(entry_id) is None
+    assert index.lookup(IDEA) is None
+    assert index.get_stats()["entries"] == 1
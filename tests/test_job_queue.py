@@ -0,0 +1,144 @@
+"""
+Documentation job queue: workers survive database errors, leases hold across processes,
+and results outlive their conversation
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.services.conversation_service import ConversationService
+from app.services.conversation_store import InMemoryConversationStore
+from app.services.job_queue import JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, DocumentationJobQueue
+
+PROJECT = {"project_name": "Team Todo", "description": "Todo app for remote teams", "file_structure": {}}
+
+
+class StubMultiModelService:
+    async def generate_conversation_response(self, prompt, bypass_cache=False, **kwargs):
+        return "Sounds good."
+
+    async def generate_complete_project(self, project_idea, history, conversation_id=None):
+        return dict(PROJECT)
+
+
+def _make_service() -> ConversationService:
+    service = ConversationService(multi_model_service=StubMultiModelService(), store=InMemoryConversationStore())
+    service.job_queue.poll_interval = 0.01
+    return service
+
+
+@pytest_asyncio.fixture
+async def service():
+    service = _make_service()
+    await service.start()
+    yield service
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_result_is_served_from_job_row_when_conversation_is_gone(service):
+    # As after a restart with the memory store: the job exists, the conversation does not
+    job_id = await service.job_queue.enqueue("lost-conversation", {"project_idea": "todo", "history": []})
+
+    job = await service.job_queue.wait(job_id, timeout=5)
+    assert job["status"] == JOB_SUCCEEDED
+
+    recovered = await service.get_job_documentation("lost-conversation")
+    assert recovered["documentation"]["project_name"] == "Team Todo"
+    assert recovered["documentation_generated_at"] == job["finished_at"]
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_claim_errors():
+    service = _make_service()
+    claim = service.job_queue._claim
+    failures = []
+
+    def flaky_claim():
+        if len(failures) < 2:
+            failures.append(1)
+            raise RuntimeError("database is locked")
+        return claim()
+
+    # Patched before the workers start, so every claim goes through it
+    service.job_queue._claim = flaky_claim
+    await service.start()
+    try:
+        job_id = await service.job_queue.enqueue("flaky-conversation", {"project_idea": "todo", "history": []})
+        job = await service.job_queue.wait(job_id, timeout=5)
+
+        assert len(failures) == 2 and job["status"] == JOB_SUCCEEDED
+        assert not any(worker.done() for worker in service.job_queue._workers)
+    finally:
+        await service.close()
+
+
+@pytest.mark.asyncio
+async def test_job_finished_before_enqueue_returns_is_attached(service):
+    enqueue = service.job_queue.enqueue
+    job_ids = []
+
+    async def enqueue_and_finish(conversation_id, payload, job_id=None):
+        job_ids.append(await enqueue(conversation_id, payload, job_id=job_id))
+        # A worker claims and finishes the job before enqueue() returns to the turn
+        await service.job_queue.wait(job_ids[-1], timeout=5)
+        return job_ids[-1]
+
+    service.job_queue.enqueue = enqueue_and_finish
+    started = await service.start_conversation("A todo app for remote teams")
+    await service.continue_conversation(started["conversation_id"], "Please generate the documentation")
+
+    assert (await service.job_queue.get(job_ids[0]))["status"] == JOB_SUCCEEDED
+    conversation = await service.get_conversation(started["conversation_id"])
+    assert conversation["documentation"]["project_name"] == "Team Todo"
+    assert "documentation_job" not in conversation
+    assert conversation["phase"] == "documentation_generated"
+
+
+def _expire_lease(job_id: str):
+    from app.database.database import get_database
+    from app.database.models import DocumentationJob
+
+    session = get_database()
+    try:
+        session.query(DocumentationJob).filter(DocumentationJob.job_id == job_id).update(
+            {"heartbeat_at": datetime.utcnow() - timedelta(hours=1)}, synchronize_session=False
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+@pytest.mark.asyncio
+async def test_restarting_process_leaves_live_leases_alone():
+    async def never_called(job):
+        raise AssertionError("the job is still running elsewhere")
+
+    # Two uvicorn workers on one database; the first holds a running job
+    running_elsewhere = DocumentationJobQueue(settings.DATABASE_URL, workers=0, max_attempts=3, poll_interval=0.01)
+    restarted = DocumentationJobQueue(settings.DATABASE_URL, workers=1, max_attempts=3, poll_interval=0.01)
+    await running_elsewhere.start(never_called)
+    job_id = await running_elsewhere.enqueue("leased-conversation", {"project_idea": "todo", "history": []})
+    claimed = running_elsewhere._claim()
+    assert claimed["job_id"] == job_id and claimed["claimed_by"] == running_elsewhere.owner
+
+    await restarted.start(never_called)
+    try:
+        job = await restarted.get(job_id)
+        assert job["status"] == JOB_RUNNING and job["attempts"] == 1
+
+        # Once the holder stops renewing, the job goes back to the queue
+        _expire_lease(job_id)
+        await restarted.close()
+        assert restarted._recover() == 1
+        assert (await restarted.get(job_id))["status"] == JOB_QUEUED
+
+        # The old holder can no longer record an outcome over the requeued job
+        assert not running_elsewhere._finish(job_id, JOB_SUCCEEDED, {"stale": True}, None)
+        assert (await restarted.get(job_id))["result"] is None
+    finally:
+        await restarted.close()
+        await running_elsewhere.close()
@@ -0,0 +1,64 @@
+"""
+Adaptive model ranking
+"""
+
+import asyncio
+
+from app.services.model_router import ModelRouter
+
+DEFAULT_ORDER = ["anthropic", "goose_ai"]
+
+
+def _router() -> ModelRouter:
+    return ModelRouter(window=20, alpha=0.2, min_samples=5, error_penalty=30.0, timeout_penalty=60.0)
+
+
+def test_default_order_without_data():
+    assert _router().rank("conversation", DEFAULT_ORDER) == DEFAULT_ORDER
+
+
+def test_faster_known_model_ranks_first():
+    router = _router()
+    for _ in range(5):
+        router.record_success("conversation", "anthropic", 2.0)
+        router.record_success("conversation", "goose_ai", 0.5)
+
+    assert router.rank("conversation", DEFAULT_ORDER) == ["goose_ai", "anthropic"]
+
+
+def test_failing_known_model_ranks_after_untried_model():
+    router = _router()
+    for _ in range(5):
+        router.record_success("conversation", "anthropic", 1.0)
+    for _ in range(20):
+        router.record_failure("conversation", "anthropic", RuntimeError("overloaded"))
+
+    assert router.rank("conversation", DEFAULT_ORDER) == ["goose_ai", "anthropic"]
+
+
+def test_model_that_never_succeeded_ranks_after_untried_model():
+    router = _router()
+    for _ in range(5):
+        router.record_failure("conversation", "anthropic", asyncio.TimeoutError())
+
+    assert router.rank("conversation", DEFAULT_ORDER) == ["goose_ai", "anthropic"]
+
+
+def test_healthy_known_model_keeps_its_place_ahead_of_untried_model():
+    router = _router()
+    for _ in range(5):
+        router.record_success("conversation", "anthropic", 1.0)
+
+    assert router.rank("conversation", DEFAULT_ORDER) == DEFAULT_ORDER
+
+
+def test_few_failures_count_against_an_unproven_model():
+    router = _router()
+    for _ in range(5):
+        router.record_success("conversation", "anthropic", 1.0)
+        router.record_success("conversation", "goose_ai", 1.5)
+    router.record_failure("conversation", "other", RuntimeError("bad gateway"))
+    router.record_failure("conversation", "other", RuntimeError("bad gateway"))
+
+    order = router.rank("conversation", ["other", "anthropic", "goose_ai"])
+    assert order[-1] == "other"
@@ -0,0 +1,161 @@
+"""
+Model orchestration with fake provider clients: response caching across models, hedging,
+single-flight documentation generation
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.multi_model_service import FALLBACK_PROJECT, MultiModelService
+from app.services.response_cache import ResponseCache
+
+
+class FakeClient:
+    """A configured provider client answering with its own name and model version"""
+
+    def __init__(self, name: str, version: str):
+        self.client = self.available = True
+        self.name = name
+        self.version = version
+        self.fail = False
+        self.delay = 0.0
+        self.calls = 0
+        self.cancelled = 0
+        self.project_calls = 0
+
+    async def conversation_model(self) -> str:
+        return self.version
+
+    async def generate_conversation_response(self, prompt, context=None) -> str:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return f"{self.name}/{self.version}: {prompt}"
+
+    async def generate_complete_project(self, project_idea, conversation_history) -> dict:
+        self.project_calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return {"project_name": project_idea, "model": self.name, "turns": len(conversation_history)}
+
+
+@pytest.fixture
+def models(monkeypatch):
+    monkeypatch.setattr("app.services.multi_model_service.settings.HEDGING_ENABLED", False)
+    service = MultiModelService()
+    service.anthropic_client = FakeClient("anthropic", "sonnet-1")
+    service.goose_ai_client = FakeClient("goose_ai", "gpt-j-6b")
+    service.response_cache = ResponseCache(max_bytes=1024 * 1024, ttl=60)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_fallback_response_is_not_served_for_the_routed_model(models):
+    models.anthropic_client.fail = True
+    assert (await models.generate_conversation_response("hi")).startswith("goose_ai/")
+
+    models.anthropic_client.fail = False
+    assert (await models.generate_conversation_response("hi")).startswith("anthropic/")
+    assert await models.generate_conversation_response("hi") == "anthropic/sonnet-1: hi"
+    assert models.anthropic_client.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_model_version_change_misses_the_cache(models):
+    await models.generate_conversation_response("hi")
+    await models.generate_conversation_response("hi")
+    assert models.anthropic_client.calls == 1
+
+    models.anthropic_client.version = "sonnet-2"
+    assert await models.generate_conversation_response("hi") == "anthropic/sonnet-2: hi"
+    assert models.anthropic_client.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_hedge_cancels_the_slow_primary_and_releases_its_slot(models, monkeypatch):
+    monkeypatch.setattr("app.services.multi_model_service.settings.HEDGING_ENABLED", True)
+    monkeypatch.setattr("app.services.multi_model_service.settings.HEDGE_DEFAULT_DELAY", 0.05)
+    models.response_cache = None
+    models.anthropic_client.delay = 5.0
+
+    response = await asyncio.wait_for(models.generate_conversation_response("hi"), timeout=1.0)
+    await asyncio.sleep(0)  # let the cancelled primary unwind
+
+    assert response.startswith("goose_ai/")
+    assert models.get_hedging_stats()["hedges_won"] == 1
+    assert models.anthropic_client.cancelled == 1
+    limiter = models.limiters["anthropic"]
+    assert limiter.in_flight == 0 and limiter._semaphore._value == limiter.max_in_flight
+    # Losing a race says nothing about the provider's health
+    assert models.breakers["anthropic"].get_stats()["consecutive_failures"] == 0
+    assert models.model_performance["anthropic"]["failure"] == 0
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_does_not_fire_a_hedge(models, monkeypatch):
+    monkeypatch.setattr("app.services.multi_model_service.settings.HEDGING_ENABLED", True)
+    monkeypatch.setattr("app.services.multi_model_service.settings.HEDGE_DEFAULT_DELAY", 0.5)
+    models.response_cache = None
+
+    assert (await models.generate_conversation_response("hi")).startswith("anthropic/")
+    assert models.goose_ai_client.calls == 0
+    assert models.get_hedging_stats()["hedges_fired"] == 0
+
+
+HISTORY = [{"role": "user", "content": "A todo app"}, {"role": "assistant", "content": "Who uses it?"}]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_documentation_requests_share_one_generation(models):
+    models.anthropic_client.delay = 0.05
+
+    results = await asyncio.gather(*(
+        models.generate_complete_project("Todo", HISTORY, conversation_id="c1") for _ in range(3)
+    ))
+
+    assert models.anthropic_client.project_calls == 1
+    assert results[0] == results[1] == results[2]
+    assert models.get_project_dedup_stats()["generated"] == 1
+    assert models.get_project_dedup_stats()["joined"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_shared_generation(models):
+    models.anthropic_client.delay = 0.05
+    first = asyncio.ensure_future(models.generate_complete_project("Todo", HISTORY, conversation_id="c1"))
+    second = asyncio.ensure_future(models.generate_complete_project("Todo", HISTORY, conversation_id="c1"))
+    await asyncio.sleep(0.01)
+
+    first.cancel()
+    assert (await second)["model"] == "anthropic"
+    assert models.anthropic_client.cancelled == 0
+
+
+@pytest.mark.asyncio
+async def test_finished_documentation_is_reused_until_the_history_changes(models):
+    await models.generate_complete_project("Todo", HISTORY, conversation_id="c1")
+    # Same contents, fresh dicts: only roles and contents feed the digest
+    await models.generate_complete_project("Todo", [dict(m, timestamp="now") for m in HISTORY], conversation_id="c1")
+    assert models.anthropic_client.project_calls == 1
+    assert models.get_project_dedup_stats()["reused"] == 1
+
+    longer = HISTORY + [{"role": "user", "content": "Remote teams"}]
+    assert (await models.generate_complete_project("Todo", longer, conversation_id="c1"))["turns"] == 3
+    assert models.anthropic_client.project_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_generation_is_not_reused(models):
+    models.anthropic_client.fail = models.goose_ai_client.fail = True
+    assert await models.generate_complete_project("Todo", HISTORY, conversation_id="c1") == FALLBACK_PROJECT
+
+    models.anthropic_client.fail = False
+    assert (await models.generate_complete_project("Todo", HISTORY, conversation_id="c1"))["model"] == "anthropic"
+    assert models.get_project_dedup_stats()["generated"] == 2
@@ -0,0 +1,43 @@
+"""
+Archive writers: every format round-trips, and already-compressed members are stored
+"""
+
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from app.services.project_archive import stream_archive, supported_formats, zstandard
+
+# Compressible on purpose: if the writer recompressed it, it would no longer appear verbatim
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 20000
+FILES = [("README.md", b"# Todo app\n" * 500), ("assets/logo.png", PNG)]
+TAR_FORMATS = [name for name in ("tar.gz", "tar.zst") if name in supported_formats()]
+
+
+def _build(archive_format: str) -> bytes:
+    return b"".join(stream_archive(FILES, archive_format))
+
+
+def _untar(archive_format: str, data: bytes):
+    if archive_format == "tar.zst":
+        data = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as archive:
+        return [(member.name, archive.extractfile(member).read()) for member in archive.getmembers()]
+
+
+def test_zip_stores_precompressed_members():
+    with zipfile.ZipFile(io.BytesIO(_build("zip"))) as archive:
+        assert [(info.filename, archive.read(info)) for info in archive.infolist()] == FILES
+        assert archive.getinfo("assets/logo.png").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("README.md").compress_type == zipfile.ZIP_DEFLATED
+
+
+@pytest.mark.parametrize("archive_format", TAR_FORMATS)
+def test_tar_stores_precompressed_members(archive_format):
+    data = _build(archive_format)
+
+    assert _untar(archive_format, data) == FILES
+    assert PNG in data
+    assert FILES[0][1] not in data
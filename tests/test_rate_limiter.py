@@ -0,0 +1,86 @@
+"""
+Provider admission control: request and token pacing, the bounded wait queue
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.rate_limiter import ProviderBusyError, ProviderLimiter, TokenBucket
+
+
+def _limiter(max_in_flight=4, requests_per_minute=0, tokens_per_minute=0, max_queue=8, max_wait=5.0):
+    return ProviderLimiter("test", max_in_flight, requests_per_minute, tokens_per_minute, max_queue, max_wait)
+
+
+async def _timed_acquire(limiter: ProviderLimiter, estimated_tokens: int = 0) -> float:
+    start = time.monotonic()
+    async with limiter.acquire(estimated_tokens):
+        return time.monotonic() - start
+
+
+@pytest.mark.asyncio
+async def test_request_bucket_paces_requests_once_drained():
+    limiter = _limiter(requests_per_minute=600)  # refills one request per 0.1 s
+    assert await _timed_acquire(limiter) < 0.05
+
+    limiter._request_bucket.tokens = 0
+    assert await _timed_acquire(limiter) == pytest.approx(0.1, abs=0.05)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_the_estimated_tokens():
+    limiter = _limiter(tokens_per_minute=6000)  # 100 tokens per second
+    limiter._token_bucket.tokens = 0
+
+    assert await _timed_acquire(limiter, estimated_tokens=20) == pytest.approx(0.2, abs=0.05)
+    assert limiter.get_stats()["admitted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_request_larger_than_the_bucket_is_capped_instead_of_waiting_forever():
+    bucket = TokenBucket(per_minute=100)
+
+    await asyncio.wait_for(bucket.take(10_000), timeout=0.5)
+    assert bucket.tokens == pytest.approx(0, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_full_wait_queue_rejects_immediately():
+    limiter = _limiter(max_in_flight=1, max_queue=1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.acquire():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    while limiter.in_flight == 0:
+        await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+    assert limiter.queue_depth == 1
+
+    with pytest.raises(ProviderBusyError, match="queue is full"):
+        async with limiter.acquire():
+            pass
+    assert limiter.get_stats()["rejected"] == 1
+
+    release.set()
+    await asyncio.gather(holder, waiter)
+    assert limiter.get_stats()["admitted"] == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_timeout_gives_up_without_leaking_the_slot():
+    limiter = _limiter(max_in_flight=1, max_wait=0.05)
+    async with limiter.acquire():
+        with pytest.raises(ProviderBusyError, match="wait exceeded"):
+            async with limiter.acquire():
+                pass
+
+    assert limiter.get_stats()["timed_out"] == 1
+    assert limiter.queue_depth == 0
+    assert await _timed_acquire(limiter) < 0.05
@@ -0,0 +1,85 @@
+"""
+Per-conversation turn locks: ordering, isolation, the queue bound and slot cleanup
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.turn_lock import ConversationBusyError, TurnLocks
+
+
+async def _turn(locks: TurnLocks, conversation_id: str, log: list, name: str, duration: float = 0.01):
+    async with locks.hold(conversation_id):
+        log.append(f"{name} start")
+        await asyncio.sleep(duration)
+        log.append(f"{name} end")
+
+
+@pytest.mark.asyncio
+async def test_turns_of_one_conversation_run_in_arrival_order():
+    locks = TurnLocks(max_queued=5, max_wait=1.0)
+    log = []
+
+    await asyncio.gather(*(_turn(locks, "c1", log, name) for name in "abc"))
+
+    assert log == ["a start", "a end", "b start", "b end", "c start", "c end"]
+    assert locks.get_stats()["queued"] == 2
+
+
+@pytest.mark.asyncio
+async def test_other_conversations_do_not_wait():
+    locks = TurnLocks(max_queued=5, max_wait=1.0)
+    log = []
+
+    slow = asyncio.create_task(_turn(locks, "c1", log, "slow", duration=0.2))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(_turn(locks, "c2", log, "fast"), timeout=0.1)
+
+    assert log == ["slow start", "fast start", "fast end"]
+    await slow
+
+
+@pytest.mark.asyncio
+async def test_turns_beyond_the_queue_bound_are_rejected():
+    locks = TurnLocks(max_queued=1, max_wait=1.0)
+    log = []
+    running = [asyncio.create_task(_turn(locks, "c1", log, name, duration=0.05)) for name in "ab"]
+    await asyncio.sleep(0)
+
+    assert locks.is_busy("c1")
+    with pytest.raises(ConversationBusyError, match="1 queued"):
+        await _turn(locks, "c1", log, "c")
+
+    await asyncio.gather(*running)
+    assert log == ["a start", "a end", "b start", "b end"]
+    assert locks.get_stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_waiting_too_long_gives_up_and_keeps_the_queue_usable():
+    locks = TurnLocks(max_queued=5, max_wait=0.02)
+    log = []
+    slow = asyncio.create_task(_turn(locks, "c1", log, "slow", duration=0.1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(ConversationBusyError, match="Timed out"):
+        await _turn(locks, "c1", log, "late")
+    await slow
+
+    await _turn(locks, "c1", log, "next")
+    assert log == ["slow start", "slow end", "next start", "next end"]
+
+
+@pytest.mark.asyncio
+async def test_slot_is_dropped_when_the_last_turn_leaves():
+    locks = TurnLocks(max_queued=5, max_wait=1.0)
+
+    await asyncio.gather(*(_turn(locks, f"c{i}", [], "t") for i in range(10)))
+    with pytest.raises(RuntimeError):
+        async with locks.hold("failing"):
+            raise RuntimeError("provider error")
+
+    assert locks.get_stats()["active"] == 0
+    assert locks.get_stats()["max_slots"] == 10
+    assert not locks.is_locked("failing")